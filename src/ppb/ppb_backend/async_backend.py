@@ -0,0 +1,294 @@
+import asyncio
+import functools
+from collections.abc import Callable, Iterable
+from concurrent.futures import Executor
+from typing import IO, Any, Literal, TypeVar
+
+from .audit import AuditReport, account_ref_type
+from .bulk_export import EXPORT_FIELDS, export_format_type
+from .bulk_import import import_record_type
+from .duplicates import DedupePlan, duplicate_type
+from .events import ChangeEvent, change_kind_type
+from .password_generator import PasswordPolicy
+from .ppb_backend import PasswordBookSnapshot, PasswordBookSystem
+from .search_index import search_result_type
+from .trash_can import trash_entry_type
+
+_T = TypeVar("_T")
+
+
+class AsyncPasswordBookSystem:
+    """`PasswordBookSystem`的asyncio版本
+
+    內部是一個`thread_safe=True`的`PasswordBookSystem`（`backend`，同樣的
+    儲存引擎與資料格式），檔案I/O與JSON解析/編碼在`executor`（None：
+    事件迴圈的預設執行緒池）內執行，不阻擋事件迴圈。
+
+    同時送出的多個`password_book_save`會合併：執行中的儲存完成後，
+    之後等待中的請求只再寫入一次。"""
+
+    def __init__(
+        self,
+        *,
+        executor: Executor | None = None,
+        **options: Any,
+    ) -> None:
+        """`options`：`PasswordBookSystem`的選項（`file_path`以外）
+
+        建立的是空白密碼本，以`password_book_load`（或`open`）載入檔案。"""
+        options["thread_safe"] = True
+        self.backend: PasswordBookSystem = PasswordBookSystem(**options)
+        self._executor: Executor | None = executor
+        self._saving: asyncio.Future | None = None
+        self._queued_save: asyncio.Future | None = None
+        self._queued_save_args: tuple[str, bool] | None = None
+
+    @classmethod
+    async def open(
+        cls,
+        file_path: str,
+        *,
+        executor: Executor | None = None,
+        **options: Any,
+    ) -> "AsyncPasswordBookSystem":
+        book = cls(executor=executor, **options)
+        await book.password_book_load(file_path)
+        return book
+
+    async def _run(self, func: Callable[..., _T], *args, **kwargs) -> _T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def password_book_new(self) -> None:
+        await self._run(self.backend.password_book_new)
+
+    async def password_book_load(self, file_path: str) -> None:
+        await self._run(self.backend.password_book_load, file_path)
+
+    async def password_book_save(
+        self, file_path: str, *, force: bool = False
+    ) -> None:
+        """儲存；已有儲存在執行時，與其他等待中的請求合併成下一次儲存
+
+        合併時使用最後一個請求的`file_path`，`force`任一為True即為True。"""
+        if self._queued_save is not None:
+            self._queued_save_args = (
+                file_path,
+                force or self._queued_save_args[1],  # type: ignore[index]
+            )
+            await asyncio.shield(self._queued_save)
+        elif self._saving is not None:
+            self._queued_save_args = (file_path, force)
+            self._queued_save = asyncio.ensure_future(self._save_queued())
+            await asyncio.shield(self._queued_save)
+        else:
+            self._saving = asyncio.ensure_future(
+                self._save_once(file_path, force)
+            )
+            await asyncio.shield(self._saving)
+
+    async def _save_once(self, file_path: str, force: bool) -> None:
+        try:
+            await self._run(
+                self.backend.password_book_save, file_path, force=force
+            )
+        finally:
+            self._saving = None
+
+    async def _save_queued(self) -> None:
+        """等待執行中的儲存（它的錯誤由它的呼叫者處理），再寫入一次"""
+        if self._saving is not None:
+            await asyncio.wait([self._saving])
+        file_path, force = self._queued_save_args  # type: ignore[misc]
+        self._queued_save = None
+        self._queued_save_args = None
+        self._saving = asyncio.ensure_future(
+            self._save_once(file_path, force)
+        )
+        await self._saving
+
+    async def password_book_flush(self) -> None:
+        await self._run(self.backend.password_book_flush)
+
+    async def password_book_insert(
+        self,
+        app_name: str,
+        acc: str,
+        pwd: str | PasswordPolicy,
+        *,
+        note: str = "",
+        user_note: str = "",
+        on_duplicate: Literal["allow", "reject"] = "allow",
+    ) -> str:
+        return await self._run(
+            self.backend.password_book_insert,
+            app_name,
+            acc,
+            pwd,
+            note=note,
+            user_note=user_note,
+            on_duplicate=on_duplicate,
+        )
+
+    async def password_book_bulk_insert(
+        self,
+        records: Iterable[import_record_type],
+        *,
+        file_path: str | None = None,
+        policy: PasswordPolicy | None = None,
+    ) -> int:
+        return await self._run(
+            self.backend.password_book_bulk_insert,
+            records,
+            file_path=file_path,
+            policy=policy,
+        )
+
+    async def password_book_import(
+        self,
+        source: str | IO[str],
+        *,
+        file_format: Literal["auto", "csv", "json"] = "auto",
+        file_path: str | None = None,
+    ) -> int:
+        return await self._run(
+            self.backend.password_book_import,
+            source,
+            file_format=file_format,
+            file_path=file_path,
+        )
+
+    async def password_book_delete(self, app_name: str, acc: str) -> None:
+        await self._run(self.backend.password_book_delete, app_name, acc)
+
+    async def password_book_update(
+        self, app_name: str, acc: str, **changes: str | None
+    ) -> None:
+        """`changes`：`new_acc`、`pwd`、`note`、`user_note`"""
+        await self._run(
+            self.backend.password_book_update, app_name, acc, **changes
+        )
+
+    async def password_book_move_to_trash_can(
+        self, app: str, acc: str
+    ) -> int:
+        return await self._run(
+            self.backend.password_book_move_to_trash_can, app, acc
+        )
+
+    async def password_book_restore_from_trash_can(
+        self, trash_id: int
+    ) -> str:
+        return await self._run(
+            self.backend.password_book_restore_from_trash_can, trash_id
+        )
+
+    async def password_book_purge_trash_can(
+        self, before: float | None = None
+    ) -> int:
+        return await self._run(
+            self.backend.password_book_purge_trash_can, before
+        )
+
+    async def password_book_trash_can_items(self) -> list[trash_entry_type]:
+        return await self._run(self.backend.password_book_trash_can_items)
+
+    async def password_book_snapshot(self) -> PasswordBookSnapshot:
+        return await self._run(self.backend.password_book_snapshot)
+
+    async def password_book_search(self, app: str) -> list | None:
+        return await self._run(self.backend.password_book_search, app)
+
+    async def password_book_find(
+        self,
+        query: str,
+        *,
+        mode: Literal["prefix", "substring", "fuzzy"] = "substring",
+        limit: int = 50,
+    ) -> search_result_type:
+        return await self._run(
+            self.backend.password_book_find, query, mode=mode, limit=limit
+        )
+
+    async def password_book_find_duplicates(
+        self, app_name: str, acc: str
+    ) -> duplicate_type:
+        return await self._run(
+            self.backend.password_book_find_duplicates, app_name, acc
+        )
+
+    async def password_book_app_variants(self, app_name: str) -> list[str]:
+        return await self._run(
+            self.backend.password_book_app_variants, app_name
+        )
+
+    async def password_book_dedupe(self, *, dry_run: bool = False) -> DedupePlan:
+        return await self._run(
+            self.backend.password_book_dedupe, dry_run=dry_run
+        )
+
+    async def password_book_audit(
+        self, *, weak_score: int = 1, processes: int = 1
+    ) -> AuditReport:
+        return await self._run(
+            self.backend.password_book_audit,
+            weak_score=weak_score,
+            processes=processes,
+        )
+
+    async def password_book_breach_check(
+        self, index_path: str, *, processes: int = 1
+    ) -> list[account_ref_type]:
+        return await self._run(
+            self.backend.password_book_breach_check,
+            index_path,
+            processes=processes,
+        )
+
+    async def password_book_export(
+        self,
+        dest: str | IO[str],
+        *,
+        file_format: export_format_type = "jsonl",
+        apps: Iterable[str] | None = None,
+        fields: Iterable[str] = EXPORT_FIELDS,
+    ) -> int:
+        return await self._run(
+            self.backend.password_book_export,
+            dest,
+            file_format=file_format,
+            apps=apps,
+            fields=fields,
+        )
+
+    def password_book_subscribe(
+        self,
+        callback: Callable[[ChangeEvent], Any],
+        *,
+        kinds: Iterable[change_kind_type] | None = None,
+    ) -> int:
+        """訂閱變更事件；`callback`在呼叫此方法的事件迴圈內執行
+
+        （變更在執行緒池內完成，事件以`call_soon_threadsafe`送回迴圈）"""
+        if callable(callback) is False:
+            raise TypeError()
+        loop = asyncio.get_running_loop()
+        return self.backend.password_book_subscribe(
+            lambda event: loop.call_soon_threadsafe(callback, event),
+            kinds=kinds,
+        )
+
+    def password_book_unsubscribe(self, token: int) -> None:
+        self.backend.password_book_unsubscribe(token)
+
+    async def password_book_close(self) -> None:
+        """等待執行中/等待中的儲存完成後關閉"""
+        for future in (self._queued_save, self._saving):
+            if future is not None:
+                await asyncio.wait([future])
+        await self._run(self.backend.password_book_close)
+
+    def __str__(self) -> str:
+        return f"""AsyncPasswordBookSystem(backend={self.backend})"""
@@ -0,0 +1,294 @@
+import bisect
+import hashlib
+import math
+import re
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import pairwise
+from typing import Any
+
+strength_type = tuple[float, int, tuple[str, ...]]
+"""密碼強度：(熵（位元）, 分數0~4, 找到的模式)"""
+account_ref_type = tuple[str, str]
+"""(應用程式, 帳號)"""
+
+SCORE_LABELS: tuple[str, ...] = ("非常弱", "弱", "普通", "強", "非常強")
+SCORE_THRESHOLDS: tuple[float, ...] = (28.0, 36.0, 60.0, 80.0)
+"""熵（位元）達到各門檻時分數加一"""
+
+COMMON_PASSWORDS: frozenset[str] = frozenset(
+    (
+        "123456", "123456789", "12345678", "12345", "1234567", "1234567890",
+        "111111", "000000", "123123", "654321", "666666", "888888", "password",
+        "password1", "passw0rd", "qwerty", "qwerty123", "qwertyuiop", "abc123",
+        "abcd1234", "iloveyou", "admin", "admin123", "welcome", "letmein",
+        "monkey", "dragon", "football", "baseball", "sunshine", "princess",
+        "master", "shadow", "superman", "trustno1", "1q2w3e4r", "1qaz2wsx",
+        "zxcvbnm", "asdfghjkl", "aa123456", "a123456", "woaini", "woaini1314",
+        "5201314", "520520", "147258369", "159753", "qazwsx", "test", "guest",
+    )
+)
+"""最常見的密碼（小寫），完全相同時視為非常弱"""
+_COMMON_BITS: float = round(math.log2(len(COMMON_PASSWORDS)), 1)
+
+_KEYBOARD_ROWS: tuple[str, ...] = (
+    "1234567890",
+    "qwertyuiop",
+    "asdfghjkl",
+    "zxcvbnm",
+    "!@#$%^&*()",
+)
+_SEQUENCES: tuple[str, ...] = ("abcdefghijklmnopqrstuvwxyz", "0123456789")
+
+
+def _step_table(rows: Iterable[str]) -> bytes:
+    """`bytes.translate`用：字元 -> `rows`內的下一個字元，其他 -> 0xFF
+    （ASCII內不會出現，與任何字元都不相同）"""
+    table = bytearray(b"\xff" * 256)
+    for row in rows:
+        for char, next_char in pairwise(row):
+            table[ord(char)] = ord(next_char)
+    return bytes(table)
+
+
+_STEP_PATTERNS: tuple[tuple[str, bytes, int], ...] = (
+    ("sequence", _step_table(_SEQUENCES), 3),
+    ("sequence", _step_table(i[::-1] for i in _SEQUENCES), 3),
+    ("keyboard", _step_table(_KEYBOARD_ROWS), 4),
+    ("keyboard", _step_table(i[::-1] for i in _KEYBOARD_ROWS), 4),
+)
+"""(模式, 下一個字元的對照表, 最短長度)：連續的字元（"abc"、"321"）、
+鍵盤上連續的按鍵（"qwer"）"""
+_PATTERNS: tuple[tuple[str, "re.Pattern[str]", int], ...] = (
+    ("repeat", re.compile(r"(?=(.)\1\1)", re.DOTALL), 3),
+    ("year", re.compile(r"(?:19|20)\d\d"), 4),
+)
+"""(模式, regex, 長度)：重複的字元（"aaa"）、年份"""
+_ZERO_RUN = re.compile(b"\x00+")
+
+_DIGIT = re.compile("[0-9]")
+_SYMBOL = re.compile("[\x00-\x2f\x3a-\x40\x5b-\x60\x7b-\x7f]")
+_SEPARATOR: str = "\x00"
+"""串接密碼用；跨過分隔的比對結果會被捨棄"""
+
+_PATTERN_BITS: float = 1.0
+"""模式內（第一個字元之外）每個字元的熵"""
+
+
+def password_digest(pwd: str) -> bytes:
+    """比較重複使用用的digest（報告與比對都不保留明文）"""
+    return hashlib.blake2b(pwd.encode("utf-8"), digest_size=16).digest()
+
+
+def _pool_size(pwd: str, lowered: str) -> int:
+    """字元種類的大小（小寫26、大寫26、數字10、符號33、非ASCII 100）"""
+    return (
+        26 * (pwd != pwd.upper())
+        + 26 * (pwd != lowered)
+        + 10 * (_DIGIT.search(pwd) is not None)
+        + 33 * (_SYMBOL.search(pwd) is not None)
+        + 100 * (pwd.isascii() is False)
+    )
+
+
+def password_strength(pwd: str) -> strength_type:
+    """單一密碼的強度（見`score_passwords`）"""
+    return score_passwords([pwd])[0]
+
+
+def score_passwords(pwds: list[str]) -> list[strength_type]:
+    """批次估計密碼強度，與密碼的總長度成線性（也是行程池的工作單位）
+
+    全部密碼（小寫）串接起來，`_PATTERNS`、`_STEP_PATTERNS`各只掃描一次，
+    再加上整個密碼重複同一段（"abcabc"）。模式內第一個字元之外每個只算`_PATTERN_BITS`
+    位元，其他字元算log2(字元種類大小)位元；常見密碼直接是非常弱。"""
+    lowered = [i.lower() for i in pwds]
+    starts: list[int] = []
+    position = 0
+    for i in lowered:
+        starts.append(position)
+        position += len(i) + len(_SEPARATOR)
+    founds: list[set[str] | None] = [None] * len(pwds)
+    marks: list[set[int] | None] = [None] * len(pwds)
+
+    def found_at(name: str, start: int, end: int) -> None:
+        """串接後的[start, end)是模式：第一個字元之外都標記"""
+        index = bisect.bisect_right(starts, start) - 1
+        offset = start - starts[index]
+        if offset + (end - start) > len(lowered[index]):
+            return  # 跨過分隔
+        if founds[index] is None:
+            founds[index] = set()
+            marks[index] = set()
+        founds[index].add(name)  # type: ignore[union-attr]
+        marks[index].update(  # type: ignore[union-attr]
+            range(offset + 1, offset + end - start)
+        )
+
+    text = _SEPARATOR.join(lowered)
+    for name, pattern, span in _PATTERNS:
+        for match in pattern.finditer(text):
+            found_at(name, match.start(), match.start() + span)
+    if len(text) > 1:
+        # 每個字元一個byte（非ASCII -> "?"）；以對照表換成「下一個字元」後
+        # 與往後一格的內容XOR，0就是下一個字元符合，整批只需要幾個大整數運算
+        data = text.encode("ascii", "replace")
+        shifted = int.from_bytes(data[1:], "big")
+        for name, table, min_length in _STEP_PATTERNS:
+            steps = (
+                int.from_bytes(data[:-1].translate(table), "big") ^ shifted
+            ).to_bytes(len(data) - 1, "big")
+            for match in _ZERO_RUN.finditer(steps):
+                if match.end() - match.start() + 1 >= min_length:
+                    found_at(name, match.start(), match.end() + 1)
+    del text
+    strengths: list[strength_type] = []
+    for pwd, pwd_lowered, found, pwd_marks in zip(
+        pwds, lowered, founds, marks
+    ):
+        length = len(pwd)
+        if length <= 0:
+            strengths.append((0.0, 0, ("empty",)))
+            continue
+        found = set() if found is None else found
+        pwd_marks = set() if pwd_marks is None else pwd_marks
+        if length < 8:
+            found.add("short")
+        if pwd_lowered in COMMON_PASSWORDS:
+            found.add("common")
+            strengths.append((_COMMON_BITS, 0, tuple(sorted(found))))
+            continue
+        if length >= 4 and pwd in (pwd + pwd)[1:-1]:
+            # 整個密碼是同一段重複好幾次：只有第一段算
+            found.add("repeat")
+            pwd_marks.update(range((pwd + pwd).find(pwd, 1), length))
+        covered = min(len(pwd_marks), length)
+        entropy = (length - covered) * math.log2(
+            _pool_size(pwd, pwd_lowered)
+        ) + covered * _PATTERN_BITS
+        score = bisect.bisect_right(SCORE_THRESHOLDS, entropy)
+        strengths.append((round(entropy, 1), score, tuple(sorted(found))))
+    return strengths
+
+
+class AuditReport:
+    """`audit`的結果（不含密碼明文）"""
+
+    __slots__ = ("empty", "reused", "score_counts", "total", "weak")
+
+    def __init__(self) -> None:
+        self.total: int = 0
+        """檢查的帳號數"""
+        self.empty: list[account_ref_type] = []
+        """沒有密碼的帳號"""
+        self.reused: list[list[account_ref_type]] = []
+        """使用相同密碼的帳號，每組至少兩個，依數量由多到少排序"""
+        self.weak: list[tuple[str, str, strength_type]] = []
+        """弱密碼：(應用程式, 帳號, 強度)，依熵由低到高排序"""
+        self.score_counts: list[int] = [0] * len(SCORE_LABELS)
+        """各分數的帳號數"""
+
+    @property
+    def reused_count(self) -> int:
+        """與其他帳號使用相同密碼的帳號數"""
+        return sum(len(i) for i in self.reused)
+
+    def to_dict(self) -> dict[str, Any]:
+        """可以直接輸出成JSON的結構"""
+        return {
+            "total": self.total,
+            "score_counts": {
+                label: count
+                for label, count in zip(SCORE_LABELS, self.score_counts)
+            },
+            "empty": [{"app": app, "acc": acc} for app, acc in self.empty],
+            "reused": [
+                [{"app": app, "acc": acc} for app, acc in group]
+                for group in self.reused
+            ],
+            "weak": [
+                {
+                    "app": app,
+                    "acc": acc,
+                    "entropy": entropy,
+                    "score": score,
+                    "label": SCORE_LABELS[score],
+                    "patterns": list(patterns),
+                }
+                for app, acc, (entropy, score, patterns) in self.weak
+            ],
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"AuditReport(total={self.total}, reused={self.reused_count},"
+            f" weak={len(self.weak)}, empty={len(self.empty)})"
+        )
+
+
+def _chunks(items: list[str], chunk_size: int) -> Iterator[list[str]]:
+    for i in range(0, len(items), chunk_size):
+        yield items[i : i + chunk_size]
+
+
+def audit(
+    items: Iterable[tuple[str, list]],
+    *,
+    weak_score: int = 1,
+    processes: int = 1,
+    chunk_size: int = 10000,
+) -> AuditReport:
+    """檢查重複使用與弱密碼，與帳號數成線性
+
+    掃描一次全部帳號，以密碼的digest分組（dict，O(1)）；相同的密碼只
+    計算一次強度，分批（`chunk_size`）計算，`processes`大於1時在行程池。
+    分數小於等於`weak_score`的是弱密碼。"""
+    report = AuditReport()
+    groups: dict[bytes, list[account_ref_type]] = {}
+    unique: dict[bytes, str] = {}
+    for app, app_datas in items:
+        if app == "trash_can":
+            continue
+        for app_data in app_datas:
+            report.total += 1
+            pwd = app_data.get("pwd") or ""
+            if pwd == "":
+                report.empty.append((app, app_data["acc"]))
+                continue
+            digest = password_digest(pwd)
+            group = groups.get(digest)
+            if group is None:
+                groups[digest] = [(app, app_data["acc"])]
+                unique[digest] = pwd
+            else:
+                group.append((app, app_data["acc"]))
+    digests = list(unique)
+    pwds = [unique[i] for i in digests]
+    del unique
+    if processes > 1 and len(pwds) > chunk_size:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            strengths = [
+                strength
+                for chunk in executor.map(
+                    score_passwords, _chunks(pwds, chunk_size)
+                )
+                for strength in chunk
+            ]
+    else:
+        strengths = [
+            strength
+            for chunk in map(score_passwords, _chunks(pwds, chunk_size))
+            for strength in chunk
+        ]
+    del pwds
+    for digest, strength in zip(digests, strengths):
+        group = groups[digest]
+        report.score_counts[strength[1]] += len(group)
+        if len(group) > 1:
+            report.reused.append(group)
+        if strength[1] <= weak_score:
+            report.weak.extend((app, acc, strength) for app, acc in group)
+    report.score_counts[0] += len(report.empty)
+    report.reused.sort(key=len, reverse=True)
+    report.weak.sort(key=lambda i: i[2][0])
+    return report
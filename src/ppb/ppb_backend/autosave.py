@@ -0,0 +1,148 @@
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+
+from .events import ChangeEvent
+
+if TYPE_CHECKING:
+    from .ppb_backend import PasswordBookSystem
+
+
+logger = logging.getLogger(__name__)
+
+_MIN_RETRY_DELAY: float = 1.0
+_MAX_RETRY_DELAY: float = 60.0
+
+
+class AutoSaver:
+    """背景自動儲存：變更停止`idle_delay`秒後，或累積`max_pending`個變更時
+    儲存一次（一連串的變更合併成一次寫入）
+
+    以變更事件計算尚未儲存的變更，在背景執行緒儲存，所以密碼本需要
+    `thread_safe=True`。結束前呼叫`close`（會先寫入尚未儲存的變更）。
+    儲存失敗時等待後重試，等待時間從`idle_delay`（至少1秒）起每次加倍，
+    最多60秒；成功後恢復。"""
+
+    def __init__(
+        self,
+        backend: "PasswordBookSystem",
+        file_path: str,
+        *,
+        idle_delay: float = 2.0,
+        max_pending: int = 20,
+    ) -> None:
+        if backend.thread_safe is False:
+            raise RuntimeError("自動儲存需要thread_safe=True")
+        self.backend: PasswordBookSystem = backend
+        self.file_path: str = file_path
+        self.idle_delay: float = idle_delay
+        self.max_pending: int = max_pending
+        self.last_error: Exception | None = None
+        """最近一次背景儲存的錯誤（下次成功後清除）"""
+        self._cond = threading.Condition()
+        self._pending: int = 0
+        self._last_change: float = 0.0
+        self._saving: bool = False
+        self._failures: int = 0
+        self._retry_at: float = 0.0
+        self._closed: bool = False
+        self._token: int = backend.password_book_subscribe(self._on_change)
+        self._thread = threading.Thread(
+            target=self._run, name="ppb-autosave", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def pending_changes(self) -> int:
+        """尚未儲存的變更數量"""
+        return self._pending
+
+    @property
+    def has_pending(self) -> bool:
+        """是否有尚未儲存（或正在儲存）的變更"""
+        return self._pending > 0 or self._saving is True
+
+    def _on_change(self, event: ChangeEvent) -> None:
+        """在進行變更的執行緒內呼叫（持有寫入鎖），只記錄不儲存"""
+        if event.kind == "reloaded":
+            return
+        with self._cond:
+            self._pending += 1
+            self._last_change = time.monotonic()
+            self._cond.notify()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._closed is False and self._pending <= 0:
+                    self._cond.wait()
+                # 上次失敗：不論累積多少變更都先等待
+                while self._closed is False:
+                    remaining = self._retry_at - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                while (
+                    self._closed is False
+                    and self._pending < self.max_pending
+                ):
+                    remaining = (
+                        self._last_change + self.idle_delay - time.monotonic()
+                    )
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed is True:
+                    return
+                # 儲存期間的變更留給下一次
+                pending = self._pending
+                self._pending = 0
+                self._saving = True
+            try:
+                self.backend.password_book_save(self.file_path, force=True)
+                self.last_error = None
+                self._failures = 0
+            except Exception as e:
+                logger.exception("自動儲存失敗")
+                self.last_error = e
+                retry_delay = min(
+                    max(self.idle_delay, _MIN_RETRY_DELAY)
+                    * 2**self._failures,
+                    _MAX_RETRY_DELAY,
+                )
+                self._failures += 1
+                with self._cond:
+                    self._pending += pending
+                    self._last_change = time.monotonic()
+                    self._retry_at = self._last_change + retry_delay
+            finally:
+                with self._cond:
+                    self._saving = False
+                    self._cond.notify_all()
+
+    def flush(self) -> None:
+        """立即在目前的執行緒儲存（等待執行中的背景儲存完成）"""
+        with self._cond:
+            while self._saving is True:
+                self._cond.wait()
+            self._pending = 0
+            self._saving = True
+        try:
+            self.backend.password_book_save(self.file_path, force=True)
+        finally:
+            with self._cond:
+                self._saving = False
+                self._cond.notify_all()
+
+    def close(self, *, flush: bool = True) -> None:
+        """停止背景執行緒；`flush=False`時捨棄尚未儲存的變更"""
+        with self._cond:
+            if self._closed is True:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.backend.password_book_unsubscribe(self._token)
+        if flush is True:
+            self.flush()
@@ -0,0 +1,463 @@
+import datetime
+import gc
+import itertools
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable
+from typing import Any, Literal
+
+from .bulk_import import import_record_type
+from .ppb_backend import PasswordBookSystem
+
+benchmark_storage_type = Literal["json", "binary", "sharded", "sqlite"]
+benchmark_result_type = dict[str, Any]
+"""一個量測結果：{"accounts": ..., "storage": ..., "operation": ...,
+"ops": ..., "seconds": [...], "best": ..., "median": ...,
+"ops_per_second": ..., "peak_bytes": ...}"""
+
+SIZES: tuple[int, ...] = (1_000, 10_000, 100_000)
+"""預設的密碼本大小（帳號數）"""
+LARGE_SIZE: int = 1_000_000
+"""需要另外指定的大小（產生、載入都要數十秒，記憶體需要數百MB）"""
+STORAGES: tuple[str, ...] = ("json", "binary", "sharded", "sqlite")
+OPERATIONS: tuple[str, ...] = (
+    "load",
+    "save",
+    "insert",
+    "delete",
+    "search",
+    "find_index",
+    "find",
+)
+"""- load、save：整本密碼本載入/儲存一次
+- insert、delete：`op_count`次新增/刪除（已存在與新的應用程式）
+- search：`op_count`次以應用程式名稱查詢（`password_book_search`）
+- find_index：建立搜尋索引（第一次`password_book_find`）
+- find：索引建立後`op_count`次子字串搜尋"""
+INDEX_OPERATIONS: tuple[str, ...] = ("find_index", "find")
+"""需要搜尋索引的量測（10萬帳號的索引約40MB，建立約3秒）"""
+RESULTS_FORMAT: int = 1
+
+_STORAGE_OPTIONS: dict[str, dict[str, Any]] = {
+    "json": {"file_format": "json"},
+    "binary": {"file_format": "binary"},
+    "sharded": {"file_format": "sharded"},
+    "sqlite": {"storage": "sqlite"},
+}
+
+_APP_PREFIXES: tuple[str, ...] = (
+    "台灣", "中華", "國泰", "玉山", "第一", "合作", "新光", "遠東",
+    "統一", "全家", "大眾", "東方", "永豐", "富邦", "華南", "彰化",
+    "台北", "高雄", "台中", "北京", "上海", "深圳", "香港", "澳門",
+    "東京", "大阪", "首爾", "釜山", "小米", "騰訊",
+)
+_APP_MIDDLES: tuple[str, ...] = (
+    "", "數位", "國際", "行動", "線上", "商務", "雲端", "智慧",
+)
+_APP_SUFFIXES: tuple[str, ...] = (
+    "銀行", "電信", "購物", "論壇", "遊戲", "證券", "保險", "航空",
+    "書店", "外送", "影音", "郵局", "醫院", "大學", "圖書館", "超市",
+    "ストア", "ゲーム", "쇼핑", "은행",
+)
+_LATIN_APPS: tuple[str, ...] = (
+    "GitHub", "Google", "Microsoft", "Apple ID", "Steam", "Discord",
+    "LINE", "Facebook", "PTT", "Dcard", "蝦皮Shopee", "momo購物網",
+)
+_SURNAMES: str = "王李張劉陳楊黃趙吳周徐孫馬朱胡郭何林羅高鄭梁謝宋唐許"
+_GIVEN_NAMES: str = "小明華美玲志偉淑芬建宏怡君家豪雅婷俊傑宗翰欣怡冠宇"
+_NOTES: tuple[str, ...] = (
+    "", "", "主要帳號", "工作用", "https://example.com/login",
+    "備用信箱：backup@example.com", "二階段驗證：手機",
+)
+_PWD_CHARS: bytes = (
+    b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789!#$%&*"
+)
+_PWD_TABLE: bytes = bytes(
+    _PWD_CHARS[i % len(_PWD_CHARS)] for i in range(256)
+)
+
+
+def _app_names(count: int, rng: random.Random) -> list[str]:
+    """`count`個不重複的應用程式名稱（中日韓文字為主，夾雜英文）"""
+    names = list(_LATIN_APPS)
+    combos = [
+        prefix + middle + suffix
+        for middle in _APP_MIDDLES
+        for prefix in _APP_PREFIXES
+        for suffix in _APP_SUFFIXES
+    ]
+    rng.shuffle(combos)
+    names.extend(combos)
+    rng.shuffle(names)
+    for i in itertools.count(2):
+        if len(names) >= count:
+            break
+        # 名稱用完時加上分店/分區編號
+        names.extend(f"{name}（{i}）" for name in combos)
+    return names[:count]
+
+
+def app_count_for(accounts: int) -> int:
+    """應用程式數（帳號數的0.75次方：1k帳號約180個、1M帳號約3萬個）"""
+    return max(1, round(accounts**0.75))
+
+
+def generate_records(
+    accounts: int, *, seed: int = 0, skew: float = 1.1
+) -> list[import_record_type]:
+    """產生`accounts`個帳號的合成資料（相同的`seed`產生相同的資料）
+
+    每個應用程式的帳號數依Zipf分布（`skew`越大越集中）：少數應用程式
+    有大量帳號，多數只有一兩個。帳號是中文姓名或信箱，密碼12~20個字元。"""
+    rng = random.Random(seed)
+    apps = _app_names(app_count_for(accounts), rng)
+    cum_weights = list(
+        itertools.accumulate(
+            1 / (rank + 1) ** skew for rank in range(len(apps))
+        )
+    )
+    picks = rng.choices(
+        range(len(apps)), cum_weights=cum_weights, k=accounts
+    )
+    lengths = [rng.randint(12, 20) for _ in range(accounts)]
+    pwd_text = (
+        rng.randbytes(sum(lengths)).translate(_PWD_TABLE).decode("ascii")
+    )
+    records: list[import_record_type] = []
+    position = 0
+    for i, (app_index, length) in enumerate(zip(picks, lengths)):
+        if i % 3 == 0:
+            acc = f"user{i}@example.com"
+        else:
+            acc = (
+                rng.choice(_SURNAMES)
+                + rng.choice(_GIVEN_NAMES)
+                + rng.choice(_GIVEN_NAMES)
+                + str(i)
+            )
+        records.append(
+            {
+                "app": apps[app_index],
+                "acc": acc,
+                "pwd": pwd_text[position : position + length],
+                "note": rng.choice(_NOTES),
+                "user_note": "",
+            }
+        )
+        position += length
+    return records
+
+
+def build_book(
+    file_path: str,
+    records: Iterable[import_record_type],
+    storage: benchmark_storage_type = "json",
+) -> None:
+    """以`records`建立密碼本並儲存到`file_path`"""
+    backend = PasswordBookSystem(**_STORAGE_OPTIONS[storage])
+    try:
+        backend.password_book_bulk_insert(records)
+        backend.password_book_save(file_path, force=True)
+    finally:
+        backend.password_book_close()
+
+
+class _Case:
+    """一個量測：每次先`setup`（不計入），再量測`run(state)`"""
+
+    __slots__ = ("operation", "ops", "run", "setup", "teardown")
+
+    def __init__(
+        self,
+        operation: str,
+        ops: int,
+        setup: Callable[[], Any],
+        run: Callable[[Any], Any],
+        teardown: Callable[[Any], None],
+    ) -> None:
+        self.operation: str = operation
+        self.ops: int = ops
+        self.setup = setup
+        self.run = run
+        self.teardown = teardown
+
+
+def _cases(
+    book_path: str,
+    work_dir: str,
+    records: list[import_record_type],
+    storage: benchmark_storage_type,
+    op_count: int,
+    rng: random.Random,
+) -> dict[str, _Case]:
+    options = _STORAGE_OPTIONS[storage]
+    ops = min(op_count, len(records))
+    samples = rng.sample(records, ops)
+    apps = list(dict.fromkeys(i["app"] for i in records))
+    queries = [
+        i["acc"][1:3] if n % 2 == 0 else i["app"][:2]
+        for n, i in enumerate(samples)
+    ]
+
+    def copy_book() -> PasswordBookSystem:
+        """複製一份再載入：變更（SQLite每次變更都會寫入）不影響原本的檔案"""
+        path = os.path.join(work_dir, f"work_{storage}")
+        _remove_book(path)
+        _copy_book(book_path, path)
+        return PasswordBookSystem(path, **options)
+
+    def load_book() -> PasswordBookSystem:
+        return PasswordBookSystem(book_path, **options)
+
+    def close(backend: PasswordBookSystem | None) -> None:
+        if backend is not None:
+            backend.password_book_close()
+
+    def run_insert(backend: PasswordBookSystem) -> None:
+        for n, i in enumerate(samples):
+            # 一半加到已存在的應用程式，一半是新的應用程式
+            app = i["app"] if n % 2 == 0 else f"{i['app']}新{n}"
+            backend.password_book_insert(app, f"{i['acc']}新", i["pwd"])
+
+    def run_delete(backend: PasswordBookSystem) -> None:
+        for i in samples:
+            backend.password_book_delete(i["app"], i["acc"])
+
+    def run_search(backend: PasswordBookSystem) -> None:
+        for n, i in enumerate(samples):
+            backend.password_book_search(
+                i["app"] if n % 4 != 0 else apps[n % len(apps)] + "不存在"
+            )
+
+    def setup_find() -> PasswordBookSystem:
+        backend = load_book()
+        backend.password_book_find("")
+        return backend
+
+    def run_find(backend: PasswordBookSystem) -> None:
+        for query in queries:
+            backend.password_book_find(query, limit=20)
+
+    def run_save(backend: PasswordBookSystem) -> None:
+        backend.password_book_save(
+            os.path.join(work_dir, f"saved_{storage}"), force=True
+        )
+
+    def close_saved(backend: PasswordBookSystem) -> None:
+        backend.password_book_close()
+        _remove_book(os.path.join(work_dir, f"saved_{storage}"))
+
+    return {
+        "load": _Case("load", 1, lambda: None, lambda _: load_book(), close),
+        "save": _Case("save", 1, load_book, run_save, close_saved),
+        "insert": _Case("insert", ops, copy_book, run_insert, close),
+        "delete": _Case("delete", ops, copy_book, run_delete, close),
+        "search": _Case("search", ops, load_book, run_search, close),
+        "find_index": _Case(
+            "find_index",
+            1,
+            load_book,
+            lambda backend: backend.password_book_find(""),
+            close,
+        ),
+        "find": _Case("find", ops, setup_find, run_find, close),
+    }
+
+
+def _book_files(file_path: str) -> list[str]:
+    """密碼本的檔案（分片資料夾、日誌、鎖定檔、SQLite的-wal等）"""
+    directory = os.path.dirname(file_path)
+    name = os.path.basename(file_path)
+    return [
+        os.path.join(directory, i)
+        for i in os.listdir(directory)
+        if i == name or i.startswith((name + ".", name + "-"))
+    ]
+
+
+def _copy_book(src: str, dst: str) -> None:
+    for path in _book_files(src):
+        target = dst + os.path.basename(path)[len(os.path.basename(src)) :]
+        if os.path.isdir(path) is True:
+            shutil.copytree(path, target)
+        else:
+            shutil.copyfile(path, target)
+
+
+def _remove_book(file_path: str) -> None:
+    if os.path.isdir(os.path.dirname(file_path)) is False:
+        return
+    for path in _book_files(file_path):
+        if os.path.isdir(path) is True:
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
+
+
+def _measure_time(case: _Case, repeat: int) -> list[float]:
+    seconds: list[float] = []
+    for _ in range(repeat):
+        state = case.setup()
+        gc.collect()
+        start = time.perf_counter()
+        result = case.run(state)
+        seconds.append(time.perf_counter() - start)
+        case.teardown(result if case.operation == "load" else state)
+    return seconds
+
+
+def _measure_memory(case: _Case) -> int:
+    """`run`期間新配置的記憶體的峰值（bytes）；另外一次執行，tracemalloc
+    會讓程式變慢很多，不影響計時"""
+    state = case.setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = case.run(state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    case.teardown(result if case.operation == "load" else state)
+    return peak
+
+
+def run_benchmarks(
+    sizes: Iterable[int] = SIZES,
+    *,
+    storages: Iterable[benchmark_storage_type] = ("json",),
+    operations: Iterable[str] = OPERATIONS,
+    op_count: int = 1000,
+    repeat: int = 3,
+    seed: int = 0,
+    skew: float = 1.1,
+    measure_memory: bool = True,
+    index_limit: int | None = 100_000,
+    work_dir: str | None = None,
+    progress: Callable[[benchmark_result_type], None] | None = None,
+) -> dict[str, Any]:
+    """對每個大小、儲存格式量測`operations`，回傳可以輸出成JSON的結果
+
+    計時執行`repeat`次（每次重新`setup`，取最小值與中位數），記憶體
+    另外執行一次（`measure_memory`）。帳號數超過`index_limit`時略過
+    `INDEX_OPERATIONS`（None：不限制）。`progress`：每完成一項時呼叫。"""
+    operations = list(operations)
+    unknown = [i for i in operations if i not in OPERATIONS]
+    if len(unknown) > 0:
+        raise ValueError(f"不支援的量測：{'、'.join(unknown)}")
+    results: list[benchmark_result_type] = []
+    tmp_dir = tempfile.mkdtemp(prefix="ppb_benchmark_", dir=work_dir)
+    try:
+        for accounts in sizes:
+            records = generate_records(accounts, seed=seed, skew=skew)
+            app_count = len({i["app"] for i in records})
+            for storage in storages:
+                book_path = os.path.join(tmp_dir, f"book_{storage}")
+                build_book(book_path, records, storage)
+                cases = _cases(
+                    book_path,
+                    tmp_dir,
+                    records,
+                    storage,
+                    op_count,
+                    random.Random(seed),
+                )
+                for operation in operations:
+                    if (
+                        operation in INDEX_OPERATIONS
+                        and index_limit is not None
+                        and accounts > index_limit
+                    ):
+                        continue
+                    case = cases[operation]
+                    seconds = _measure_time(case, repeat)
+                    best = min(seconds)
+                    result: benchmark_result_type = {
+                        "accounts": accounts,
+                        "apps": app_count,
+                        "storage": storage,
+                        "operation": operation,
+                        "ops": case.ops,
+                        "seconds": [round(i, 6) for i in seconds],
+                        "best": round(best, 6),
+                        "median": round(statistics.median(seconds), 6),
+                        "ops_per_second": round(
+                            case.ops / max(best, 1e-9), 1
+                        ),
+                        "peak_bytes": (
+                            _measure_memory(case)
+                            if measure_memory is True
+                            else None
+                        ),
+                    }
+                    results.append(result)
+                    if progress is not None:
+                        progress(result)
+                _remove_book(book_path)
+            del records
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return {
+        "format": RESULTS_FORMAT,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "seed": seed,
+        "skew": skew,
+        "repeat": repeat,
+        "index_limit": index_limit,
+        "results": results,
+    }
+
+
+def write_results(results: dict[str, Any], file_path: str) -> None:
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=4)
+
+
+def read_results(file_path: str) -> dict[str, Any]:
+    with open(file_path, "r", encoding="utf-8") as f:
+        results = json.load(f)
+    if type(results) is not dict or results.get("format") != RESULTS_FORMAT:
+        raise ValueError(f"不是量測結果：「{file_path}」")
+    return results
+
+
+def compare_results(
+    old: dict[str, Any], new: dict[str, Any]
+) -> list[tuple[int, str, str, float, float, float | None]]:
+    """比較兩次量測（相同的大小、格式、量測項目），回傳
+    [(帳號數, 格式, 量測, 時間比, 新的最佳時間, 記憶體比), ...]；
+    比例 > 1 表示變慢/變多"""
+
+    def key(result: benchmark_result_type) -> tuple[int, str, str]:
+        return result["accounts"], result["storage"], result["operation"]
+
+    old_results = {key(i): i for i in old["results"]}
+    rows: list[tuple[int, str, str, float, float, float | None]] = []
+    for result in new["results"]:
+        previous = old_results.get(key(result))
+        if previous is None:
+            continue
+        memory_ratio = None
+        if result["peak_bytes"] and previous["peak_bytes"]:
+            memory_ratio = round(
+                result["peak_bytes"] / previous["peak_bytes"], 3
+            )
+        rows.append(
+            (
+                *key(result),
+                round(result["best"] / max(previous["best"], 1e-9), 3),
+                result["best"],
+                memory_ratio,
+            )
+        )
+    return rows
+
@@ -0,0 +1,240 @@
+import json
+import mmap
+import struct
+from collections.abc import Callable, Mapping
+from typing import Any
+
+from .compression import read_file_bytes
+from .lazy_data import LazyAppDict, LazyAppSpan
+from .schema import SCHEMA_KEY, pop_schema_version
+
+MAGIC: bytes = b"PPBB"
+VERSION: int = 1
+
+_HEADER = struct.Struct("<4sHHIIIQQQQ")
+"""magic, version, 帳號資料的schema版本（`schema.SCHEMA_VERSION`）,
+字串數, 應用程式數, 帳號數,
+字串表位置, 應用程式表位置, 帳號目錄位置, 欄位資料位置"""
+_STRING_ENTRY = struct.Struct("<QI")
+"""字串位置, 字串長度"""
+_APP_ENTRY = struct.Struct("<IIII")
+"""名稱字串id, 第一個帳號, 帳號數, 保留"""
+_RECORD_ENTRY = struct.Struct("<QIHH")
+"""欄位位置, 欄位資料長度, 欄位數, 保留"""
+_FIELD_HEAD = struct.Struct("<II")
+"""key字串id, 值長度（之後接值的UTF-8）"""
+
+
+def is_binary_file(file_path: str) -> bool:
+    with open(file_path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def binary_schema_version(file_path: str) -> int:
+    with open(file_path, "rb") as f:
+        header = f.read(_HEADER.size)
+    return _HEADER.unpack(header)[2]
+
+
+def dump_binary(data: dict, f, schema_version: int = 0) -> None:
+    """把`data_type`格式的資料寫成二進位格式（`f`需為二進位模式）
+
+    格式：標頭、字串表（應用程式名稱與欄位名稱）、應用程式表、
+    固定大小的帳號目錄、以長度開頭的欄位資料。"""
+    strings: dict[str, int] = {}
+
+    def string_id(text: str) -> int:
+        if type(text) is not str:
+            raise TypeError(f"二進位格式只支援字串：{text!r}")
+        if text not in strings:
+            strings[text] = len(strings)
+        return strings[text]
+
+    app_entries: list[tuple[int, int, int]] = []
+    record_entries: list[tuple[int, int, int]] = []
+    field_chunks: list[bytes] = []
+    field_size = 0
+    for app, app_datas in data.items():
+        if app == SCHEMA_KEY and type(app_datas) is int:
+            # 版本號寫在標頭
+            continue
+        if type(app_datas) is not list:
+            raise TypeError(f"二進位格式只支援帳號清單：{app!r}")
+        app_entries.append((string_id(app), len(record_entries), len(app_datas)))
+        for app_data in app_datas:
+            if isinstance(app_data, Mapping) is False:
+                raise TypeError(f"二進位格式只支援帳號資料：{app_data!r}")
+            record_start = field_size
+            for key, value in app_data.items():
+                key_id = string_id(key)
+                if type(value) is not str:
+                    raise TypeError(f"二進位格式只支援字串：{value!r}")
+                value_bytes = value.encode("utf-8")
+                field_chunks.append(_FIELD_HEAD.pack(key_id, len(value_bytes)))
+                field_chunks.append(value_bytes)
+                field_size += _FIELD_HEAD.size + len(value_bytes)
+            record_entries.append(
+                (record_start, field_size - record_start, len(app_data))
+            )
+    string_bytes = [text.encode("utf-8") for text in strings]
+    string_table_offset = _HEADER.size
+    string_blob_offset = string_table_offset + _STRING_ENTRY.size * len(
+        string_bytes
+    )
+    app_table_offset = string_blob_offset + sum(
+        len(i) for i in string_bytes
+    )
+    record_dir_offset = app_table_offset + _APP_ENTRY.size * len(app_entries)
+    field_data_offset = record_dir_offset + _RECORD_ENTRY.size * len(
+        record_entries
+    )
+    f.write(
+        _HEADER.pack(
+            MAGIC,
+            VERSION,
+            schema_version,
+            len(string_bytes),
+            len(app_entries),
+            len(record_entries),
+            string_table_offset,
+            app_table_offset,
+            record_dir_offset,
+            field_data_offset,
+        )
+    )
+    offset = string_blob_offset
+    for text_bytes in string_bytes:
+        f.write(_STRING_ENTRY.pack(offset, len(text_bytes)))
+        offset += len(text_bytes)
+    for text_bytes in string_bytes:
+        f.write(text_bytes)
+    for name_id, first_record, record_count in app_entries:
+        f.write(_APP_ENTRY.pack(name_id, first_record, record_count, 0))
+    for record_start, record_size, field_count in record_entries:
+        f.write(
+            _RECORD_ENTRY.pack(
+                field_data_offset + record_start, record_size, field_count, 0
+            )
+        )
+    for chunk in field_chunks:
+        f.write(chunk)
+
+
+class BinaryPasswordBook:
+    """以`mmap`開啟二進位格式，需要時才從對映的記憶體讀出帳號"""
+
+    def __init__(self, file_path: str) -> None:
+        with open(file_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        (
+            magic,
+            version,
+            self.schema_version,
+            string_count,
+            self.app_count,
+            self.record_count,
+            string_table_offset,
+            self._app_table_offset,
+            self._record_dir_offset,
+            _field_data_offset,
+        ) = _HEADER.unpack_from(self._view, 0)
+        if magic != MAGIC:
+            self.close()
+            raise TypeError("不是二進位格式的密碼本")
+        if version > VERSION:
+            self.close()
+            raise TypeError(f"不支援的二進位格式版本：{version}")
+        self._strings: list[str] = []
+        for i in range(string_count):
+            offset, length = _STRING_ENTRY.unpack_from(
+                self._view, string_table_offset + _STRING_ENTRY.size * i
+            )
+            self._strings.append(
+                str(self._view[offset : offset + length], "utf-8")
+            )
+
+    def apps(self) -> list[tuple[str, int, int]]:
+        """(應用程式名稱, 第一個帳號, 帳號數)"""
+        apps = []
+        for i in range(self.app_count):
+            name_id, first_record, record_count, _ = _APP_ENTRY.unpack_from(
+                self._view, self._app_table_offset + _APP_ENTRY.size * i
+            )
+            apps.append((self._strings[name_id], first_record, record_count))
+        return apps
+
+    def read_record(self, record_num: int) -> dict[str, str]:
+        view = self._view
+        offset, _, field_count, _ = _RECORD_ENTRY.unpack_from(
+            view, self._record_dir_offset + _RECORD_ENTRY.size * record_num
+        )
+        record: dict[str, str] = {}
+        for _ in range(field_count):
+            key_id, length = _FIELD_HEAD.unpack_from(view, offset)
+            offset += _FIELD_HEAD.size
+            record[self._strings[key_id]] = str(
+                view[offset : offset + length], "utf-8"
+            )
+            offset += length
+        return record
+
+    def read_records(self, first_record: int, record_count: int) -> list:
+        return [
+            self.read_record(i)
+            for i in range(first_record, first_record + record_count)
+        ]
+
+    def to_dict(self) -> dict[str, list[dict[str, str]]]:
+        return {
+            app: self.read_records(first_record, record_count)
+            for app, first_record, record_count in self.apps()
+        }
+
+    def close(self) -> None:
+        self._view.release()
+        self._mmap.close()
+
+
+def lazy_load_binary(
+    file_path: str,
+    on_materialize: Callable[[str, list], None] | None = None,
+) -> LazyAppDict:
+    """以`mmap`開啟，第一次讀取某個應用程式時才讀出它的帳號"""
+    book = BinaryPasswordBook(file_path)
+    data = LazyAppDict(
+        lambda span: book.read_records(span.start, span.count),
+        on_materialize,
+        close=book.close,
+    )
+    for app, first_record, record_count in book.apps():
+        dict.__setitem__(
+            data,
+            app,
+            LazyAppSpan(first_record, first_record + record_count, record_count),
+        )
+    return data
+
+
+def load_binary(file_path: str) -> dict:
+    book = BinaryPasswordBook(file_path)
+    try:
+        return book.to_dict()
+    finally:
+        book.close()
+
+
+def json_to_binary(json_file_path: str, binary_file_path: str) -> None:
+    data: Any = json.loads(read_file_bytes(json_file_path)[0])
+    if type(data) is not dict:
+        raise TypeError()
+    schema_version = pop_schema_version(data)
+    with open(binary_file_path, "wb") as f:
+        dump_binary(data, f, schema_version)
+
+
+def binary_to_json(binary_file_path: str, json_file_path: str) -> None:
+    data = load_binary(binary_file_path)
+    data = {SCHEMA_KEY: binary_schema_version(binary_file_path), **data}
+    with open(json_file_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=4)
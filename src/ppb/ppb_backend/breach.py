@@ -0,0 +1,336 @@
+import binascii
+import hashlib
+import heapq
+import mmap
+import os
+import re
+import shutil
+import struct
+import tempfile
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from typing import IO, Self
+
+from .audit import account_ref_type
+
+INDEX_MAGIC: bytes = b"PPBSHA1\x00"
+DIGEST_SIZE: int = 20
+FANOUT_SIZE: int = 1 << 16
+"""以digest的前2個byte分組，每組的結束位置存在檔案開頭"""
+_FANOUT = struct.Struct(f">{FANOUT_SIZE}Q")
+_RECORDS_OFFSET: int = len(INDEX_MAGIC) + _FANOUT.size
+
+# 以`^`錨定列首：否則41個字元的列會以後40個字元成功比對
+_FULL_HASH = re.compile(rb"^([0-9A-Fa-f]{40})(?::\d*)?\r?\n", re.MULTILINE)
+_SUFFIX_HASH = re.compile(rb"^([0-9A-Fa-f]{35})(?::\d*)?\r?\n", re.MULTILINE)
+_RANGE_FILE = re.compile(r"^([0-9A-Fa-f]{5})(?:\.txt)?$")
+_BLOCK_SIZE: int = 1 << 22
+
+
+def sha1_digest(pwd: str) -> bytes:
+    return hashlib.sha1(pwd.encode("utf-8")).digest()
+
+
+def iter_corpus(corpus_path: str) -> Iterator[list[bytes]]:
+    """分批讀出外洩密碼資料的SHA-1 digest
+
+    - 檔案：每列一個SHA-1（40個十六進位字元），可以有`:次數`
+    - 資料夾：k-anonymity的range檔案，檔名是前5個字元（`00A1F.txt`），
+      每列是其餘35個字元，可以有`:次數`"""
+    if os.path.isdir(corpus_path) is True:
+        for file_name in sorted(os.listdir(corpus_path)):
+            match = _RANGE_FILE.match(file_name)
+            if match is None:
+                continue
+            yield from _iter_blocks(
+                os.path.join(corpus_path, file_name),
+                _SUFFIX_HASH,
+                match.group(1).encode("ascii"),
+            )
+    else:
+        yield from _iter_blocks(corpus_path, _FULL_HASH, b"")
+
+
+def _iter_blocks(
+    file_path: str, pattern: "re.Pattern[bytes]", prefix: bytes
+) -> Iterator[list[bytes]]:
+    """每次讀取`_BLOCK_SIZE`，整塊以regex解析；比對到的數量與列數不同
+    （有不符合的列）時才逐列檢查，以`ValueError`回報列號"""
+    line_num = 0
+    rest = b""
+    with open(file_path, "rb") as f:
+        while True:
+            block = f.read(_BLOCK_SIZE)
+            if len(block) <= 0:
+                block, rest = rest, b""
+                if block.strip() == b"":
+                    return
+                block += b"\n"
+            else:
+                block = rest + block
+                cut = block.rfind(b"\n") + 1
+                block, rest = block[:cut], block[cut:]
+            hexes = pattern.findall(block)
+            lines = block.count(b"\n")
+            if len(hexes) != lines:
+                hexes = []
+                for i, line in enumerate(block.splitlines(True), 1):
+                    match = pattern.fullmatch(line)
+                    if match is not None:
+                        hexes.append(match.group(1))
+                    elif line.strip() != b"":
+                        raise ValueError(
+                            f"「{file_path}」第{line_num + i}列不是SHA-1："
+                            f"{line[:60]!r}"
+                        )
+            line_num += lines
+            if len(prefix) > 0:
+                hexes = [prefix + i for i in hexes]
+            data = binascii.unhexlify(b"".join(hexes))
+            yield [
+                data[i : i + DIGEST_SIZE]
+                for i in range(0, len(data), DIGEST_SIZE)
+            ]
+
+
+def _read_run(run: IO[bytes]) -> Iterator[bytes]:
+    while True:
+        block = run.read(DIGEST_SIZE * 4096)
+        if len(block) <= 0:
+            return
+        for i in range(0, len(block), DIGEST_SIZE):
+            yield block[i : i + DIGEST_SIZE]
+
+
+def _fanout(data: "mmap.mmap", count: int) -> list[int]:
+    """已排序的digest中，前2個byte為各值的digest的結束位置（65536次
+    二分搜尋，不必讀取每個digest）"""
+    fanout: list[int] = []
+    low = 0
+    for prefix in range(1, FANOUT_SIZE + 1):
+        key = prefix.to_bytes(2, "big") if prefix < FANOUT_SIZE else None
+        high = count
+        while key is not None and low < high:
+            middle = (low + high) // 2
+            position = _RECORDS_OFFSET + middle * DIGEST_SIZE
+            if data[position : position + 2] < key:
+                low = middle + 1
+            else:
+                high = middle
+        fanout.append(low if key is not None else count)
+    return fanout
+
+
+def build_breach_index(
+    corpus_path: str, index_path: str, *, chunk_size: int = 1 << 20
+) -> int:
+    """由外洩密碼資料（見`iter_corpus`）建立排序好的二進位索引，回傳digest數
+
+    格式：`INDEX_MAGIC`、65536個uint64（前2個byte為0x0000~0xFFFF的
+    digest的結束位置）、排序且不重複的20 byte digest。只需要建立一次。
+
+    每`chunk_size`個digest排序後寫到暫存檔，最後以merge合併，記憶體
+    用量固定；已排序的資料（例如HIBP的下載檔）只會有一個暫存檔，直接
+    複製，不必merge。"""
+    runs: list[IO[bytes]] = []
+    last: bytes | None = None
+    chunk: list[bytes] = []
+
+    def flush() -> None:
+        nonlocal last
+        digests = list(dict.fromkeys(sorted(chunk)))
+        chunk.clear()
+        if len(runs) <= 0 or last is None or digests[0] <= last:
+            runs.append(tempfile.TemporaryFile())  # noqa: SIM115
+        # 否則接續上一個暫存檔：已排序的輸入不需要merge
+        runs[-1].write(b"".join(digests))
+        last = digests[-1]
+
+    tmp_path = os.path.abspath(index_path) + ".tmp"
+    try:
+        for digests in iter_corpus(corpus_path):
+            chunk.extend(digests)
+            if len(chunk) >= chunk_size:
+                flush()
+        if len(chunk) > 0:
+            flush()
+        for run in runs:
+            run.seek(0)
+        count = 0
+        with open(tmp_path, "w+b") as f:
+            f.write(INDEX_MAGIC)
+            f.write(bytes(_FANOUT.size))
+            if len(runs) == 1:
+                count = runs[0].seek(0, os.SEEK_END) // DIGEST_SIZE
+                runs[0].seek(0)
+                shutil.copyfileobj(runs[0], f, _BLOCK_SIZE)
+            elif len(runs) > 1:
+                previous = None
+                buffer: list[bytes] = []
+                for digest in heapq.merge(*(_read_run(i) for i in runs)):
+                    if digest == previous:
+                        continue
+                    previous = digest
+                    buffer.append(digest)
+                    if len(buffer) >= 4096:
+                        count += len(buffer)
+                        f.write(b"".join(buffer))
+                        buffer.clear()
+                count += len(buffer)
+                f.write(b"".join(buffer))
+            f.flush()
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                fanout = _fanout(data, count)
+            f.seek(len(INDEX_MAGIC))
+            f.write(_FANOUT.pack(*fanout))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, index_path)
+    finally:
+        for run in runs:
+            run.close()
+        if os.path.exists(tmp_path) is True:
+            os.remove(tmp_path)
+    return count
+
+
+class BreachIndex:
+    """以mmap開啟`build_breach_index`建立的索引，以二分搜尋查詢
+
+    先以前2個byte找到範圍（約1/65536），再在範圍內二分搜尋；不載入
+    整個檔案，記憶體用量固定。"""
+
+    def __init__(self, index_path: str) -> None:
+        self._file = open(index_path, "rb")  # noqa: SIM115
+        try:
+            self._mmap = mmap.mmap(
+                self._file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        except BaseException:
+            self._file.close()
+            raise
+        if self._mmap[: len(INDEX_MAGIC)] != INDEX_MAGIC:
+            self.close()
+            raise TypeError("不是外洩密碼索引")
+        self._fanout: tuple[int, ...] = _FANOUT.unpack_from(
+            self._mmap, len(INDEX_MAGIC)
+        )
+        if _RECORDS_OFFSET + self._fanout[-1] * DIGEST_SIZE != len(
+            self._mmap
+        ):
+            self.close()
+            raise ValueError("外洩密碼索引不完整")
+
+    def __len__(self) -> int:
+        return self._fanout[-1]
+
+    def __contains__(self, digest: bytes) -> bool:
+        prefix = (digest[0] << 8) | digest[1]
+        low = self._fanout[prefix - 1] if prefix > 0 else 0
+        high = self._fanout[prefix]
+        data = self._mmap
+        while low < high:
+            middle = (low + high) // 2
+            position = _RECORDS_OFFSET + middle * DIGEST_SIZE
+            record = data[position : position + DIGEST_SIZE]
+            if record < digest:
+                low = middle + 1
+            elif record > digest:
+                high = middle
+            else:
+                return True
+        return False
+
+    def is_breached(self, pwd: str) -> bool:
+        return sha1_digest(pwd) in self
+
+    def close(self) -> None:
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+_worker_index: BreachIndex | None = None
+"""行程池內每個行程開啟一次的索引"""
+
+
+def _init_worker(index_path: str) -> None:
+    global _worker_index
+    _worker_index = BreachIndex(index_path)
+
+
+def _check_chunk(digests: list[bytes]) -> list[bool]:
+    assert _worker_index is not None
+    return [digest in _worker_index for digest in digests]
+
+
+def check_digests(
+    index_path: str,
+    digests: list[bytes],
+    *,
+    processes: int = 1,
+    chunk_size: int = 10000,
+) -> list[bool]:
+    """`digests`各自是否在索引中（順序相同）
+
+    依digest排序後查詢，讀取mmap的位置大致依序；`processes`大於1時
+    分批（`chunk_size`）在行程池查詢，每個行程各自mmap同一個檔案。"""
+    order = sorted(range(len(digests)), key=digests.__getitem__)
+    sorted_digests = [digests[i] for i in order]
+    if processes > 1 and len(digests) > chunk_size:
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_init_worker,
+            initargs=(index_path,),
+        ) as executor:
+            found = [
+                i
+                for chunk in executor.map(
+                    _check_chunk,
+                    (
+                        sorted_digests[i : i + chunk_size]
+                        for i in range(0, len(sorted_digests), chunk_size)
+                    ),
+                )
+                for i in chunk
+            ]
+    else:
+        with BreachIndex(index_path) as index:
+            found = [digest in index for digest in sorted_digests]
+    result = [False] * len(digests)
+    for i, is_found in zip(order, found):
+        result[i] = is_found
+    return result
+
+
+def check_accounts(
+    items: Iterable[tuple[str, list]],
+    index_path: str,
+    *,
+    processes: int = 1,
+) -> list[account_ref_type]:
+    """密碼出現在外洩資料中的帳號；相同的密碼只查詢一次"""
+    groups: dict[bytes, list[account_ref_type]] = {}
+    for app, app_datas in items:
+        if app == "trash_can":
+            continue
+        for app_data in app_datas:
+            pwd = app_data.get("pwd") or ""
+            if pwd == "":
+                continue
+            groups.setdefault(sha1_digest(pwd), []).append(
+                (app, app_data["acc"])
+            )
+    digests = list(groups)
+    found = check_digests(index_path, digests, processes=processes)
+    return [
+        account
+        for digest, is_found in zip(digests, found)
+        if is_found is True
+        for account in groups[digest]
+    ]
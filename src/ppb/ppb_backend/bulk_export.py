@@ -0,0 +1,92 @@
+import csv
+import json
+from collections.abc import Iterable, Iterator
+from typing import IO, Literal
+
+from .account_record import AccountRecord
+from .schema import SCHEMA_KEY, SCHEMA_VERSION
+
+export_record_type = dict[str, str]
+"""匯出紀錄：{"app": ..., "acc": ..., "pwd": ..., "note": ..., "user_note": ...}"""
+export_format_type = Literal["csv", "jsonl", "json"]
+
+EXPORT_FIELDS: tuple[str, ...] = ("app", "acc", "pwd", "note", "user_note")
+"""預設匯出的欄位"""
+
+
+def iter_records(
+    app_items: Iterable[tuple[str, list]],
+    fields: Iterable[str] = EXPORT_FIELDS,
+) -> Iterator[export_record_type]:
+    """把(應用程式, 帳號清單)展開成一筆一筆只含`fields`的紀錄"""
+    fields = tuple(fields)
+    for app, app_datas in app_items:
+        for app_data in app_datas:
+            yield {
+                field: app if field == "app" else app_data.get(field, "")
+                for field in fields
+            }
+
+
+def write_csv(
+    records: Iterable[export_record_type],
+    f: IO[str],
+    fields: Iterable[str] = EXPORT_FIELDS,
+) -> int:
+    writer = csv.DictWriter(f, fieldnames=list(fields))
+    writer.writeheader()
+    count = 0
+    for record in records:
+        writer.writerow(record)
+        count += 1
+    return count
+
+
+def write_jsonl(records: Iterable[export_record_type], f: IO[str]) -> int:
+    """JSON Lines：一行一筆紀錄"""
+    count = 0
+    for record in records:
+        f.write(json.dumps(record, ensure_ascii=False))
+        f.write("\n")
+        count += 1
+    return count
+
+
+def write_json(
+    app_items: Iterable[tuple[str, list]],
+    f: IO[str],
+    fields: Iterable[str] = EXPORT_FIELDS,
+    trash_can: list | None = None,
+) -> int:
+    """本專案的`data_type`格式，逐個應用程式寫出
+
+    輸出與儲存的檔案相同（含`SCHEMA_KEY`，欄位都已補齊），可以再以延遲載入讀取。
+    `SCHEMA_KEY`表示每筆都有全部欄位：不在`fields`的欄位寫成空字串。"""
+    fields = tuple(i for i in fields if i != "app")
+    record_fields = AccountRecord.FIELDS + tuple(
+        i for i in fields if i not in AccountRecord.FIELDS
+    )
+    count = 0
+    f.write("{\n    ")
+    f.write(f"{json.dumps(SCHEMA_KEY)}: {SCHEMA_VERSION},\n    ")
+    f.write('"trash_can": ')
+    f.write(_indent(json.dumps(trash_can or [], ensure_ascii=False, indent=4)))
+    for app, app_datas in app_items:
+        app_datas = [
+            {
+                field: app_data.get(field, "") if field in fields else ""
+                for field in record_fields
+            }
+            for app_data in app_datas
+        ]
+        f.write(",\n    ")
+        f.write(json.dumps(app, ensure_ascii=False))
+        f.write(": ")
+        f.write(_indent(json.dumps(app_datas, ensure_ascii=False, indent=4)))
+        count += len(app_datas)
+    f.write("\n}")
+    return count
+
+
+def _indent(text: str) -> str:
+    return text.replace("\n", "\n    ")
@@ -0,0 +1,172 @@
+import csv
+import io
+import json
+import os
+from collections.abc import Iterable, Iterator
+from typing import IO, Any, Literal
+from urllib.parse import urlsplit
+
+from .account_record import AccountRecord
+from .schema import RESERVED_APP_NAMES, SCHEMA_KEY
+
+import_record_type = dict[str, Any]
+"""匯入紀錄：{"app": ..., "acc": ..., "pwd": ..., "note": ..., "user_note": ...}"""
+bulk_items_type = list[tuple[str, AccountRecord]]
+"""驗證後的資料：[(應用程式, 帳號資料), ...]"""
+
+_FIELDS: tuple[str, ...] = ("acc", "pwd", "note", "user_note")
+
+_CSV_ALIASES: dict[str, tuple[str, ...]] = {
+    "app": ("app", "app_name", "name", "title"),
+    "acc": ("acc", "username", "login_username", "login name", "user"),
+    "pwd": ("pwd", "password", "login_password"),
+    "note": ("note", "url", "login_uri", "website"),
+    "user_note": ("user_note", "notes", "extra"),
+}
+"""常見密碼管理器CSV欄位名稱（小寫）
+- 本專案：app,acc,pwd,note,user_note
+- Bitwarden：name,notes,login_uri,login_username,login_password
+- Chrome/Edge：name,url,username,password(,note)
+- Firefox：url,username,password（沒有名稱，以網址主機名稱當作應用程式）
+- KeePassXC/1Password：Title,Username,Password,URL,Notes"""
+
+
+class BulkImportError(ValueError):
+    """匯入資料有錯誤；`errors`包含所有錯誤的列：[(列號, 訊息), ...]"""
+
+    def __init__(self, errors: list[tuple[int, str]]) -> None:
+        self.errors: list[tuple[int, str]] = errors
+        lines = [f"第{row}列：{msg}" for row, msg in errors[:20]]
+        if len(errors) > 20:
+            lines.append(f"...共{len(errors)}個錯誤")
+        super().__init__("\n".join(lines))
+
+
+def validate_records(
+    records: Iterable[import_record_type],
+) -> bulk_items_type:
+    """一次檢查所有紀錄；有錯誤時以`BulkImportError`一併回報"""
+    items: bulk_items_type = []
+    errors: list[tuple[int, str]] = []
+    for row, record in enumerate(records, start=1):
+        if type(record) is not dict:
+            errors.append((row, f"不是dict：{type(record).__name__}"))
+            continue
+        app = record.get("app")
+        if type(app) is not str or app == "":
+            errors.append((row, "缺少應用程式名稱（app）"))
+            continue
+        if app in RESERVED_APP_NAMES:
+            errors.append((row, f"「{app}」是保留名稱"))
+            continue
+        app_data: dict[str, str] = {}
+        for field in _FIELDS:
+            value = record.get(field, "")
+            if value is None:
+                value = ""
+            if type(value) is not str:
+                errors.append(
+                    (row, f"{field}不是str：{type(value).__name__}")
+                )
+                break
+            app_data[field] = value
+        else:
+            # 帳號可以是空的（沒有使用者名稱的登入、安全筆記）
+            items.append((app, AccountRecord(**app_data)))
+    if len(errors) > 0:
+        raise BulkImportError(errors)
+    return items
+
+
+def _find_column(header: list[str], field: str) -> str | None:
+    lower_header = {i.strip().lower(): i for i in header}
+    for alias in _CSV_ALIASES[field]:
+        if alias in lower_header:
+            return lower_header[alias]
+    return None
+
+
+def read_csv(f: IO[str]) -> Iterator[import_record_type]:
+    """讀取CSV，依欄位名稱對應常見密碼管理器的匯出格式"""
+    reader = csv.DictReader(f)
+    header = list(reader.fieldnames or [])
+    columns = {field: _find_column(header, field) for field in _CSV_ALIASES}
+    if "user_note" not in {i.strip().lower() for i in header}:
+        # 沒有user_note欄位時（如Chrome），`note`是使用者筆記
+        lower_header = {i.strip().lower(): i for i in header}
+        if "note" in lower_header:
+            columns["user_note"] = lower_header["note"]
+            columns["note"] = _find_column(
+                [i for i in header if i.strip().lower() != "note"], "note"
+            )
+    for row in reader:
+        record: import_record_type = {
+            field: (row.get(column) if column is not None else None)
+            for field, column in columns.items()
+        }
+        if record["app"] in (None, "") and record["note"]:
+            # Firefox沒有名稱欄位，以網址的主機名稱當作應用程式
+            hostname = urlsplit(record["note"]).hostname
+            record["app"] = record["note"] if hostname is None else hostname
+        yield record
+
+
+def read_json(f: IO[str]) -> Iterator[import_record_type]:
+    """讀取JSON：本專案的`data_type`、紀錄清單或Bitwarden匯出檔"""
+    data = json.load(f)
+    if type(data) is dict and type(data.get("items")) is list:
+        for item in data["items"]:
+            login = item.get("login") or {}
+            uris = login.get("uris") or []
+            yield {
+                "app": item.get("name"),
+                "acc": login.get("username"),
+                "pwd": login.get("password"),
+                "note": uris[0].get("uri") if len(uris) > 0 else "",
+                "user_note": item.get("notes"),
+            }
+    elif type(data) is dict:
+        for app, app_datas in data.items():
+            if app == "trash_can" or (
+                app == SCHEMA_KEY and type(app_datas) is int
+            ):
+                continue
+            if type(app_datas) is not list:
+                yield {"app": app, "acc": app_datas}
+                continue
+            for app_data in app_datas:
+                if type(app_data) is not dict:
+                    yield {"app": app, "acc": app_data}
+                    continue
+                record: import_record_type = {"app": app, **app_data}
+                if "usernote" in record and "user_note" not in record:
+                    record["user_note"] = record.pop("usernote")
+                yield record
+    elif type(data) is list:
+        yield from data
+    else:
+        raise TypeError()
+
+
+def read_import_file(
+    file_path_or_stream: str | IO[str],
+    file_format: Literal["auto", "csv", "json"] = "auto",
+) -> Iterator[import_record_type]:
+    if isinstance(file_path_or_stream, str):
+        if file_format == "auto":
+            ext = os.path.splitext(file_path_or_stream)[1].lower()
+            file_format = "csv" if ext == ".csv" else "json"
+        with open(
+            file_path_or_stream, "r", encoding="utf-8-sig", newline=""
+        ) as f:
+            yield from read_import_file(f, file_format)
+        return
+    f = file_path_or_stream
+    if file_format == "auto":
+        text = f.read()
+        file_format = "json" if text.lstrip()[:1] in ("{", "[") else "csv"
+        f = io.StringIO(text)
+    if file_format == "csv":
+        yield from read_csv(f)
+    else:
+        yield from read_json(f)
@@ -0,0 +1,100 @@
+import gzip
+import lzma
+import os
+import zlib
+from typing import Literal, Self
+
+compression_type = Literal["none", "gzip", "lzma", "zlib"]
+COMPRESSIONS: tuple[compression_type, ...] = ("none", "gzip", "lzma", "zlib")
+
+_GZIP_MAGIC: bytes = b"\x1f\x8b"
+_XZ_MAGIC: bytes = b"\xfd7zXZ\x00"
+_ZLIB_HEADERS: tuple[bytes, ...] = (b"\x78\x01", b"\x78\x5e", b"\x78\x9c", b"\x78\xda")
+"""zlib的CMF/FLG（預設視窗大小，各壓縮等級）；JSON檔案不會以`x`開頭"""
+
+
+def detect_compression(head: bytes) -> compression_type:
+    """以檔案開頭的magic bytes判斷壓縮格式"""
+    if head.startswith(_GZIP_MAGIC):
+        return "gzip"
+    elif head.startswith(_XZ_MAGIC):
+        return "lzma"
+    elif head[:2] in _ZLIB_HEADERS:
+        return "zlib"
+    else:
+        return "none"
+
+
+def file_compression(file_path: str) -> compression_type:
+    with open(file_path, "rb") as f:
+        return detect_compression(f.read(len(_XZ_MAGIC)))
+
+
+def read_file_bytes(file_path: str) -> tuple[bytes, compression_type]:
+    """讀出（解壓縮後的）檔案內容與壓縮格式"""
+    with open(file_path, "rb") as f:
+        content = f.read()
+    compression = detect_compression(content[: len(_XZ_MAGIC)])
+    if compression == "gzip":
+        content = gzip.decompress(content)
+    elif compression == "lzma":
+        content = lzma.decompress(content)
+    elif compression == "zlib":
+        content = zlib.decompress(content)
+    return content, compression
+
+
+class CompressedWriter:
+    """寫入文字的串流：累積到`chunk_size`後編碼、壓縮再寫入檔案
+
+    `write`只接受`str`；`close`寫出剩下的內容與壓縮格式的結尾並fsync。"""
+
+    chunk_size: int = 1 << 16
+
+    def __init__(
+        self, file_path: str, compression: compression_type = "none"
+    ) -> None:
+        if compression == "gzip":
+            self._compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        elif compression == "lzma":
+            self._compressor = lzma.LZMACompressor(format=lzma.FORMAT_XZ)
+        elif compression == "zlib":
+            self._compressor = zlib.compressobj(6)
+        else:
+            self._compressor = None
+        self._file = open(file_path, "wb")  # noqa: SIM115
+        self._chunks: list[str] = []
+        self._size: int = 0
+
+    def write(self, text: str) -> None:
+        self._chunks.append(text)
+        self._size += len(text)
+        if self._size >= self.chunk_size:
+            self._write_chunks()
+
+    def _write_chunks(self) -> None:
+        data = "".join(self._chunks).encode("utf-8")
+        self._chunks = []
+        self._size = 0
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        if len(data) > 0:
+            self._file.write(data)
+
+    def close(self) -> None:
+        if self._file.closed is True:
+            return
+        try:
+            self._write_chunks()
+            if self._compressor is not None:
+                self._file.write(self._compressor.flush())
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        finally:
+            self._file.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,207 @@
+from collections import Counter
+from collections.abc import Callable, Iterable
+
+from .account_record import AccountRecord
+from .search_index import normalize
+
+duplicate_type = list[tuple[str, str]]
+"""重複的帳號：[(應用程式, 帳號), ...]"""
+
+
+def canonical(text: str) -> str:
+    """比較用的key：NFKC正規化、case folding、去除前後空白，
+    中間連續的空白視為一個空白（"GitHub"、"github"、"ＧｉｔＨｕｂ "相同）"""
+    return " ".join(normalize(text).split())
+
+
+class DuplicateAccountError(ValueError):
+    """新增的帳號與現有的帳號重複（比較正規化後的應用程式與帳號）"""
+
+    def __init__(self, duplicates: duplicate_type) -> None:
+        super().__init__(
+            "、".join(f"「{app}」的「{acc}」" for app, acc in duplicates)
+        )
+        self.duplicates: duplicate_type = duplicates
+
+
+class DuplicateIndex:
+    """正規化後的應用程式/帳號 -> 實際的名稱，新增前以O(1)檢查重複
+
+    - 應用程式：{正規化的名稱: Counter(實際名稱: 帳號數)}，由應用程式名稱
+      與帳號數建立，延遲載入時不必解析帳號
+    - 帳號：第一次查詢某個（正規化的）應用程式時才建立它的帳號索引"""
+
+    def __init__(
+        self,
+        app_counts: Iterable[tuple[str, int]],
+        read_app: Callable[[str], list | None],
+    ) -> None:
+        """`read_app`：讀取應用程式的帳號清單（建立帳號索引時使用）"""
+        self._read_app = read_app
+        self._apps: dict[str, Counter[str]] = {}
+        self._accounts: dict[str, dict[str, duplicate_type]] = {}
+        for app, count in app_counts:
+            if app == "trash_can" or count <= 0:
+                continue
+            self._apps.setdefault(canonical(app), Counter())[app] += count
+
+    def app_variants(self, app: str) -> list[str]:
+        """正規化後相同的現有應用程式名稱"""
+        return list(self._apps.get(canonical(app), ()))
+
+    def find(self, app: str, acc: str) -> duplicate_type:
+        """正規化後相同的現有帳號（沒有帳號名稱的不視為重複）"""
+        app_key = canonical(app)
+        if app_key not in self._apps or canonical(acc) == "":
+            return []
+        return list(self._app_accounts(app_key).get(canonical(acc), ()))
+
+    def _app_accounts(self, app_key: str) -> dict[str, duplicate_type]:
+        accounts = self._accounts.get(app_key)
+        if accounts is None:
+            accounts = {}
+            for app in self._apps[app_key]:
+                for app_data in self._read_app(app) or ():
+                    accounts.setdefault(canonical(app_data["acc"]), []).append(
+                        (app, app_data["acc"])
+                    )
+            self._accounts[app_key] = accounts
+        return accounts
+
+    def add(self, app: str, app_data: dict[str, str]) -> None:
+        """在資料加入之後呼叫"""
+        app_key = canonical(app)
+        self._apps.setdefault(app_key, Counter())[app] += 1
+        accounts = self._accounts.get(app_key)
+        if accounts is not None:
+            accounts.setdefault(canonical(app_data["acc"]), []).append(
+                (app, app_data["acc"])
+            )
+
+    def remove(self, app: str, app_data: dict[str, str]) -> None:
+        """在資料移除之後呼叫"""
+        app_key = canonical(app)
+        variants = self._apps.get(app_key)
+        if variants is None:
+            return
+        variants[app] -= 1
+        if variants[app] <= 0:
+            del variants[app]
+        if len(variants) <= 0:
+            del self._apps[app_key]
+            self._accounts.pop(app_key, None)
+            return
+        accounts = self._accounts.get(app_key)
+        if accounts is None:
+            return
+        acc_key = canonical(app_data["acc"])
+        matches = accounts.get(acc_key)
+        if matches is not None and (app, app_data["acc"]) in matches:
+            matches.remove((app, app_data["acc"]))
+            if len(matches) <= 0:
+                del accounts[acc_key]
+
+
+class DedupePlan:
+    """`plan_dedupe`的結果：要移除、新增的帳號與無法合併的重複"""
+
+    __slots__ = ("added", "conflicts", "merged", "merged_apps", "removed")
+
+    def __init__(self) -> None:
+        self.removed: list[tuple[str, AccountRecord]] = []
+        """要刪除的帳號（合併或移到其他應用程式）"""
+        self.added: list[tuple[str, AccountRecord]] = []
+        """要新增的帳號（合併後的帳號、移過來的帳號）"""
+        self.merged_apps: dict[str, list[str]] = {}
+        """{保留的應用程式名稱: [併入它的其他名稱, ...]}"""
+        self.merged: list[tuple[str, AccountRecord, int]] = []
+        """(應用程式, 合併後的帳號, 合併前的筆數)"""
+        self.conflicts: list[list[tuple[str, AccountRecord]]] = []
+        """密碼不同、沒有合併的重複帳號（已移到保留的應用程式）"""
+
+    def __bool__(self) -> bool:
+        return len(self.removed) > 0
+
+    def __repr__(self) -> str:
+        return (
+            f"DedupePlan(merged_apps={self.merged_apps},"
+            f" merged={len(self.merged)}, conflicts={len(self.conflicts)})"
+        )
+
+
+def merge_records(app_datas: list[AccountRecord]) -> AccountRecord:
+    """合併重複的帳號：以第一筆為準，`note`、`user_note`保留全部不同的
+    內容（以換行分隔），其他欄位補上第一筆沒有的。回傳新的帳號，
+    不修改`app_datas`。"""
+    first = app_datas[0]
+    merged = AccountRecord.from_dict(
+        first.to_dict() if isinstance(first, AccountRecord) else first
+    )
+    for key in ("pwd", "note", "user_note"):
+        values = list(
+            dict.fromkeys(
+                i.get(key) or "" for i in app_datas if i.get(key) or ""
+            )
+        )
+        if key == "pwd":
+            merged[key] = values[0] if len(values) > 0 else ""
+        else:
+            merged[key] = "\n".join(values)
+    for app_data in app_datas[1:]:
+        for key, value in app_data.items():
+            if key not in merged:
+                merged[key] = value
+    return merged
+
+
+def plan_dedupe(items: Iterable[tuple[str, list]]) -> DedupePlan:
+    """掃描一次全部帳號，找出正規化後相同的應用程式與帳號
+
+    - 應用程式：併入帳號最多的名稱（相同時取先出現的）
+    - 帳號：密碼相同（或空白）的合併成一筆；密碼不同的不合併，
+      列在`conflicts`；沒有帳號名稱的（安全筆記等）不合併"""
+    groups: dict[
+        tuple[str, str | int], list[tuple[str, AccountRecord]]
+    ] = {}
+    app_counts: dict[str, Counter[str]] = {}
+    for app, app_datas in items:
+        if app == "trash_can":
+            continue
+        app_key = canonical(app)
+        app_counts.setdefault(app_key, Counter())[app] += len(app_datas)
+        for app_data in app_datas:
+            if isinstance(app_data, AccountRecord) is False:
+                app_data = AccountRecord.from_dict(app_data)
+            acc_key: str | int = canonical(app_data["acc"])
+            if acc_key == "":
+                acc_key = len(groups)
+            groups.setdefault((app_key, acc_key), []).append(
+                (app, app_data)
+            )
+    representative = {
+        app_key: counts.most_common(1)[0][0]
+        for app_key, counts in app_counts.items()
+    }
+    plan = DedupePlan()
+    for app_key, counts in app_counts.items():
+        others = [i for i in counts if i != representative[app_key]]
+        if len(others) > 0:
+            plan.merged_apps[representative[app_key]] = others
+    for (app_key, _), members in groups.items():
+        target = representative[app_key]
+        passwords = {i.get("pwd") or "" for _, i in members} - {""}
+        if len(members) > 1 and len(passwords) <= 1:
+            # 以保留的應用程式內的第一筆為準
+            members.sort(key=lambda i: i[0] != target)
+            merged = merge_records([i for _, i in members])
+            plan.removed.extend(members)
+            plan.added.append((target, merged))
+            plan.merged.append((target, merged, len(members)))
+            continue
+        if len(members) > 1:
+            plan.conflicts.append(members)
+        for app, app_data in members:
+            if app != target:
+                plan.removed.append((app, app_data))
+                plan.added.append((target, app_data))
+    return plan
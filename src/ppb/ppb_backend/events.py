@@ -0,0 +1,116 @@
+import logging
+from collections.abc import Callable, Iterable, Mapping
+from types import MappingProxyType
+from typing import Literal
+
+from .account_record import AccountRecord
+
+change_kind_type = Literal[
+    "inserted",
+    "deleted",
+    "trashed",
+    "restored",
+    "purged",
+    "updated",
+    "reloaded",
+]
+CHANGE_KINDS: tuple[str, ...] = (
+    "inserted",
+    "deleted",
+    "trashed",
+    "restored",
+    "purged",
+    "updated",
+    "reloaded",
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ChangeEvent:
+    """一次變更
+
+    - `items`：受影響的(應用程式, 帳號資料)；`updated`時為修改後的資料
+    - `old_items`：`updated`時修改前的資料
+    - `trash_ids`：`trashed`、`restored`、`purged`的`trash_id`
+    - `reloaded`：整本密碼本已重新載入/新建，沒有`items`
+
+    帳號資料以`MappingProxyType`包裝：與引擎共用同一個帳號物件，
+    訂閱者不能修改；需要修改時先`dict(app_data)`複製。"""
+
+    __slots__ = ("items", "kind", "old_items", "trash_ids")
+
+    def __init__(
+        self,
+        kind: change_kind_type,
+        items: Iterable[tuple[str, AccountRecord]] = (),
+        *,
+        old_items: Iterable[tuple[str, AccountRecord]] = (),
+        trash_ids: Iterable[int] = (),
+    ) -> None:
+        self.kind: change_kind_type = kind
+        self.items: tuple[tuple[str, Mapping[str, str]], ...] = tuple(
+            (app, MappingProxyType(app_data)) for app, app_data in items
+        )
+        self.old_items: tuple[tuple[str, Mapping[str, str]], ...] = tuple(
+            (app, MappingProxyType(app_data))
+            for app, app_data in old_items
+        )
+        self.trash_ids: tuple[int, ...] = tuple(trash_ids)
+
+    @property
+    def keys(self) -> list[tuple[str, str]]:
+        """受影響的(應用程式, 帳號)"""
+        return [(app, app_data["acc"]) for app, app_data in self.items]
+
+    @property
+    def apps(self) -> set[str]:
+        """受影響的應用程式（含`old_items`）"""
+        return {app for app, _ in self.items} | {
+            app for app, _ in self.old_items
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"ChangeEvent(kind={self.kind!r}, keys={self.keys!r},"
+            f" trash_ids={self.trash_ids!r})"
+        )
+
+
+change_callback_type = Callable[[ChangeEvent], None]
+
+
+class ChangeNotifier:
+    """訂閱/取消訂閱變更事件；事件在變更完成後同步送出"""
+
+    def __init__(self) -> None:
+        self._subscribers: dict[
+            int, tuple[change_callback_type, frozenset[str] | None]
+        ] = {}
+        self._next_token: int = 0
+
+    def subscribe(
+        self,
+        callback: change_callback_type,
+        kinds: Iterable[change_kind_type] | None = None,
+    ) -> int:
+        """回傳取消訂閱用的token；`kinds`：只接收這些事件（None：全部）"""
+        token = self._next_token
+        self._next_token += 1
+        self._subscribers[token] = (
+            callback,
+            None if kinds is None else frozenset(kinds),
+        )
+        return token
+
+    def unsubscribe(self, token: int) -> None:
+        del self._subscribers[token]
+
+    def emit(self, event: ChangeEvent) -> None:
+        """訂閱者的錯誤只記錄，不影響已完成的變更與其他訂閱者"""
+        for callback, kinds in list(self._subscribers.values()):
+            if kinds is None or event.kind in kinds:
+                try:
+                    callback(event)
+                except Exception:
+                    logger.exception(f"變更事件處理錯誤：{event!r}")
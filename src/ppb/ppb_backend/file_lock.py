@@ -0,0 +1,109 @@
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+class ConcurrentModificationError(RuntimeError):
+    """密碼本檔案已被其他程序修改，且無法（或不允許）合併"""
+
+
+class FileLock:
+    """資料檔旁的`.lock`檔：跨程序的建議鎖（advisory lock）與版本號
+
+    - `shared()`：讀取（載入）時使用，多個讀取者不互相阻擋
+    - `exclusive()`：寫入時使用，同時只有一個寫入者
+    - 版本號存在`.lock`檔內，每次寫入資料檔（或日誌）時加一；
+      與載入時記下的版本號不同，表示其他程序寫入過
+
+    只在讀寫檔案的期間持有鎖，編輯時不持有。`.lock`檔在第一次寫入時
+    才建立：還沒有`.lock`檔時讀取不加鎖（版本號為0），唯讀的指令不會
+    留下`.lock`檔。Windows的`msvcrt`沒有共享鎖，讀取也使用獨占鎖。"""
+
+    suffix: str = ".lock"
+
+    def __init__(self, data_file_path: str) -> None:
+        self.data_file_path: str = os.path.abspath(data_file_path)
+        self.lock_file_path: str = self.data_file_path + self.suffix
+        self._fd: int | None = None
+        self._held: bool = False
+
+    @contextmanager
+    def shared(self) -> Iterator["FileLock"]:
+        with self._locked(False):
+            yield self
+
+    @contextmanager
+    def exclusive(self) -> Iterator["FileLock"]:
+        with self._locked(True):
+            yield self
+
+    @contextmanager
+    def _locked(self, exclusive: bool) -> Iterator[None]:
+        if self._held is True:
+            # 同一個程序內已持有（例如合併時重新載入）
+            yield
+            return
+        try:
+            fd = os.open(
+                self.lock_file_path,
+                os.O_RDWR | os.O_CREAT if exclusive is True else os.O_RDWR,
+                0o600,
+            )
+        except FileNotFoundError:
+            # 還沒有寫入者建立`.lock`檔
+            self._held = True
+            try:
+                yield
+            finally:
+                self._held = False
+            return
+        try:
+            if os.name == "nt":
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            else:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            self._fd = fd
+            self._held = True
+            try:
+                yield
+            finally:
+                self._fd = None
+                self._held = False
+                if os.name == "nt":
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+                else:
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    def read_version(self) -> int:
+        """目前的版本號（需持有鎖；沒有紀錄時為0）"""
+        if self._held is False:
+            raise RuntimeError()
+        if self._fd is None:
+            return 0
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        content = os.read(self._fd, 32).strip()
+        try:
+            return int(content) if len(content) > 0 else 0
+        except ValueError:
+            return 0
+
+    def write_version(self, version: int) -> None:
+        """寫入新的版本號（需持有獨占鎖）
+
+        在取代資料檔之前寫入：中途當機時只會讓其他程序多合併一次，
+        不會漏掉變更。"""
+        if self._fd is None:
+            raise RuntimeError()
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        os.ftruncate(self._fd, 0)
+        os.write(self._fd, str(version).encode("ascii"))
+        os.fsync(self._fd)
@@ -0,0 +1,113 @@
+import json
+import os
+from collections.abc import Iterator
+from typing import Any
+
+from .account_record import record_to_json
+
+journal_record_type = dict[str, Any]
+"""日誌紀錄格式
+例：
+{"op": "insert", "app": "app", "data": {"acc": "...", "pwd": "...", ...}}
+{"op": "insert_bulk", "items": [["app", {"acc": "...", ...}], ...]}
+{"op": "update", "app": "app", "acc": "acc", "changes": {"pwd": "..."}}
+{"op": "delete", "app": "app", "acc": "acc"}
+{"op": "trash", "app": "app", "acc": "acc", "trash_id": "0", "deleted_at": "..."}
+{"op": "restore", "trash_id": 0}
+{"op": "purge", "trash_ids": [0, 1]}"""
+
+
+class PasswordBookJournal:
+    """`password_data.json`旁的追加式日誌（write-ahead journal）
+
+    第一行是標頭，紀錄日誌所對應的主檔案（大小、修改時間），
+    主檔案被重寫後舊日誌就不會再被重播。"""
+
+    suffix: str = ".journal"
+
+    def __init__(self, data_file_path: str) -> None:
+        self.data_file_path: str = os.path.abspath(data_file_path)
+        self.journal_file_path: str = self.data_file_path + self.suffix
+        self.record_count: int = 0
+        self._file = None
+
+    def _base_stamp(self) -> dict[str, int]:
+        stat = os.stat(self.data_file_path)
+        return {"base_size": stat.st_size, "base_mtime_ns": stat.st_mtime_ns}
+
+    def reset(self) -> None:
+        """主檔案寫入完成後呼叫：以新標頭開始一份空日誌"""
+        self.close()
+        # 多個程序可能同時（持有共享鎖）重設過期的日誌
+        tmp_path = f"{self.journal_file_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"op": "header", **self._base_stamp()}))
+            f.write("\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_file_path)
+        self.record_count = 0
+
+    def append(self, record: journal_record_type) -> None:
+        if self._file is None:
+            if os.path.isfile(self.journal_file_path) is False:
+                self.reset()
+            self._file = open(  # noqa: SIM115
+                self.journal_file_path, "a", encoding="utf-8"
+            )
+        self._file.write(
+            json.dumps(record, ensure_ascii=False, default=record_to_json)
+        )
+        self._file.write("\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.record_count += 1
+
+    def replay(self) -> Iterator[journal_record_type]:
+        """讀出仍然有效的紀錄
+
+        標頭與主檔案不符時視為過期並重設日誌；
+        最後一行寫到一半（當機）時截掉該行。"""
+        self.record_count = 0
+        if os.path.isfile(self.journal_file_path) is False:
+            return
+        with open(self.journal_file_path, "rb") as f:
+            lines = f.readlines()
+        try:
+            header = json.loads(lines[0])
+        except (IndexError, json.JSONDecodeError):
+            header = {}
+        base_stamp = self._base_stamp()
+        if (
+            header.get("op") != "header"
+            or header.get("base_size") != base_stamp["base_size"]
+            or header.get("base_mtime_ns") != base_stamp["base_mtime_ns"]
+        ):
+            self.reset()
+            return
+        valid_size = len(lines[0])
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                break
+            if line.endswith(b"\n") is False:
+                break
+            valid_size += len(line)
+            self.record_count += 1
+            yield record
+        if valid_size < os.path.getsize(self.journal_file_path):
+            with open(self.journal_file_path, "r+b") as f:
+                f.truncate(valid_size)
+                os.fsync(f.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def remove(self) -> None:
+        self.close()
+        if os.path.isfile(self.journal_file_path) is True:
+            os.remove(self.journal_file_path)
+        self.record_count = 0
@@ -0,0 +1,854 @@
+import bisect
+import json
+import os
+import sys
+import time
+from array import array
+from contextlib import AbstractContextManager, nullcontext
+from typing import Literal
+
+from .account_record import AccountRecord
+from .binary_format import (
+    binary_schema_version,
+    dump_binary,
+    is_binary_file,
+    lazy_load_binary,
+    load_binary,
+)
+from .compression import (
+    CompressedWriter,
+    compression_type,
+    file_compression,
+    read_file_bytes,
+)
+from .file_lock import ConcurrentModificationError, FileLock
+from .journal import PasswordBookJournal, journal_record_type
+from .lazy_data import LazyAppDict, dump_json, lazy_load
+from .schema import (
+    SCHEMA_VERSION,
+    check_app_name,
+    normalize_record,
+    normalize_trash_entry,
+    pop_schema_version,
+)
+from .sharded_format import (
+    DEFAULT_SHARD_COUNT,
+    ShardedPasswordBook,
+    dump_sharded,
+    is_sharded_file,
+    lazy_load_sharded,
+    remove_files,
+    remove_shards,
+)
+from .snapshot import PasswordBookSnapshot
+from .storage_engine import StorageEngine, data_type
+from .trash_can import (
+    TrashCan,
+    entry_deleted_at,
+    entry_to_record,
+    trash_entry_type,
+)
+
+index_type = dict[str, dict[str, list[int]]]
+"""索引格式：{app: {acc: [編號, ...]}}，編號由小到大
+
+每個帳號有一個應用程式內遞增的編號，`_slots[app]`依`_data[app]`的順序
+存放編號，帳號的位置是編號在`_slots[app]`中的位置（二分搜尋）。刪除時
+兩個清單各刪一格，其他帳號的編號不變，不必更新索引，且保持順序。
+刪除一格仍要搬移後面的元素（O(n)，C層級的memmove，只搬指標/整數），
+但不再需要以Python逐一更新後面帳號的索引。"""
+
+
+class JsonStorageEngine(StorageEngine):
+    """資料放在記憶體內的`data_type`，存成JSON（或二進位格式）檔案"""
+
+    name: str = "json"
+    _data: data_type
+    _index: index_type
+    _slots: dict[str, array]
+    _trash_can: TrashCan
+    _data_shared: bool
+    """`_data`與快照共用，修改前要先複製"""
+    _owned_apps: set[str] | None
+    """建立快照後已複製過（可以直接修改）的應用程式；None：沒有快照"""
+    _pending_ops: list[journal_record_type]
+    """尚未寫入檔案的變更（格式同日誌），其他程序寫入過檔案時用來合併"""
+    _disk_schema_version: int
+    """檔案內帳號資料的schema版本；比`SCHEMA_VERSION`舊時，載入時已正規化，
+    下次儲存要重寫整個檔案"""
+    _shards: ShardedPasswordBook | None
+    """載入/寫入的分片格式檔案（儲存到同一個檔案時只重寫變更過的分片）"""
+    _dirty_apps: set[str] | None
+    """與`_shards`不同的應用程式；None：不追蹤（全部重寫）"""
+
+    def __init__(
+        self,
+        *,
+        journal_mode: bool = False,
+        journal_compact_threshold: int = 1000,
+        save_coalesce_window: float = 0.0,
+        lazy_load: bool = False,
+        file_format: Literal["auto", "json", "binary", "sharded"] = "auto",
+        shard_count: int = DEFAULT_SHARD_COUNT,
+        json_indent: int | None = 4,
+        compression: Literal["auto", "none", "gzip", "lzma", "zlib"] = "auto",
+        file_lock: bool = True,
+        on_conflict: Literal["merge", "reject"] = "merge",
+    ) -> None:
+        """`json_indent`：JSON格式的縮排，None為沒有空白的緊湊格式（較小、
+        較快，但延遲載入時需要整個解析）
+        `compression`：JSON格式以gzip/lzma/zlib壓縮（auto：沿用載入的檔案）；
+        載入時依檔案開頭的magic bytes自動解壓縮
+
+        `file_format="sharded"`：manifest加上分片檔案（見
+        `ShardedPasswordBook`），儲存時只重寫變更過的分片，延遲載入時
+        只讀取用到的分片；`shard_count`是第一次以分片格式儲存時的分片數
+
+        `file_lock`：以`.lock`檔協調多個程序（見`FileLock`）
+        `on_conflict`：寫入時發現檔案已被其他程序修改的處理方式
+
+        - merge：重新載入檔案，再套用自己尚未寫入的變更（同一筆帳號
+          已被對方刪除等無法套用時，引發`ConcurrentModificationError`）
+        - reject：引發`ConcurrentModificationError`，不寫入"""
+        self.journal_mode: bool = journal_mode
+        self.journal_compact_threshold: int = journal_compact_threshold
+        self.save_coalesce_window: float = save_coalesce_window
+        self.lazy_load: bool = lazy_load
+        self.file_format: Literal["auto", "json", "binary", "sharded"] = (
+            file_format
+        )
+        self.shard_count: int = shard_count
+        self.json_indent: int | None = json_indent
+        self.compression: Literal[
+            "auto", "none", "gzip", "lzma", "zlib"
+        ] = compression
+        self._loaded_compression: compression_type = "none"
+        self._loaded_format: Literal["json", "binary", "sharded"] = "json"
+        self._journal: PasswordBookJournal | None = None
+        self._generation: int = 0
+        self._saved_generation: int = 0
+        self._saved_file_path: str | None = None
+        self._last_commit_time: float = 0.0
+        self._save_pending_path: str | None = None
+        self.use_file_lock: bool = file_lock
+        self.on_conflict: Literal["merge", "reject"] = on_conflict
+        self._file_lock: FileLock | None = None
+        self._disk_version: int = 0
+        self._pending_ops = []
+        self._shards = None
+        self._dirty_apps = None
+
+    def new(self) -> None:
+        self._release_data()
+        self._loaded_format = "json"
+        self._loaded_compression = "none"
+        self._shards = None
+        self._dirty_apps = None
+        self._disk_schema_version = SCHEMA_VERSION
+        self._data = {"trash_can": []}
+        self._index_rebuild()
+        self._journal_bind(None)
+        self._lock_bind(None)
+        self._mark_saved(None)
+
+    def load(self, file_path: str) -> None:
+        """持有共享鎖讀取主檔案與日誌，並記下當時的版本號"""
+        self._release_data()
+        self._lock_bind(file_path)
+        with self._locked(shared=True):
+            self._load_file(file_path)
+            if self._file_lock is not None:
+                self._disk_version = self._file_lock.read_version()
+        self._mark_saved(file_path)
+        if self._disk_schema_version < SCHEMA_VERSION:
+            self._generation += 1
+
+    def _load_file(self, file_path: str) -> None:
+        file_data: dict | None = None
+        self._shards = None
+        self._dirty_apps = None
+        # 壓縮只用於JSON格式
+        self._loaded_compression = file_compression(file_path)
+        compressed = self._loaded_compression != "none"
+        if compressed is False and is_binary_file(file_path) is True:
+            self._loaded_format = "binary"
+            self._disk_schema_version = binary_schema_version(file_path)
+            if self.lazy_load is True:
+                file_data = lazy_load_binary(file_path, self._adopt_app)
+            else:
+                file_data = load_binary(file_path)
+        elif compressed is False and is_sharded_file(file_path) is True:
+            self._loaded_format = "sharded"
+            self._shards = ShardedPasswordBook(file_path)
+            self._dirty_apps = set()
+            self._disk_schema_version = self._shards.schema_version
+            if self.lazy_load is True:
+                file_data = lazy_load_sharded(self._shards, self._adopt_app)
+            else:
+                file_data = self._shards.to_dict()
+        else:
+            self._loaded_format = "json"
+            if self.lazy_load is True:
+                file_data = lazy_load(file_path, self._adopt_app)
+        if file_data is None:
+            file_data = json.loads(read_file_bytes(file_path)[0])
+            if type(file_data) is not dict:
+                raise TypeError()
+        if self._loaded_format == "json":
+            self._disk_schema_version = pop_schema_version(file_data)
+        # for i in file_data.keys():
+        # if type(i) is not str or type(file_data[i]) is not list:
+        # raise TypeError()
+        self._data = file_data
+        self._index_rebuild()
+        if self._disk_schema_version < SCHEMA_VERSION:
+            self._migrate_schema()
+        self._journal_bind(file_path)
+        if self._journal is not None:
+            self._replay(self._journal.replay())
+        elif os.path.isfile(file_path + PasswordBookJournal.suffix) is True:
+            # 其他程序（日誌模式）留下的日誌也要重播，否則會漏掉它的變更
+            journal = PasswordBookJournal(file_path)
+            self._replay(journal.replay())
+            journal.close()
+
+    def _migrate_schema(self) -> None:
+        """舊版本的檔案：一次正規化全部帳號（延遲載入也先全部解析），
+        之後的顯示、搜尋不必再檢查欄位"""
+        if isinstance(self._data, LazyAppDict):
+            for _ in self._data.values():
+                pass
+            self._data.detach()
+        for entry in self._trash_can.entries:
+            normalize_trash_entry(entry)
+        self._dirty_apps = None
+
+    def save(self, file_path: str, force: bool = False) -> None:
+        """儲存到檔案
+
+        - 沒有變更（已儲存到同一個檔案）時略過。
+        - 距離上次寫入不到`save_coalesce_window`秒時只記下請求，
+          由之後的儲存或`flush`合併成一次寫入；`force=True`忽略合併視窗。
+        - 日誌模式下，若儲存到已綁定的檔案且日誌尚未達到壓縮門檻，
+          變更早已寫入日誌，不必重寫整個檔案。
+        - 檔案在載入後被其他程序寫入過時，依`on_conflict`合併或拒絕。"""
+        file_path = os.path.abspath(file_path)
+        if (
+            self._journal is not None
+            and self._journal.data_file_path == file_path
+            and len(self._pending_ops) <= 0
+            and self._disk_schema_version >= SCHEMA_VERSION
+        ):
+            if self._journal.record_count < self.journal_compact_threshold:
+                self._save_pending_path = None
+                self._mark_saved(file_path)
+                return
+        elif self.is_dirty(file_path) is False:
+            self._save_pending_path = None
+            return
+        if (
+            force is False
+            and time.monotonic() - self._last_commit_time
+            < self.save_coalesce_window
+        ):
+            self._save_pending_path = file_path
+            return
+        self._save_full(file_path)
+
+    def flush(self) -> None:
+        """立即寫入被合併視窗延後的儲存"""
+        if self._save_pending_path is not None:
+            self.save(self._save_pending_path, force=True)
+
+    def is_dirty(self, file_path: str | None = None) -> bool:
+        if self._generation != self._saved_generation:
+            return True
+        elif file_path is not None:
+            return self._saved_file_path != os.path.abspath(file_path)
+        else:
+            return False
+
+    def compact(self) -> None:
+        """日誌模式：把日誌合併回主檔案"""
+        if self._journal is not None:
+            self._save_full(self._journal.data_file_path)
+
+    def _save_full(self, file_path: str) -> None:
+        """持有獨占鎖：檢查版本號（需要時先合併）、寫入暫存檔、fsync後
+        再以原子操作取代目標檔案
+
+        儲存到其他檔案（另存新檔）視為明確的覆寫，不檢查對方的版本號。"""
+        file_path = os.path.abspath(file_path)
+        if (
+            self._file_lock is None
+            or self._file_lock.data_file_path != file_path
+        ):
+            self._lock_bind(file_path)
+            check_version = False
+        else:
+            check_version = True
+        with self._locked(shared=False):
+            if check_version is True:
+                self._check_disk_version()
+            self._bump_disk_version()
+            self._write_file(file_path)
+        self._pending_ops.clear()
+        self._save_pending_path = None
+        self._last_commit_time = time.monotonic()
+        self._mark_saved(file_path)
+
+    def _write_file(self, file_path: str) -> None:
+        tmp_path = file_path + ".tmp"
+        self._release_data(keep_data=True)
+        save_format = self._save_format()
+        superseded: list[str] = []
+        if save_format == "sharded":
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                self._shards, superseded = dump_sharded(
+                    self._data,
+                    f,
+                    file_path,
+                    SCHEMA_VERSION,
+                    base=self._shards,
+                    dirty_apps=self._dirty_apps,
+                    shard_count=self.shard_count,
+                )
+                f.flush()
+                os.fsync(f.fileno())
+        elif save_format == "binary":
+            with open(tmp_path, "wb") as f:
+                dump_binary(self._data, f, SCHEMA_VERSION)
+                f.flush()
+                os.fsync(f.fileno())
+        else:
+            with CompressedWriter(tmp_path, self._save_compression()) as f:
+                dump_json(
+                    self._data, f, SCHEMA_VERSION, indent=self.json_indent
+                )
+        os.replace(tmp_path, file_path)
+        if os.name == "posix":
+            dir_fd = os.open(os.path.dirname(file_path), os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        if save_format == "sharded":
+            remove_files(superseded)
+            self._dirty_apps = set()
+        elif (
+            self._shards is not None
+            and self._shards.file_path == file_path
+        ):
+            # 分片格式的檔案被單一檔案取代（延遲載入的部分已在上面讀出）
+            remove_shards(file_path)
+            self._shards = None
+            self._dirty_apps = None
+        self._disk_schema_version = SCHEMA_VERSION
+        self._journal_bind(file_path)
+        if self._journal is not None:
+            self._journal.reset()
+
+    def _save_format(self) -> Literal["json", "binary", "sharded"]:
+        """`file_format="auto"`時沿用載入時的格式"""
+        if self.file_format == "auto":
+            return self._loaded_format
+        else:
+            return self.file_format
+
+    def _save_compression(self) -> compression_type:
+        """`compression="auto"`時沿用載入時的壓縮格式"""
+        if self.compression == "auto":
+            return self._loaded_compression
+        else:
+            return self.compression
+
+    def _release_data(self, keep_data: bool = False) -> None:
+        """釋放`mmap`，才能取代或重新載入檔案
+
+        `keep_data=True`時先解析全部應用程式（儲存時使用）。"""
+        data = getattr(self, "_data", None)
+        if isinstance(data, LazyAppDict):
+            if keep_data is True:
+                data.detach()
+            else:
+                data.close()
+
+    def _mark_saved(self, file_path: str | None) -> None:
+        self._saved_generation = self._generation
+        self._saved_file_path = (
+            None if file_path is None else os.path.abspath(file_path)
+        )
+
+    def insert(self, app: str, app_data: dict[str, str]) -> None:
+        app_data = AccountRecord.from_dict(app_data)
+        self._apply_insert(app, app_data)
+        self._generation += 1
+        self._record_op({"op": "insert", "app": app, "data": app_data})
+
+    def insert_bulk(self, items: list[tuple[str, dict[str, str]]]) -> None:
+        """日誌模式下整批只寫一筆日誌（一次fsync）"""
+        items = [(app, AccountRecord.from_dict(i)) for app, i in items]
+        for app, app_data in items:
+            self._apply_insert(app, app_data)
+        self._generation += 1
+        self._record_op({"op": "insert_bulk", "items": items})
+
+    def _apply_insert(self, app: str, app_data: AccountRecord) -> None:
+        check_app_name(app)
+        app_datas = self._writable_app(app)
+        if app_datas is None:
+            app_datas = []
+            self._data[sys.intern(app)] = app_datas
+            if self._owned_apps is not None:
+                self._owned_apps.add(app)
+        app_datas.append(app_data)
+        slots = self._slots.get(app)
+        if slots is None:
+            slots = array("q")
+            self._slots[app] = slots
+        slot = slots[-1] + 1 if len(slots) > 0 else 0
+        slots.append(slot)
+        self._index_add(app, app_data["acc"], slot)
+
+    def update(
+        self, app: str, acc: str, changes: dict[str, str]
+    ) -> tuple[AccountRecord, AccountRecord]:
+        old_data, new_data = self._apply_update(app, acc, changes)
+        self._generation += 1
+        self._record_op(
+            {"op": "update", "app": app, "acc": acc, "changes": changes}
+        )
+        return old_data, new_data
+
+    def _apply_update(
+        self, app: str, acc: str, changes: dict[str, str]
+    ) -> tuple[AccountRecord, AccountRecord]:
+        """以新的`AccountRecord`取代（快照內的舊資料不變）"""
+        app_index = self._app_index(app)
+        if app_index is None or acc not in app_index:
+            raise IndexError()
+        slot = app_index[acc][0]
+        app_datas = self._writable_app(app)
+        if app_datas is None:
+            raise IndexError()
+        position = self._position(app, slot)
+        old_data = app_datas[position]
+        new_data = AccountRecord.from_dict({**old_data.to_dict(), **changes})
+        app_datas[position] = new_data
+        if new_data["acc"] != acc:
+            slots = app_index[acc]
+            slots.remove(slot)
+            if len(slots) <= 0:
+                del app_index[acc]
+            self._index_add(app, new_data["acc"], slot)
+        return old_data, new_data
+
+    def delete(self, app: str, acc: str) -> dict[str, str]:
+        app_data = self._apply_delete(app, acc)
+        self._generation += 1
+        self._record_op({"op": "delete", "app": app, "acc": acc})
+        return app_data
+
+    def _apply_delete(self, app: str, acc: str) -> dict[str, str]:
+        app_index = self._app_index(app)
+        if app_index is None:
+            raise IndexError()
+        slots = app_index.get(acc)
+        if slots is None:
+            raise IndexError()
+        return self._index_remove(app, acc, slots[0])
+
+    def move_to_trash_can(
+        self, app: str, acc: str
+    ) -> tuple[int, AccountRecord]:
+        app_data, entry = self._apply_move_to_trash_can(app, acc)
+        self._generation += 1
+        self._record_op(
+            {
+                "op": "trash",
+                "app": app,
+                "acc": acc,
+                "trash_id": entry["trash_id"],
+                "deleted_at": entry["deleted_at"],
+            }
+        )
+        return int(entry["trash_id"]), app_data
+
+    def _apply_move_to_trash_can(
+        self,
+        app: str,
+        acc: str,
+        trash_id: int | None = None,
+        deleted_at: float | None = None,
+    ) -> tuple[AccountRecord, trash_entry_type]:
+        app_index = self._app_index(app)
+        if app_index is None:
+            raise KeyError()
+        elif acc not in app_index:
+            raise IndexError()
+        app_data = self._index_remove(app, acc, app_index[acc][0])
+        self._writable_app("trash_can")
+        entry = self._trash_can.add(
+            app, app_data.to_dict(), trash_id=trash_id, deleted_at=deleted_at
+        )
+        return app_data, entry
+
+    def restore_from_trash_can(
+        self, trash_id: int
+    ) -> tuple[str, AccountRecord]:
+        app, app_data = self._apply_restore(trash_id)
+        self._generation += 1
+        self._record_op({"op": "restore", "trash_id": trash_id})
+        return app, app_data
+
+    def _apply_restore(self, trash_id: int) -> tuple[str, AccountRecord]:
+        if trash_id not in self._trash_can:
+            raise KeyError()
+        self._writable_app("trash_can")
+        app, app_data = entry_to_record(self._trash_can.pop(trash_id))
+        self._apply_insert(app, app_data)
+        return app, app_data
+
+    def purge_trash_can(self, before: float) -> list[int]:
+        trash_ids = self._trash_can.expired(before)
+        if len(trash_ids) <= 0:
+            return trash_ids
+        self._apply_purge(trash_ids)
+        self._generation += 1
+        self._record_op({"op": "purge", "trash_ids": trash_ids})
+        return trash_ids
+
+    def _apply_purge(self, trash_ids: list[int]) -> None:
+        self._writable_app("trash_can")
+        self._trash_can.remove_many(trash_ids)
+
+    def trash_can_items(self) -> list[trash_entry_type]:
+        return list(self._trash_can.entries)
+
+    def exists(self, app: str, acc: str | None = None) -> bool:
+        app_index = self._app_index(app)
+        if app_index is None:
+            return False
+        elif acc is None:
+            return True
+        else:
+            return acc in app_index
+
+    def count(self, app: str) -> int:
+        if app == "trash_can" or app not in self._data:
+            return 0
+        elif isinstance(self._data, LazyAppDict):
+            return self._data.app_len(app)
+        else:
+            return len(self._data[app])
+
+    def search(self, app: str) -> list | None:
+        """回傳複製的帳號清單（修改它不影響引擎的資料與索引）"""
+        if self._app_index(app) is not None:
+            return [i.copy() for i in self._data[app]]
+        else:
+            return None
+
+    def get_data(self) -> dict:
+        return self._data
+
+    def snapshot(self) -> PasswordBookSnapshot:
+        """O(1)：之後的變更先複製被修改的部分（copy-on-write）
+
+        二進位格式延遲載入時先解析全部並釋放`mmap`，快照才不會在儲存時失效。"""
+        if isinstance(self._data, LazyAppDict) and self._data.is_mapped():
+            self._data.detach()
+        self._data_shared = True
+        self._owned_apps = set()
+        return PasswordBookSnapshot(self._data)
+
+    def _writable_app(self, app: str) -> list | None:
+        """取得可以直接修改的帳號清單（與快照共用時先複製）"""
+        if self._data_shared is True:
+            self._data = self._data.copy()
+            self._data_shared = False
+        if self._dirty_apps is not None:
+            self._dirty_apps.add(app)
+        app_datas = self._data.get(app)
+        if (
+            app_datas is None
+            or self._owned_apps is None
+            or app in self._owned_apps
+        ):
+            return app_datas
+        app_datas = list(app_datas)
+        self._data[app] = app_datas
+        self._owned_apps.add(app)
+        if app == "trash_can":
+            self._trash_can.entries = app_datas
+        return app_datas
+
+    def close(self) -> None:
+        self._release_data()
+        if self._journal is not None:
+            self._journal.close()
+
+    def _journal_bind(self, file_path: str | None) -> None:
+        """日誌模式：把日誌綁定到目前的資料檔"""
+        if self._journal is not None:
+            if (
+                file_path is not None
+                and self._journal.data_file_path
+                == os.path.abspath(file_path)
+            ):
+                return
+            self._journal.close()
+            self._journal = None
+        if self.journal_mode is True and file_path is not None:
+            self._journal = PasswordBookJournal(file_path)
+
+    def _lock_bind(self, file_path: str | None) -> None:
+        """把`.lock`檔綁定到目前的資料檔（新的資料檔從版本號0開始比較）"""
+        if self.use_file_lock is True and file_path is not None:
+            self._file_lock = FileLock(file_path)
+        else:
+            self._file_lock = None
+        self._disk_version = 0
+        self._pending_ops = []
+
+    def _locked(self, shared: bool) -> AbstractContextManager:
+        if self._file_lock is None:
+            return nullcontext()
+        elif shared is True:
+            return self._file_lock.shared()
+        else:
+            return self._file_lock.exclusive()
+
+    def _bump_disk_version(self) -> None:
+        """持有獨占鎖時呼叫"""
+        if self._file_lock is not None:
+            self._disk_version = self._file_lock.read_version() + 1
+            self._file_lock.write_version(self._disk_version)
+
+    def _check_disk_version(self) -> None:
+        """持有獨占鎖時呼叫：檔案被其他程序修改過時合併或拒絕"""
+        if self._file_lock is None:
+            return
+        disk_version = self._file_lock.read_version()
+        if disk_version == self._disk_version:
+            return
+        if self.on_conflict == "reject":
+            raise ConcurrentModificationError()
+        self._merge_from_disk(self._file_lock.data_file_path)
+        self._disk_version = disk_version
+
+    def _merge_from_disk(self, file_path: str) -> None:
+        """重新載入其他程序寫入的檔案，再套用自己尚未寫入的變更
+
+        在另一個引擎上進行，失敗時目前的資料不變。成功後`trash_id`
+        可能改變（與對方的垃圾桶衝突時），並呼叫`on_merge`。"""
+        other = JsonStorageEngine(
+            journal_mode=self.journal_mode,
+            journal_compact_threshold=self.journal_compact_threshold,
+            file_format=self.file_format,
+            shard_count=self.shard_count,
+            json_indent=self.json_indent,
+            compression=self.compression,
+            file_lock=False,
+        )
+        if os.path.isfile(file_path) is True:
+            other._load_file(file_path)
+        else:
+            other.new()
+        pending_ops = other._rebase(self._pending_ops)
+        self._release_data()
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = other._journal
+        self._loaded_format = other._loaded_format
+        self._loaded_compression = other._loaded_compression
+        self._disk_schema_version = other._disk_schema_version
+        self._shards = other._shards
+        self._dirty_apps = other._dirty_apps
+        self._data = other._data
+        self._index = other._index
+        self._slots = other._slots
+        self._trash_can = other._trash_can
+        self._data_shared = False
+        self._owned_apps = None
+        self._pending_ops = pending_ops
+        self._generation += 1
+        if self.on_merge is not None:
+            self.on_merge()
+
+    def _rebase(
+        self, ops: list[journal_record_type]
+    ) -> list[journal_record_type]:
+        """套用其他引擎的變更，回傳實際套用的變更（`trash_id`已重新對應）"""
+        trash_id_map: dict[int, int] = {}
+        rebased_ops: list[journal_record_type] = []
+        for op in ops:
+            op = dict(op)
+            try:
+                match op["op"]:
+                    case "trash" if int(op["trash_id"]) in self._trash_can:
+                        _, entry = self._apply_move_to_trash_can(
+                            op["app"], op["acc"], None, entry_deleted_at(op)
+                        )
+                        trash_id_map[int(op["trash_id"])] = int(
+                            entry["trash_id"]
+                        )
+                        op["trash_id"] = entry["trash_id"]
+                    case "restore":
+                        op["trash_id"] = trash_id_map.get(
+                            op["trash_id"], op["trash_id"]
+                        )
+                        self._replay([op])
+                    case "purge":
+                        op["trash_ids"] = [
+                            trash_id_map.get(i, i) for i in op["trash_ids"]
+                        ]
+                        self._replay([op])
+                    case _:
+                        self._replay([op])
+            except (IndexError, KeyError):
+                raise ConcurrentModificationError()
+            rebased_ops.append(op)
+        return rebased_ops
+
+    def _record_op(self, record: journal_record_type) -> None:
+        """記錄一個已套用的變更
+
+        日誌模式：持有獨占鎖，檢查版本號後立即寫入日誌；
+        否則留到儲存時（其他程序寫入過檔案時用來合併）。"""
+        if self._file_lock is None:
+            if self._journal is not None:
+                self._journal.append(record)
+            return
+        self._pending_ops.append(record)
+        if self._journal is not None:
+            with self._file_lock.exclusive():
+                self._check_disk_version()
+                self._bump_disk_version()
+                for pending_op in self._pending_ops:
+                    self._journal.append(pending_op)
+            self._pending_ops.clear()
+
+    def _replay(self, records) -> None:
+        """套用日誌紀錄（載入時重播日誌、合併時套用自己的變更）"""
+        for record in records:
+            match record["op"]:
+                case "insert":
+                    self._apply_insert(
+                        record["app"], AccountRecord.from_dict(record["data"])
+                    )
+                case "insert_bulk":
+                    for app, app_data in record["items"]:
+                        self._apply_insert(
+                            app, AccountRecord.from_dict(app_data)
+                        )
+                case "update":
+                    self._apply_update(
+                        record["app"], record["acc"], record["changes"]
+                    )
+                case "delete":
+                    self._apply_delete(record["app"], record["acc"])
+                case "trash":
+                    self._apply_move_to_trash_can(
+                        record["app"],
+                        record["acc"],
+                        (
+                            int(record["trash_id"])
+                            if "trash_id" in record
+                            else None
+                        ),
+                        entry_deleted_at(record),
+                    )
+                case "restore":
+                    self._apply_restore(record["trash_id"])
+                case "purge":
+                    self._apply_purge(record["trash_ids"])
+
+    def _index_rebuild(self) -> None:
+        """由`_data`重建索引與垃圾桶索引（載入/新建時）
+
+        延遲載入時只索引已解析的應用程式，其餘在解析時才加入。"""
+        self._index = {}
+        self._slots = {}
+        self._data_shared = False
+        self._owned_apps = None
+        trash_can = self._data.get("trash_can")
+        if trash_can is None:
+            trash_can = []
+            self._data["trash_can"] = trash_can
+        self._trash_can = TrashCan(trash_can)
+        if isinstance(self._data, LazyAppDict):
+            items = self._data.materialized_items()
+        else:
+            items = self._data.items()
+        for app, app_datas in items:
+            self._adopt_app(app, app_datas)
+
+    def _adopt_app(self, app: str, app_datas: list) -> None:
+        """把剛載入/解析的帳號`dict`換成`AccountRecord`並加入索引
+
+        檔案是舊的schema版本時同時正規化。"""
+        if app == "trash_can":
+            return
+        if self._disk_schema_version < SCHEMA_VERSION:
+            to_record = normalize_record
+        else:
+            to_record = AccountRecord.from_dict
+        for position, app_data in enumerate(app_datas):
+            app_data = to_record(app_data)
+            app_datas[position] = app_data
+            self._index_add(app, app_data["acc"], position)
+        self._slots[app] = array("q", range(len(app_datas)))
+
+    def _app_index(self, app: str) -> dict[str, list[int]] | None:
+        """取得應用程式的索引（需要時先解析該應用程式）"""
+        app_index = self._index.get(app)
+        if app_index is None and app != "trash_can" and app in self._data:
+            self._data[app]
+            app_index = self._index.get(app)
+        return app_index
+
+    def _index_add(self, app: str, acc: str, slot: int) -> None:
+        app_index = self._index.get(app)
+        if app_index is None:
+            app_index = {}
+            self._index[app] = app_index
+        slots = app_index.get(acc)
+        if slots is None:
+            app_index[acc] = [slot]
+        else:
+            # 保持由小到大：`slots[0]`是清單中第一筆
+            bisect.insort(slots, slot)
+
+    def _position(self, app: str, slot: int) -> int:
+        """編號`slot`的帳號在`_data[app]`中的位置，O(log n)"""
+        return bisect.bisect_left(self._slots[app], slot)
+
+    def _index_remove(
+        self, app: str, acc: str, slot: int
+    ) -> dict[str, str]:
+        """刪除編號`slot`的帳號並保持順序（與SQLite引擎相同），
+        其他帳號的編號不變
+
+        找位置O(log n)；`del`清單與`array`各是O(n)的memmove
+        （n為同一個應用程式的帳號數），沒有O(n)的Python迴圈。"""
+        app_datas = self._writable_app(app)
+        if app_datas is None:
+            raise IndexError()
+        position = self._position(app, slot)
+        removed = app_datas[position]
+        app_index = self._index[app]
+        slots = app_index[acc]
+        slots.remove(slot)
+        if len(slots) <= 0:
+            del app_index[acc]
+        del app_datas[position]
+        del self._slots[app][position]
+        if len(app_datas) <= 0:
+            del self._data[app]
+            del self._index[app]
+            del self._slots[app]
+        return removed
+
+    def __str__(self) -> str:
+        return f"""JsonStorageEngine(_data={self._data})"""
@@ -0,0 +1,257 @@
+import json
+import re
+import threading
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from .account_record import record_to_json
+from .compression import read_file_bytes
+from .schema import SCHEMA_KEY
+
+_TOP_LEVEL_KEY = re.compile(rb'\n    "((?:[^"\\\n]|\\.)*)": ')
+"""`json.dump(..., indent=4)`的第一層key（值內的字串不會有換行）"""
+_ACC_KEY = b'\n            "acc": '
+"""第三層（帳號資料）的`acc`"""
+
+
+class LazyAppSpan:
+    """尚未解析的應用程式資料：在檔案內的位置"""
+
+    __slots__ = ("count", "end", "start")
+
+    def __init__(self, start: int, end: int, count: int) -> None:
+        self.start: int = start
+        self.end: int = end
+        self.count: int = count
+
+    def __repr__(self) -> str:
+        return (
+            f"LazyAppSpan(bytes={self.end - self.start}, count={self.count})"
+        )
+
+
+class LazyAppDict(dict):
+    """第一次讀取某個應用程式時才解析它的帳號清單
+
+    值為`LazyAppSpan`的項目尚未解析；`__getitem__`、`get`、`items`、
+    `values`、`pop`、`setdefault`會先解析再回傳。"""
+
+    def __init__(
+        self,
+        decode: Callable[[LazyAppSpan], list],
+        on_materialize: Callable[[str, list], None] | None = None,
+        *,
+        raw: Callable[[LazyAppSpan], bytes] | None = None,
+        close: Callable[[], None] | None = None,
+    ) -> None:
+        super().__init__()
+        self._decode = decode
+        self._raw = raw
+        self._close = close
+        self.on_materialize = on_materialize
+        self._materialize_lock = threading.Lock()
+
+    def _materialize(self, key: str, span: LazyAppSpan) -> list:
+        """同一個應用程式只解析一次（多個讀取者可能同時第一次讀取它）"""
+        with self._materialize_lock:
+            value = dict.__getitem__(self, key)
+            if isinstance(value, LazyAppSpan) is False:
+                return value
+            app_datas: list = self._decode(span)
+            dict.__setitem__(self, key, app_datas)
+            if self.on_materialize is not None:
+                self.on_materialize(key, app_datas)
+            return app_datas
+
+    def __getitem__(self, key: str) -> list:
+        value = dict.__getitem__(self, key)
+        if isinstance(value, LazyAppSpan):
+            value = self._materialize(key, value)
+        return value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        else:
+            return default
+
+    def items(self) -> Iterator[tuple[str, list]]:  # type: ignore[override]
+        for key in list(dict.keys(self)):
+            yield key, self[key]
+
+    def values(self) -> Iterator[list]:  # type: ignore[override]
+        for key in list(dict.keys(self)):
+            yield self[key]
+
+    def pop(self, key: str, *default: Any) -> Any:
+        if key in self:
+            self[key]
+        return dict.pop(self, key, *default)
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        if key in self:
+            return self[key]
+        dict.__setitem__(self, key, default)
+        return default
+
+    def copy(self) -> "LazyAppDict":  # type: ignore[override]
+        """淺複製；尚未解析的應用程式仍共用同一個來源"""
+        data = LazyAppDict(
+            self._decode, self.on_materialize, raw=self._raw, close=self._close
+        )
+        dict.update(data, self)
+        return data
+
+    def peek(self, key: str) -> list:
+        """讀取應用程式的帳號清單但不保留解析結果（串流匯出用）"""
+        value = dict.__getitem__(self, key)
+        if isinstance(value, LazyAppSpan):
+            return self._decode(value)
+        else:
+            return value
+
+    def is_materialized(self, key: str) -> bool:
+        return isinstance(dict.__getitem__(self, key), LazyAppSpan) is False
+
+    def materialized_items(self) -> Iterator[tuple[str, list]]:
+        for key, value in dict.items(self):
+            if isinstance(value, LazyAppSpan) is False:
+                yield key, value
+
+    def app_len(self, key: str) -> int:
+        """帳號數量（不解析）"""
+        value = dict.__getitem__(self, key)
+        if isinstance(value, LazyAppSpan):
+            return value.count
+        else:
+            return len(value)
+
+    def raw_span(self, key: str) -> bytes | None:
+        """尚未解析的原始JSON；已解析或來源不是JSON時回傳None"""
+        value = dict.__getitem__(self, key)
+        if isinstance(value, LazyAppSpan) and self._raw is not None:
+            return self._raw(value)
+        else:
+            return None
+
+    def has_lazy(self) -> bool:
+        for value in dict.values(self):
+            if isinstance(value, LazyAppSpan):
+                return True
+        return False
+
+    def detach(self) -> None:
+        """解析全部應用程式並釋放來源（例如`mmap`），之後可以取代來源檔案"""
+        if self._close is not None:
+            for _ in self.values():
+                pass
+            self._close()
+            self._close = None
+
+    def close(self) -> None:
+        """釋放來源；尚未解析的應用程式之後無法再讀取"""
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def is_mapped(self) -> bool:
+        return self._close is not None
+
+
+def lazy_load(
+    file_path: str,
+    on_materialize: Callable[[str, list], None] | None = None,
+) -> LazyAppDict | None:
+    """掃描一次檔案，建立每個應用程式的位置索引
+
+    只支援`password_book_save`寫出的格式（`indent=4`，可以壓縮），
+    其他格式回傳None，由呼叫者改用`json.load`。"""
+    buffer, _ = read_file_bytes(file_path)
+    data = LazyAppDict(
+        lambda span: json.loads(buffer[span.start : span.end]),
+        on_materialize,
+        raw=lambda span: buffer[span.start : span.end],
+    )
+    content = buffer.rstrip()
+    if content == b"{}":
+        return data
+    if buffer.startswith(b"{\n") is False or content.endswith(b"\n}") is False:
+        return None
+    object_end = len(content) - 2
+    matches = list(_TOP_LEVEL_KEY.finditer(buffer, 1, object_end))
+    if len(matches) <= 0 or matches[0].start() != 1:
+        return None
+    for i, match in enumerate(matches):
+        start = match.end()
+        if i + 1 < len(matches):
+            end = matches[i + 1].start()
+            if buffer[end - 1 : end] != b",":
+                return None
+            end -= 1
+        else:
+            end = object_end
+        key = json.loads(b'"' + match.group(1) + b'"')
+        if i == 0 and key == SCHEMA_KEY and buffer[start:end].isdigit():
+            # 版本號（`pop_schema_version`取出）
+            dict.__setitem__(data, key, int(buffer[start:end]))
+            continue
+        if buffer[start : start + 1] != b"[" or buffer[end - 1 : end] != b"]":
+            return None
+        count = buffer.count(_ACC_KEY, start, end)
+        dict.__setitem__(data, key, LazyAppSpan(start, end, count))
+    return data
+
+
+def dump_json(
+    data: dict,
+    f,
+    schema_version: int | None = None,
+    *,
+    indent: int | None = 4,
+) -> None:
+    """逐個應用程式編碼、寫出（只需要一個應用程式的記憶體）
+
+    `indent=4`時與`json.dump(..., indent=4)`相同（可以延遲載入），延遲載入
+    尚未解析的應用程式直接複製原始內容，不必解析再編碼；`indent=None`是
+    沒有空白的緊湊格式，以C實作的編碼器一次編碼一個應用程式，較快也較小。
+    `schema_version`：寫在第一個key（`SCHEMA_KEY`）。"""
+    if indent is None:
+        encoder = json.JSONEncoder(
+            ensure_ascii=False, separators=(",", ":"), default=record_to_json
+        )
+        newline = ""
+        key_separator = ":"
+    else:
+        encoder = json.JSONEncoder(
+            ensure_ascii=False, indent=indent, default=record_to_json
+        )
+        newline = "\n" + " " * indent
+        key_separator = ": "
+    is_lazy = isinstance(data, LazyAppDict)
+    f.write("{")
+    first = True
+    if schema_version is not None:
+        f.write(f"{newline}{json.dumps(SCHEMA_KEY)}{key_separator}")
+        f.write(str(schema_version))
+        first = False
+    for key in dict.keys(data):
+        if key == SCHEMA_KEY:
+            continue
+        if first is False:
+            f.write(",")
+        first = False
+        f.write(newline)
+        f.write(json.dumps(key, ensure_ascii=False))
+        f.write(key_separator)
+        raw = data.raw_span(key) if is_lazy and indent == 4 else None
+        if raw is not None:
+            f.write(raw.decode("utf-8"))
+        else:
+            chunk = encoder.encode(data.peek(key) if is_lazy else data[key])
+            if indent is not None:
+                # JSON字串內的換行已跳脫，只有結構的換行
+                chunk = chunk.replace("\n", newline)
+            f.write(chunk)
+    if first is False and indent is not None:
+        f.write("\n")
+    f.write("}")
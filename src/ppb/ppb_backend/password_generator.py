@@ -0,0 +1,329 @@
+import math
+import re
+import secrets
+import string
+from collections.abc import Iterator, Sequence
+from typing import Literal
+
+generator_kind_type = Literal["random", "pronounceable", "passphrase"]
+
+SYMBOLS: str = "!#$%&*+-=?@^_~"
+"""預設的符號（避開引號、反斜線等在網頁表單、shell容易出問題的字元）"""
+AMBIGUOUS: str = "Il1O0o"
+"""容易看錯的字元（`exclude_ambiguous=True`時移除）"""
+
+_CONSONANTS: str = "bdfghjklmnprstvz"
+_VOWELS: str = "aeiou"
+_SYLLABLES: tuple[str, ...] = tuple(c + v for c in _CONSONANTS for v in _VOWELS)
+"""子音+母音，80個音節"""
+_CJK = re.compile(
+    "[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef"
+    "\U00020000-\U0003134f]"
+)
+"""中日韓文字、全形字元"""
+_BATCH_SIZE: int = 4096
+
+
+def is_cjk_free(text: str) -> bool:
+    return _CJK.search(text) is None
+
+
+def load_wordlist(file_path: str) -> list[str]:
+    """讀取單字表：每列一個單字，可以有骰子編號（EFF格式："11111\tabacus"）"""
+    words: list[str] = []
+    with open(file_path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) <= 0:
+                continue
+            words.append(parts[-1])
+    return list(dict.fromkeys(words))
+
+
+DEFAULT_WORDLIST: tuple[str, ...] = tuple(
+    a + b for a in _SYLLABLES for b in _SYLLABLES
+)
+"""內建的單字：兩個音節的假字（6400個，每個約12.6位元）"""
+
+
+def _random_indices(size: int, count: int) -> Iterator[int]:
+    """`count`個均勻分布在[0, `size`)的亂數（`secrets`產生，拒絕取樣
+    避免取餘數的偏差）；一次取得一批隨機bytes，不必每個都呼叫`secrets`"""
+    if size <= 0 or size > 1 << 16:
+        raise ValueError(f"範圍錯誤：{size}")
+    width = 1 if size <= 1 << 8 else 2
+    limit = (1 << (8 * width)) // size * size
+    while count > 0:
+        block = memoryview(
+            secrets.token_bytes(width * (count + count // 4 + 16))
+        ).cast("B" if width == 1 else "H")
+        for value in block:
+            if value < limit:
+                yield value % size
+                count -= 1
+                if count <= 0:
+                    return
+
+
+class PasswordPolicy:
+    """產生密碼的規則
+
+    - random：從啟用的字元種類中隨機選`length`個字元，`require_each`時
+      每種至少一個
+    - pronounceable：子音+母音的音節組成`length`個字元，容易唸、容易輸入
+      （`uppercase`、`digits`、`symbols`各加在固定的位置；`lowercase=False`
+      時字母全部大寫，`exclude_ambiguous`時不使用容易看錯的字母與數字）
+    - passphrase：從單字表隨機選`words`個單字，以`separator`連接
+
+    `cjk_free`：移除`symbol_chars`、單字表中的中日韓文字與全形字元
+    （有些網站、輸入法處理不了）。"""
+
+    __slots__ = (
+        "_alphabet",
+        "_class_patterns",
+        "_classes",
+        "_digit_chars",
+        "_syllables",
+        "_symbol_chars",
+        "_table",
+        "cjk_free",
+        "digits",
+        "exclude_ambiguous",
+        "kind",
+        "length",
+        "lowercase",
+        "require_each",
+        "separator",
+        "symbol_chars",
+        "symbols",
+        "uppercase",
+        "wordlist",
+        "words",
+    )
+
+    def __init__(
+        self,
+        kind: generator_kind_type = "random",
+        *,
+        length: int = 16,
+        lowercase: bool = True,
+        uppercase: bool = True,
+        digits: bool = True,
+        symbols: bool = True,
+        symbol_chars: str = SYMBOLS,
+        exclude_ambiguous: bool = False,
+        require_each: bool = True,
+        cjk_free: bool = True,
+        words: int = 6,
+        separator: str = "-",
+        wordlist: Sequence[str] | None = None,
+    ) -> None:
+        if kind not in ("random", "pronounceable", "passphrase"):
+            raise ValueError(f"不支援的種類：{kind}")
+        self.kind: generator_kind_type = kind
+        self.length: int = length
+        self.lowercase: bool = lowercase
+        self.uppercase: bool = uppercase
+        self.digits: bool = digits
+        self.symbols: bool = symbols
+        self.exclude_ambiguous: bool = exclude_ambiguous
+        self.require_each: bool = require_each
+        self.cjk_free: bool = cjk_free
+        self.words: int = words
+        self.separator: str = separator
+        if cjk_free is True:
+            symbol_chars = "".join(i for i in symbol_chars if is_cjk_free(i))
+            if wordlist is not None:
+                wordlist = [i for i in wordlist if is_cjk_free(i)]
+        self.symbol_chars: str = symbol_chars
+        self.wordlist: Sequence[str] = (
+            DEFAULT_WORDLIST if wordlist is None else wordlist
+        )
+        self._classes: list[str] = [
+            chars
+            for enabled, chars in (
+                (lowercase, string.ascii_lowercase),
+                (uppercase, string.ascii_uppercase),
+                (digits, string.digits),
+                (symbols, symbol_chars),
+            )
+            if enabled is True
+        ]
+        if exclude_ambiguous is True:
+            self._classes = [
+                "".join(i for i in chars if i not in AMBIGUOUS)
+                for chars in self._classes
+            ]
+        self._classes = [i for i in self._classes if len(i) > 0]
+        self._class_patterns: list[re.Pattern[str]] = [
+            re.compile(f"[{re.escape(i)}]") for i in self._classes
+        ]
+        self._alphabet: str = "".join(dict.fromkeys("".join(self._classes)))
+        self._table: bytes | None = None
+        self._syllables: tuple[str, ...] = _SYLLABLES
+        self._digit_chars: str = string.digits
+        self._symbol_chars: str = symbol_chars or SYMBOLS
+        if kind == "random":
+            if len(self._alphabet) <= 0:
+                raise ValueError("沒有可以使用的字元")
+            if require_each is True and length < len(self._classes):
+                raise ValueError(
+                    f"長度{length}放不下{len(self._classes)}種字元"
+                )
+            if self._alphabet.isascii() is True:
+                # bytes.translate用：隨機byte -> 字元
+                self._table = bytes(
+                    ord(self._alphabet[i % len(self._alphabet)])
+                    for i in range(256)
+                )
+        elif kind == "pronounceable":
+            if length < 4:
+                raise ValueError(f"長度至少4：{length}")
+            if lowercase is False and uppercase is False:
+                raise ValueError("沒有可以使用的字母")
+            self._pronounceable_chars()
+        elif kind == "passphrase" and (
+            words <= 0 or len(self.wordlist) <= 1
+        ):
+            raise ValueError("單字數、單字表不能是空的")
+
+    def _pronounceable_chars(self) -> None:
+        """pronounceable的音節、數字與符號（依大小寫、`exclude_ambiguous`）"""
+        consonants, vowels = _CONSONANTS, _VOWELS
+        if self.lowercase is False:
+            consonants, vowels = consonants.upper(), vowels.upper()
+        digit_chars, symbol_chars = string.digits, self._symbol_chars
+        if self.exclude_ambiguous is True:
+            consonants, vowels, digit_chars, symbol_chars = (
+                "".join(i for i in chars if i not in AMBIGUOUS)
+                for chars in (consonants, vowels, digit_chars, symbol_chars)
+            )
+        self._syllables = tuple(c + v for c in consonants for v in vowels)
+        self._digit_chars = digit_chars
+        self._symbol_chars = symbol_chars
+
+    @property
+    def entropy(self) -> float:
+        """密碼的熵（位元，攻擊者知道規則時；`require_each`會稍微減少）"""
+        if self.kind == "random":
+            return self.length * math.log2(len(self._alphabet))
+        elif self.kind == "pronounceable":
+            letters = self.length - self._suffix_length
+            bits = letters / 2 * math.log2(len(self._syllables))
+            if self.digits is True:
+                bits += 2 * math.log2(len(self._digit_chars))
+            if self.symbols is True:
+                bits += math.log2(len(self._symbol_chars))
+            return bits
+        else:
+            return self.words * math.log2(len(self.wordlist))
+
+    def generate(self, count: int = 1) -> list[str]:
+        """產生`count`個密碼"""
+        if self.kind == "random":
+            return self._generate_random(count)
+        elif self.kind == "pronounceable":
+            return self._generate_pronounceable(count)
+        else:
+            return self._generate_passphrase(count)
+
+    def _generate_random(self, count: int) -> list[str]:
+        alphabet_size = len(self._alphabet)
+        passwords: list[str] = []
+        while len(passwords) < count:
+            need = count - len(passwords)
+            if self._table is not None:
+                # 整批亂數以bytes.translate換成字元；丟掉取餘數會偏差的byte
+                limit = 256 // alphabet_size * alphabet_size
+                data = secrets.token_bytes(
+                    need * self.length * 256 // limit + self.length
+                )
+                if limit < 256:
+                    data = data.translate(None, bytes(range(limit, 256)))
+                text = data.translate(self._table).decode("ascii")
+            else:
+                text = "".join(
+                    self._alphabet[i]
+                    for i in _random_indices(alphabet_size, need * self.length)
+                )
+            for i in range(0, len(text) - self.length + 1, self.length):
+                pwd = text[i : i + self.length]
+                if self.require_each is True and not all(
+                    pattern.search(pwd) for pattern in self._class_patterns
+                ):
+                    # 拒絕取樣：其餘的密碼仍然是均勻分布
+                    continue
+                passwords.append(pwd)
+                if len(passwords) >= count:
+                    break
+        return passwords
+
+    @property
+    def _suffix_length(self) -> int:
+        """pronounceable結尾的符號與數字"""
+        return (1 if self.symbols is True else 0) + (
+            2 if self.digits is True else 0
+        )
+
+    def _generate_pronounceable(self, count: int) -> list[str]:
+        letters = self.length - self._suffix_length
+        syllable_count = (letters + 1) // 2
+        table = self._syllables
+        syllables = iter(
+            _random_indices(len(table), syllable_count * count)
+        )
+        digit_chars = self._digit_chars
+        digits = iter(_random_indices(len(digit_chars), 2 * count))
+        symbol_chars = self._symbol_chars
+        symbols = iter(_random_indices(len(symbol_chars), count))
+        passwords: list[str] = []
+        for _ in range(count):
+            pwd = "".join(
+                table[next(syllables)] for _ in range(syllable_count)
+            )[:letters]
+            if self.uppercase is True and self.lowercase is True:
+                pwd = pwd[0].upper() + pwd[1:]
+            if self.symbols is True:
+                pwd += symbol_chars[next(symbols)]
+            if self.digits is True:
+                pwd += digit_chars[next(digits)] + digit_chars[next(digits)]
+            passwords.append(pwd)
+        return passwords
+
+    def _generate_passphrase(self, count: int) -> list[str]:
+        indices = iter(_random_indices(len(self.wordlist), self.words * count))
+        return [
+            self.separator.join(
+                self.wordlist[next(indices)] for _ in range(self.words)
+            )
+            for _ in range(count)
+        ]
+
+    def __repr__(self) -> str:
+        size = (
+            f"words={self.words}"
+            if self.kind == "passphrase"
+            else f"length={self.length}"
+        )
+        return (
+            f"PasswordPolicy(kind={self.kind!r}, {size},"
+            f" entropy={self.entropy:.1f})"
+        )
+
+
+DEFAULT_POLICY: PasswordPolicy = PasswordPolicy()
+
+
+def generate_password(policy: PasswordPolicy | None = None) -> str:
+    return (DEFAULT_POLICY if policy is None else policy).generate(1)[0]
+
+
+def generate_passwords(
+    count: int, policy: PasswordPolicy | None = None
+) -> Iterator[str]:
+    """大量產生密碼（批次供應帳號、輪替密碼），每批`_BATCH_SIZE`個"""
+    policy = DEFAULT_POLICY if policy is None else policy
+    while count > 0:
+        batch = policy.generate(min(count, _BATCH_SIZE))
+        count -= len(batch)
+        yield from batch
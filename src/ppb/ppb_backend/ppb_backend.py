@@ -1,143 +1,695 @@
-import json
-# import os
-
-from typing import Literal, Union
+import time
+from collections.abc import Iterable, Iterator
+from typing import IO, Literal
 
 # import typer
-
 from positive_tool.verify import ArgType
 
-# from ..project_infos import project_infos
+from .account_record import AccountRecord
+from .audit import AuditReport, account_ref_type, audit
+from .autosave import AutoSaver
+from .breach import check_accounts
+from .bulk_export import (
+    EXPORT_FIELDS,
+    export_format_type,
+    export_record_type,
+    iter_records,
+    write_csv,
+    write_json,
+    write_jsonl,
+)
+from .bulk_import import (
+    BulkImportError,
+    import_record_type,
+    read_import_file,
+    validate_records,
+)
+from .compression import COMPRESSIONS
+from .duplicates import (
+    DedupePlan,
+    DuplicateAccountError,
+    DuplicateIndex,
+    duplicate_type,
+    plan_dedupe,
+)
+from .events import (
+    CHANGE_KINDS,
+    ChangeEvent,
+    ChangeNotifier,
+    change_callback_type,
+    change_kind_type,
+)
+from .file_lock import ConcurrentModificationError
+from .json_engine import JsonStorageEngine
+from .lazy_data import LazyAppDict
+from .password_generator import PasswordPolicy, generate_passwords
+from .rw_lock import RWLock, install_locks, reading, writing
+from .schema import check_app_name
+from .search_index import SearchIndex, search_result_type
+from .sharded_format import DEFAULT_SHARD_COUNT
+from .snapshot import PasswordBookSnapshot
+from .sqlite_engine import SqliteStorageEngine, is_sqlite_file
+from .storage_engine import StorageEngine, data_type
+from .trash_can import trash_entry_type
 
+# from ..project_infos import project_infos
 
-data_type = dict[
-    str,
-    list[
-        dict[
-            Union[
-                Literal["acc", "pwd", "note", "usernote", "email"],
-                str,
-            ],
-            str,
-        ]
-    ],
+__all__ = [
+    "AuditReport",
+    "AutoSaver",
+    "BulkImportError",
+    "ChangeEvent",
+    "ConcurrentModificationError",
+    "DedupePlan",
+    "DuplicateAccountError",
+    "PasswordBookSnapshot",
+    "PasswordBookSystem",
+    "PasswordPolicy",
+    "data_type",
 ]
 
+TRASH_RETENTION: float = 30 * 24 * 60 * 60
+"""垃圾桶預設保留30天"""
+
 
 class PasswordBookSystem:
-    _data: data_type
+    """密碼本API；資料由儲存引擎（`JsonStorageEngine`/`SqliteStorageEngine`）處理
+
+    `storage="auto"`：載入時依檔案內容選擇引擎，新密碼本使用JSON引擎。"""
+
+    _engine: StorageEngine
+    _search_index: SearchIndex | None
+    _duplicate_index: DuplicateIndex | None
+    _notifier: ChangeNotifier
+    _rw_lock: RWLock | None
+
+    def __init__(
+        self,
+        file_path: str | None = None,
+        *,
+        storage: Literal["auto", "json", "sqlite"] = "auto",
+        journal_mode: bool = False,
+        journal_compact_threshold: int = 1000,
+        save_coalesce_window: float = 0.0,
+        lazy_load: bool = False,
+        file_format: Literal["auto", "json", "binary", "sharded"] = "auto",
+        shard_count: int = DEFAULT_SHARD_COUNT,
+        json_indent: int | None = 4,
+        compression: Literal["auto", "none", "gzip", "lzma", "zlib"] = "auto",
+        trash_retention: float | None = TRASH_RETENTION,
+        file_lock: bool = True,
+        on_conflict: Literal["merge", "reject"] = "merge",
+        thread_safe: bool = False,
+    ) -> None:
+        """`file_format`：JSON引擎儲存的格式（auto：沿用載入的格式）；
+        "sharded"把帳號分到`shard_count`個分片檔案，適合很大的密碼本：
+        儲存時只重寫變更過的分片，`lazy_load`時只讀取用到的分片
+
+        `json_indent`、`compression`：JSON格式逐個應用程式串流寫出；
+        `json_indent=None`為緊湊格式，`compression`以gzip/lzma/zlib壓縮
+        （auto：沿用載入的檔案），載入時依magic bytes自動判斷
+
+        `trash_retention`：垃圾桶保留秒數，載入/儲存時一次清除過期項目
+        （None：永久保留）
+
+        `file_lock`、`on_conflict`：多個程序（TUI、GUI、CLI）同時開啟
+        同一個檔案時，以`.lock`檔的版本號發現對方的寫入，合併或以
+        `ConcurrentModificationError`拒絕，而不是互相覆蓋（JSON引擎；
+        SQLite引擎的每個變更都是一個交易，由SQLite處理）
 
-    def __init__(self, file_path: str | None = None) -> None:
+        `thread_safe`：以讀寫鎖保護每個方法，可以從多個執行緒（例如GUI的
+        工作執行緒）呼叫：讀取（查詢、搜尋、匯出…）可以同時進行，變更依序
+        執行。預設（False）不加鎖，方法維持原樣沒有額外開銷。變更事件在持有
+        寫入鎖時送出，處理函式可以讀取但不應等待其他執行緒。"""
+        ArgType("storage", storage, ["auto", "json", "sqlite"])
+        ArgType("journal_mode", journal_mode, bool)
+        ArgType("journal_compact_threshold", journal_compact_threshold, int)
+        ArgType("save_coalesce_window", save_coalesce_window, [int, float])
+        ArgType("lazy_load", lazy_load, bool)
+        ArgType(
+            "file_format", file_format, ["auto", "json", "binary", "sharded"]
+        )
+        ArgType("shard_count", shard_count, int)
+        ArgType("json_indent", json_indent, [int, None])
+        ArgType("compression", compression, ["auto", *COMPRESSIONS])
+        ArgType("trash_retention", trash_retention, [int, float, None])
+        ArgType("file_lock", file_lock, bool)
+        ArgType("on_conflict", on_conflict, ["merge", "reject"])
+        ArgType("thread_safe", thread_safe, bool)
+        self.thread_safe: bool = thread_safe
+        self._rw_lock = RWLock() if thread_safe is True else None
+        if self._rw_lock is not None:
+            install_locks(self, self._rw_lock)
+        self.trash_retention: float | None = trash_retention
+        self.storage: Literal["auto", "json", "sqlite"] = storage
+        self._json_engine_options = {
+            "journal_mode": journal_mode,
+            "journal_compact_threshold": journal_compact_threshold,
+            "save_coalesce_window": save_coalesce_window,
+            "lazy_load": lazy_load,
+            "file_format": file_format,
+            "shard_count": shard_count,
+            "json_indent": json_indent,
+            "compression": compression,
+            "file_lock": file_lock,
+            "on_conflict": on_conflict,
+        }
+        self._engine = self._create_engine(
+            "sqlite" if storage == "sqlite" else "json"
+        )
+        self._search_index = None
+        self._duplicate_index = None
+        self._notifier = ChangeNotifier()
         if file_path is None:
             self.password_book_new()
         else:
             self.password_book_load(file_path)
         # self._data: dict[str, list[dict[str, str]]] | None = None
 
+    def _create_engine(self, name: Literal["json", "sqlite"]) -> StorageEngine:
+        if name == "sqlite":
+            engine: StorageEngine = SqliteStorageEngine()
+        else:
+            engine = JsonStorageEngine(**self._json_engine_options)
+        engine.on_merge = self._on_engine_merge
+        return engine
+
+    def _on_engine_merge(self) -> None:
+        """引擎合併了其他程序的寫入：索引失效，前端需要整個重新整理"""
+        self._search_index = None
+        self._duplicate_index = None
+        self._notifier.emit(ChangeEvent("reloaded"))
+
+    def _use_engine(self, name: Literal["json", "sqlite"]) -> None:
+        if self._engine.name != name:
+            self._engine.close()
+            self._engine = self._create_engine(name)
+
+    @writing
     def password_book_new(self):
         # ArgType("file_path", file_path, str, is_exists=False, is_file=True)
         #
-        self._data = {"trash_can": []}
+        self._engine.new()
+        self._search_index = None
+        self._duplicate_index = None
+        self._notifier.emit(ChangeEvent("reloaded"))
 
+    @writing
     def password_book_load(self, file_path: str):
         ArgType("file_path", file_path, str, is_exists=True, is_file=True)
-        #
-        with open(file_path, "r", encoding="utf-8") as f:
-            file_data: dict = json.load(f)
-        if type(file_data) is not dict:
-            raise TypeError()
-        # for i in file_data.keys():
-        # if type(i) is not str or type(file_data[i]) is not list:
-        # raise TypeError()
-        self._data = file_data
+        if self.storage == "auto":
+            self._use_engine(
+                "sqlite" if is_sqlite_file(file_path) is True else "json"
+            )
+        self._engine.load(file_path)
+        self._search_index = None
+        self._duplicate_index = None
+        self._purge_expired_trash(notify=False)
+        self._notifier.emit(ChangeEvent("reloaded"))
 
-    def password_book_save(self, file_path: str):
-        if self._data is None:
-            raise TypeError()
-        #
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(self._data, f, ensure_ascii=False, indent=4)
+    @writing
+    def password_book_save(self, file_path: str, *, force: bool = False):
+        """儲存到檔案（沒有變更時略過，詳見各引擎的`save`）"""
+        ArgType("file_path", file_path, str)
+        ArgType("force", force, bool)
+        self._purge_expired_trash()
+        self._engine.save(file_path, force)
+
+    @writing
+    def password_book_flush(self) -> None:
+        """立即寫入被合併視窗延後的儲存"""
+        self._engine.flush()
 
+    @reading
+    def password_book_is_dirty(self, file_path: str | None = None) -> bool:
+        """是否有尚未儲存的變更（`file_path`：是否已儲存到該檔案）"""
+        ArgType("file_path", file_path, [str, None])
+        return self._engine.is_dirty(file_path)
+
+    @writing
+    def password_book_compact(self) -> None:
+        """把日誌合併回主檔案（JSON引擎）/ VACUUM（SQLite引擎）"""
+        self._engine.compact()
+
+    @writing
     def password_book_insert(
         self,
         app_name: str,
         acc: str,
-        pwd: str,
+        pwd: str | PasswordPolicy,
         *,
         note: str = "",
         user_note: str = "",
-    ):
-        #
+        on_duplicate: Literal["allow", "reject"] = "allow",
+    ) -> str:
+        """`pwd`是`PasswordPolicy`時依規則產生密碼；回傳新增的密碼
+        （`app_name`是保留名稱時引發`ValueError`，見`RESERVED_APP_NAMES`）
+
+        `on_duplicate="reject"`：與現有帳號重複（比較正規化後的應用程式
+        與帳號，見`duplicates.canonical`）時引發`DuplicateAccountError`，
+        不新增。前端可以先以`password_book_find_duplicates`檢查並提醒。"""
         ArgType("app_name", app_name, str)
         ArgType("acc", acc, str)
-        ArgType("pwd", pwd, str)
+        ArgType("pwd", pwd, [str, PasswordPolicy])
         ArgType("note", note, str)
         ArgType("user_note", user_note, str)
-        if self._data is None:
-            raise TypeError()
-        #
-        app_data = {
-            "acc": acc,
-            "pwd": pwd,
-            "note": note,
-            "user_note": user_note,
-        }
-        app_exists: bool = False
-        for i in list(self._data.keys()):
-            if app_name == i:
-                app_exists = True
-                break
-        if app_exists is True:
-            self._data[app_name].append(app_data)
-        else:
-            self._data[app_name] = [app_data]
+        ArgType("on_duplicate", on_duplicate, ["allow", "reject"])
+        check_app_name(app_name)
+        if on_duplicate == "reject":
+            duplicates = self._get_duplicate_index().find(app_name, acc)
+            if len(duplicates) > 0:
+                raise DuplicateAccountError(duplicates)
+        if isinstance(pwd, PasswordPolicy):
+            pwd = pwd.generate(1)[0]
+        app_data = AccountRecord(acc, pwd, note, user_note)
+        self._engine.insert(app_name, app_data)
+        self._indexes_add(app_name, app_data)
+        self._notifier.emit(ChangeEvent("inserted", [(app_name, app_data)]))
+        return pwd
 
+    @writing
+    def password_book_bulk_insert(
+        self,
+        records: Iterable[import_record_type],
+        *,
+        file_path: str | None = None,
+        policy: PasswordPolicy | None = None,
+    ) -> int:
+        """批次新增：先檢查全部紀錄（有錯誤時以`BulkImportError`一次回報，
+        不會新增任何資料），再以一個變更寫入；有`file_path`時只儲存一次。
+        有`policy`時，沒有密碼的紀錄一次批次產生密碼（批次供應帳號）。
+
+        回傳新增的數量。"""
+        ArgType("file_path", file_path, [str, None])
+        ArgType("policy", policy, [PasswordPolicy, None])
+        items = validate_records(records)
+        if len(items) <= 0:
+            return 0
+        if policy is not None:
+            missing = [i for _, i in items if i["pwd"] == ""]
+            for app_data, pwd in zip(
+                missing, generate_passwords(len(missing), policy)
+            ):
+                app_data["pwd"] = pwd
+        self._engine.insert_bulk(items)
+        for app, app_data in items:
+            self._indexes_add(app, app_data)
+        self._notifier.emit(ChangeEvent("inserted", items))
+        if file_path is not None:
+            self.password_book_save(file_path, force=True)
+        return len(items)
+
+    @writing
+    def password_book_import(
+        self,
+        source: str | IO[str],
+        *,
+        file_format: Literal["auto", "csv", "json"] = "auto",
+        file_path: str | None = None,
+    ) -> int:
+        """匯入其他密碼管理器匯出的CSV/JSON（欄位對應見`bulk_import`）"""
+        ArgType("file_format", file_format, ["auto", "csv", "json"])
+        return self.password_book_bulk_insert(
+            read_import_file(source, file_format), file_path=file_path
+        )
+
+    @writing
     def password_book_delete(self, app_name: str, acc: str) -> None:
-        #
         ArgType("app_name", app_name, str)
         ArgType("acc", acc, str)
-        if self._data is None:
+        app_data = self._engine.delete(app_name, acc)
+        self._indexes_remove(app_name, app_data)
+        self._notifier.emit(ChangeEvent("deleted", [(app_name, app_data)]))
+
+    @writing
+    def password_book_update(
+        self,
+        app_name: str,
+        acc: str,
+        *,
+        new_acc: str | None = None,
+        pwd: str | None = None,
+        note: str | None = None,
+        user_note: str | None = None,
+    ) -> None:
+        """修改`app_name`內第一筆`acc`（None：不修改該欄位）"""
+        ArgType("app_name", app_name, str)
+        ArgType("acc", acc, str)
+        ArgType("new_acc", new_acc, [str, None])
+        ArgType("pwd", pwd, [str, None])
+        ArgType("note", note, [str, None])
+        ArgType("user_note", user_note, [str, None])
+        check_app_name(app_name)
+        changes = {
+            key: value
+            for key, value in (
+                ("acc", new_acc),
+                ("pwd", pwd),
+                ("note", note),
+                ("user_note", user_note),
+            )
+            if value is not None
+        }
+        old_data, new_data = self._engine.update(app_name, acc, changes)
+        self._indexes_remove(app_name, old_data)
+        self._indexes_add(app_name, new_data)
+        self._notifier.emit(
+            ChangeEvent(
+                "updated",
+                [(app_name, new_data)],
+                old_items=[(app_name, old_data)],
+            )
+        )
+
+    @writing
+    def password_book_move_to_trash_can(self, app: str, acc: str) -> int:
+        """移到垃圾桶，回傳還原時使用的`trash_id`"""
+        ArgType("app", app, str)
+        ArgType("acc", acc, str)
+        trash_id, app_data = self._engine.move_to_trash_can(app, acc)
+        self._indexes_remove(app, app_data)
+        self._notifier.emit(
+            ChangeEvent("trashed", [(app, app_data)], trash_ids=[trash_id])
+        )
+        return trash_id
+
+    @writing
+    def password_book_restore_from_trash_can(self, trash_id: int) -> str:
+        """從垃圾桶還原，回傳應用程式名稱"""
+        ArgType("trash_id", trash_id, int)
+        app, app_data = self._engine.restore_from_trash_can(trash_id)
+        self._indexes_add(app, app_data)
+        self._notifier.emit(
+            ChangeEvent("restored", [(app, app_data)], trash_ids=[trash_id])
+        )
+        return app
+
+    @reading
+    def password_book_trash_can_items(self) -> list[trash_entry_type]:
+        """垃圾桶的內容（每筆含`app`、`trash_id`、`deleted_at`）"""
+        return self._engine.trash_can_items()
+
+    @writing
+    def password_book_purge_trash_can(
+        self, before: float | None = None
+    ) -> int:
+        """永久刪除在`before`（Unix時間，預設：現在）之前移到垃圾桶的項目"""
+        ArgType("before", before, [int, float, None])
+        trash_ids = self._engine.purge_trash_can(
+            time.time() if before is None else before
+        )
+        if len(trash_ids) > 0:
+            self._notifier.emit(ChangeEvent("purged", trash_ids=trash_ids))
+        return len(trash_ids)
+
+    def _purge_expired_trash(self, notify: bool = True) -> None:
+        """`notify`：載入時不另外送出`purged`（之後會送出`reloaded`）"""
+        if self.trash_retention is not None:
+            trash_ids = self._engine.purge_trash_can(
+                time.time() - self.trash_retention
+            )
+            if notify is True and len(trash_ids) > 0:
+                self._notifier.emit(
+                    ChangeEvent("purged", trash_ids=trash_ids)
+                )
+
+    def password_book_subscribe(
+        self,
+        callback: change_callback_type,
+        *,
+        kinds: Iterable[change_kind_type] | None = None,
+    ) -> int:
+        """訂閱變更事件（`ChangeEvent`），前端可以只更新受影響的部分
+
+        每個變更完成後同步呼叫`callback`；`kinds`：只接收這些事件
+        （None：全部）。`reloaded`表示整本密碼本已重新載入/新建。
+        回傳`password_book_unsubscribe`使用的token。"""
+        if callable(callback) is False:
             raise TypeError()
-        #
-        if app_name not in self._data.keys():
-            raise IndexError()
-        else:
-            acc_exists: bool = False
-            index: int = 0
-            for i in self._data[app_name]:
-                if acc == i["acc"]:
-                    acc_exists = True
-                    break
-                else:
-                    index += 1
-            if acc_exists is True:
-                del self._data[app_name][index]
-                if len(self._data[app_name]) <= 0:
-                    del self._data[app_name]
-            else:
-                raise IndexError()
-
-    def password_book_move_to_trash_can(self, app: str, acc: str):
-        # TODO:finish it
-        if app in list(self._data.keys()):
-            for i in self._data[app]:
-                if i["acc"] == acc:
-                    break
-            else:
-                raise IndexError()
-        else:
-            raise KeyError()
+        if kinds is not None:
+            kinds = tuple(kinds)
+            for kind in kinds:
+                ArgType("kind", kind, list(CHANGE_KINDS))
+        return self._notifier.subscribe(callback, kinds)
+
+    def password_book_unsubscribe(self, token: int) -> None:
+        ArgType("token", token, int)
+        self._notifier.unsubscribe(token)
+
+    def password_book_autosave(
+        self,
+        file_path: str,
+        *,
+        idle_delay: float = 2.0,
+        max_pending: int = 20,
+    ) -> AutoSaver:
+        """開始背景自動儲存到`file_path`（需要`thread_safe=True`）
+
+        變更停止`idle_delay`秒後或累積`max_pending`個變更時儲存一次；
+        結束前呼叫回傳值的`close()`寫入尚未儲存的變更。"""
+        ArgType("file_path", file_path, str)
+        ArgType("idle_delay", idle_delay, [int, float])
+        ArgType("max_pending", max_pending, int)
+        return AutoSaver(
+            self, file_path, idle_delay=idle_delay, max_pending=max_pending
+        )
+
+    @reading
+    def password_book_exists(
+        self, app_name: str, acc: str | None = None
+    ) -> bool:
+        """檢查應用程式（或應用程式內的帳號）是否存在"""
+        return self._engine.exists(app_name, acc)
+
+    @reading
+    def password_book_count(self, app_name: str) -> int:
+        """應用程式的帳號數量；延遲載入時不必解析該應用程式"""
+        return self._engine.count(app_name)
+
+    @reading
+    def password_book_get_data(self) -> PasswordBookSnapshot:
+        """唯讀快照（同`password_book_snapshot`）"""
+        return self._engine.snapshot()
+
+    @reading
+    def password_book_snapshot(self) -> PasswordBookSnapshot:
+        """唯讀快照：JSON引擎為O(1)（copy-on-write），之後的變更不影響它，
+        可以在編輯的同時顯示、匯出或檢查"""
+        return self._engine.snapshot()
+
+    @reading
+    def password_book_iter_records(
+        self,
+        *,
+        apps: Iterable[str] | None = None,
+        fields: Iterable[str] = EXPORT_FIELDS,
+    ) -> Iterator[export_record_type]:
+        """逐筆產生帳號紀錄（`apps`：只列出這些應用程式；`fields`：欄位）
+
+        `thread_safe`時迭代器在鎖外使用，改從快照產生。"""
+        if self._rw_lock is not None:
+            snapshot = self._engine.snapshot()
+            return iter_records(snapshot.iter_apps(apps), fields)
+        return iter_records(self._engine.iter_apps(apps), fields)
+
+    @reading
+    def password_book_export(
+        self,
+        dest: str | IO[str],
+        *,
+        file_format: export_format_type = "jsonl",
+        apps: Iterable[str] | None = None,
+        fields: Iterable[str] = EXPORT_FIELDS,
+    ) -> int:
+        """串流匯出到檔案路徑或文字串流，回傳匯出的數量
 
-    def password_book_get_data(self) -> dict:
-        return self._data
+        - csv：第一列為欄位名稱
+        - jsonl：一行一筆紀錄
+        - json：本專案的`data_type`格式（`apps`為None時包含垃圾桶）"""
+        ArgType("file_format", file_format, ["csv", "jsonl", "json"])
+        fields = tuple(fields)
+        if isinstance(dest, str):
+            with open(dest, "w", encoding="utf-8", newline="") as f:
+                return self.password_book_export(
+                    f, file_format=file_format, apps=apps, fields=fields
+                )
+        if file_format == "json":
+            trash_can = (
+                self._engine.get_data().get("trash_can", [])
+                if apps is None
+                else []
+            )
+            return write_json(
+                self._engine.iter_apps(apps), dest, fields, trash_can
+            )
+        records = self.password_book_iter_records(apps=apps, fields=fields)
+        if file_format == "csv":
+            return write_csv(records, dest, fields)
+        else:
+            return write_jsonl(records, dest)
 
+    @reading
     def password_book_search(self, app: str) -> list | None:
-        # TODO:finish it
-        if app != "trash_can" and app in list(self._data.keys()):
-            app_datas: list = self._data[app]
-            return app_datas
+        """以應用程式名稱完全相符查詢（其他搜尋見`password_book_find`）
+
+        回傳複製的帳號清單，可以自由修改。"""
+        return self._engine.search(app)
+
+    @reading
+    def password_book_find(
+        self,
+        query: str,
+        *,
+        mode: Literal["prefix", "substring", "fuzzy"] = "substring",
+        limit: int = 50,
+    ) -> search_result_type:
+        """搜尋帳號，回傳[(應用程式, 帳號資料), ...]
+
+        - prefix：應用程式/帳號名稱的前綴
+        - substring：應用程式、帳號、紀錄、筆記包含`query`
+        - fuzzy：依相似度排序的模糊搜尋
+
+        第一次搜尋時建立索引，之後隨新增/刪除更新。回傳帳號資料的複本：
+        修改搜尋結果不會影響密碼本與索引。"""
+        ArgType("query", query, str)
+        ArgType("mode", mode, ["prefix", "substring", "fuzzy"])
+        ArgType("limit", limit, int)
+        search_index = self._get_search_index()
+        if mode == "prefix":
+            results = search_index.prefix(query, limit)
+        elif mode == "substring":
+            results = search_index.substring(query, limit)
         else:
-            return None
+            results = [
+                (app, app_data)
+                for _, app, app_data in search_index.fuzzy(query, limit)
+            ]
+        return [(app, app_data.copy()) for app, app_data in results]
+
+    def _get_search_index(self) -> SearchIndex:
+        if self._search_index is None:
+            self._search_index = SearchIndex.build(
+                self._engine.get_data().items()
+            )
+        return self._search_index
+
+    @reading
+    def password_book_find_duplicates(
+        self, app_name: str, acc: str
+    ) -> duplicate_type:
+        """與(`app_name`, `acc`)重複的現有帳號，回傳[(應用程式, 帳號), ...]
+
+        比較NFKC正規化、case folding、去除空白後的名稱（"GitHub"、
+        "github"、全形"ＧｉｔＨｕｂ"相同）。新增前檢查為O(1)；第一次查詢
+        某個應用程式時才建立它的帳號索引，延遲載入時不會解析其他應用程式。"""
+        ArgType("app_name", app_name, str)
+        ArgType("acc", acc, str)
+        return self._get_duplicate_index().find(app_name, acc)
+
+    @reading
+    def password_book_app_variants(self, app_name: str) -> list[str]:
+        """正規化後與`app_name`相同的現有應用程式名稱（包含`app_name`）"""
+        ArgType("app_name", app_name, str)
+        return self._get_duplicate_index().app_variants(app_name)
+
+    @writing
+    def password_book_dedupe(self, *, dry_run: bool = False) -> DedupePlan:
+        """掃描整本密碼本一次，合併重複的應用程式與帳號（見`plan_dedupe`）
+
+        正規化後相同的應用程式併入帳號最多的名稱；密碼相同的重複帳號
+        合併成一筆（`note`、`user_note`保留全部內容），密碼不同的不合併，
+        列在回傳值的`conflicts`。`dry_run=True`：只回傳結果，不修改。"""
+        ArgType("dry_run", dry_run, bool)
+        plan = plan_dedupe(self._engine.iter_apps())
+        if dry_run is True or not plan:
+            return plan
+        removed: list[tuple[str, AccountRecord]] = []
+        for app, app_data in plan.removed:
+            removed_data = self._engine.delete(app, app_data["acc"])
+            self._indexes_remove(app, removed_data)
+            removed.append((app, removed_data))
+        self._engine.insert_bulk(plan.added)
+        for app, app_data in plan.added:
+            self._indexes_add(app, app_data)
+        self._notifier.emit(ChangeEvent("deleted", removed))
+        self._notifier.emit(ChangeEvent("inserted", plan.added))
+        return plan
+
+    def password_book_generate_passwords(
+        self, count: int = 1, *, policy: PasswordPolicy | None = None
+    ) -> list[str]:
+        """依`policy`（None：16個字元，四種字元都有）以`secrets`產生密碼"""
+        ArgType("count", count, int)
+        ArgType("policy", policy, [PasswordPolicy, None])
+        return list(generate_passwords(count, policy))
+
+    @reading
+    def password_book_audit(
+        self, *, weak_score: int = 1, processes: int = 1
+    ) -> AuditReport:
+        """檢查整本密碼本：哪些帳號使用相同的密碼、哪些是弱密碼（見`audit`）
+
+        與帳號數成線性；`processes`大於1時在行程池計算密碼強度。
+        回傳的報告不含密碼明文，`to_dict()`可以直接輸出成JSON。"""
+        ArgType("weak_score", weak_score, int)
+        ArgType("processes", processes, int)
+        return audit(
+            self._engine.iter_apps(),
+            weak_score=weak_score,
+            processes=processes,
+        )
+
+    @reading
+    def password_book_breach_check(
+        self, index_path: str, *, processes: int = 1
+    ) -> list[account_ref_type]:
+        """密碼出現在外洩密碼資料中的帳號，不需要網路
+
+        `index_path`：以`breach.build_breach_index`由下載的SHA-1清單建立的
+        索引，查詢時以mmap開啟、二分搜尋；`processes`大於1時在行程池查詢。"""
+        ArgType("index_path", index_path, str, is_exists=True, is_file=True)
+        ArgType("processes", processes, int)
+        return check_accounts(
+            self._engine.iter_apps(), index_path, processes=processes
+        )
+
+    def _get_duplicate_index(self) -> DuplicateIndex:
+        if self._duplicate_index is None:
+            data = self._engine.get_data()
+            self._duplicate_index = DuplicateIndex(
+                (
+                    (
+                        app,
+                        (
+                            data.app_len(app)
+                            if isinstance(data, LazyAppDict)
+                            else len(data[app])
+                        ),
+                    )
+                    for app in dict.keys(data)
+                    if app != "trash_can"
+                ),
+                self._engine.search,
+            )
+        return self._duplicate_index
+
+    def _indexes_add(self, app: str, app_data: dict[str, str]) -> None:
+        """新增帳號之後更新已建立的索引"""
+        if self._search_index is not None:
+            self._search_index.add(app, app_data)
+        if self._duplicate_index is not None:
+            self._duplicate_index.add(app, app_data)
+
+    def _indexes_remove(self, app: str, app_data: dict[str, str]) -> None:
+        """移除帳號之後更新已建立的索引"""
+        if self._search_index is not None:
+            self._search_index.remove(app, app_data)
+        if self._duplicate_index is not None:
+            self._duplicate_index.remove(app, app_data)
+
+    @writing
+    def password_book_close(self) -> None:
+        self._engine.close()
 
     def __str__(self) -> str:
-        return f"""PasswordBookSystem(_data={self._data})"""
+        return f"""PasswordBookSystem(_engine={self._engine})"""
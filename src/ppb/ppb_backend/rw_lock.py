@@ -0,0 +1,129 @@
+import functools
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any, TypeVar
+
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+class RWLock:
+    """讀寫鎖：多個讀取者可以同時進行，寫入者獨占
+
+    - 寫入者優先：有寫入者在等待時，新的讀取者要等它完成，寫入不會餓死
+    - 可重入：持有讀取鎖的執行緒可以再取得讀取鎖；持有寫入鎖的執行緒
+      可以再取得讀取/寫入鎖（例如變更事件的處理函式讀取快照）
+    - 不支援由讀取鎖升級成寫入鎖（會死結），以`RuntimeError`回報"""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition(threading.Lock())
+        self._readers: dict[int, int] = {}
+        """執行緒ident -> 重入次數"""
+        self._writer: int | None = None
+        self._writer_depth: int = 0
+        self._writers_waiting: int = 0
+
+    def acquire_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me or me in self._readers:
+                self._readers[me] = self._readers.get(me, 0) + 1
+                return
+            while self._writer is not None or self._writers_waiting > 0:
+                self._cond.wait()
+            self._readers[me] = 1
+
+    def release_read(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            depth = self._readers[me] - 1
+            if depth > 0:
+                self._readers[me] = depth
+                return
+            del self._readers[me]
+            if len(self._readers) <= 0:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._writer_depth += 1
+                return
+            if me in self._readers:
+                raise RuntimeError("無法由讀取鎖升級成寫入鎖")
+            self._writers_waiting += 1
+            try:
+                while self._writer is not None or len(self._readers) > 0:
+                    self._cond.wait()
+            finally:
+                self._writers_waiting -= 1
+            self._writer = me
+            self._writer_depth = 1
+
+    def release_write(self) -> None:
+        with self._cond:
+            self._writer_depth -= 1
+            if self._writer_depth <= 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+def reading(method: _F) -> _F:
+    """標記為讀取方法（`install_locks`之後以讀取鎖執行）"""
+    method._rw_lock_mode = "read"  # type: ignore[attr-defined]
+    return method
+
+
+def writing(method: _F) -> _F:
+    """標記為寫入方法（`install_locks`之後以寫入鎖執行）"""
+    method._rw_lock_mode = "write"  # type: ignore[attr-defined]
+    return method
+
+
+def install_locks(obj: Any, rw_lock: RWLock) -> None:
+    """在`obj`上以加鎖的版本取代被標記的方法
+
+    只在需要執行緒安全時呼叫；預設模式的方法維持原樣，沒有額外開銷。"""
+    for name in dir(type(obj)):
+        method = getattr(type(obj), name)
+        mode = getattr(method, "_rw_lock_mode", None)
+        if mode is None:
+            continue
+        if mode == "read":
+            acquire, release = rw_lock.acquire_read, rw_lock.release_read
+        else:
+            acquire, release = rw_lock.acquire_write, rw_lock.release_write
+        setattr(obj, name, _locked(getattr(obj, name), acquire, release))
+
+
+def _locked(
+    bound_method: Callable[..., Any],
+    acquire: Callable[[], None],
+    release: Callable[[], None],
+) -> Callable[..., Any]:
+    @functools.wraps(bound_method)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        acquire()
+        try:
+            return bound_method(*args, **kwargs)
+        finally:
+            release()
+
+    return wrapper
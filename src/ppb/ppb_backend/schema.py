@@ -0,0 +1,60 @@
+from collections.abc import Mapping
+from typing import Any
+
+from .account_record import AccountRecord
+
+SCHEMA_VERSION: int = 1
+"""帳號資料的schema版本
+
+- 0：沒有版本號的舊檔案，可能有`usernote`、缺少欄位
+- 1：每筆都有`acc`、`pwd`、`note`、`user_note`（字串）"""
+
+SCHEMA_KEY: str = "schema_version"
+"""JSON檔案第一層記錄版本號的key（值為整數，與應用程式的清單區分）"""
+
+RESERVED_APP_NAMES: tuple[str, ...] = ("trash_can", SCHEMA_KEY)
+"""不能當作應用程式名稱：與垃圾桶、版本號使用同一層的key"""
+
+_RENAMED_FIELDS: dict[str, str] = {"usernote": "user_note"}
+"""舊欄位名稱 -> 新欄位名稱"""
+
+
+def check_app_name(app: str) -> None:
+    """`app`是保留名稱時引發`ValueError`（存檔後會遺失或變成垃圾桶）"""
+    if app in RESERVED_APP_NAMES:
+        raise ValueError(f"「{app}」是保留名稱")
+
+
+def pop_schema_version(data: dict) -> int:
+    """取出（並移除）JSON第一層的版本號；沒有時為0"""
+    version = data.get(SCHEMA_KEY)
+    if type(version) is int:
+        del data[SCHEMA_KEY]
+        return version
+    return 0
+
+
+def normalize_record(app_data: Mapping[str, Any]) -> AccountRecord:
+    """舊欄位改名、補上缺少的欄位（空字串）"""
+    record = AccountRecord.from_dict(app_data)
+    extra = record.extra
+    if extra is not None:
+        for old_key, new_key in _RENAMED_FIELDS.items():
+            if old_key in extra:
+                value = extra.pop(old_key)
+                if getattr(record, new_key) is None:
+                    setattr(record, new_key, value)
+        if len(extra) <= 0:
+            record.extra = None
+    for key in AccountRecord.FIELDS:
+        if getattr(record, key) is None:
+            setattr(record, key, "")
+    return record
+
+
+def normalize_trash_entry(entry: dict[str, str]) -> None:
+    """垃圾桶項目是扁平的`dict`，直接改名"""
+    for old_key, new_key in _RENAMED_FIELDS.items():
+        if old_key in entry:
+            value = entry.pop(old_key)
+            entry.setdefault(new_key, value)
@@ -0,0 +1,309 @@
+import bisect
+import difflib
+import re
+import unicodedata
+from array import array
+from collections import Counter
+from collections.abc import Iterable
+
+search_result_type = list[tuple[str, dict[str, str]]]
+"""搜尋結果：[(應用程式, 帳號資料), ...]"""
+
+_SEPARATOR = "\x00"
+"""分隔各欄位，避免n-gram跨欄位"""
+_TEXT_FIELDS: tuple[str, ...] = ("acc", "note", "user_note")
+_NON_ASCII = re.compile("[^\x00-\x7f]")
+
+_FUZZY_SCAN: int = 10000
+"""模糊搜尋最多計數的posting數（由最少見的n-gram開始）"""
+_FUZZY_CANDIDATES: int = 100
+"""模糊搜尋最多以difflib計算相似度的候選數"""
+_COMPACT_MIN: int = 1024
+"""已刪除的帳號超過這個數量、且多於現有帳號時重建索引"""
+
+
+def normalize(text: str) -> str:
+    """NFKC正規化+case folding（全形/半形、大小寫視為相同）"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+def _grams(text: str) -> set[str]:
+    """各欄位的雙字n-gram，加上非ASCII的單字（中文一個字就有意義；
+    英數單字幾乎每筆都有，不建索引）"""
+    grams = set(_NON_ASCII.findall(text))
+    for field in text.split(_SEPARATOR):
+        grams.update(field[i : i + 2] for i in range(len(field) - 1))
+    return grams
+
+
+def _query_grams(query: str) -> set[str]:
+    if len(query) == 1:
+        return {query}
+    else:
+        return {query[i : i + 2] for i in range(len(query) - 1)}
+
+
+class SearchIndex:
+    """帳號搜尋索引，隨資料的新增/刪除逐筆更新
+
+    - 前綴：正規化的應用程式名稱、帳號名稱各一個排序好的清單，以
+      `bisect`找到範圍
+    - 子字串：應用程式、`acc`、`note`、`user_note`的n-gram倒排索引，
+      posting是依序遞增的帳號編號（`array`，每個4 bytes）；從最短的
+      posting開始逐一確認，找到`limit`筆就停止
+    - 模糊：由最少見的n-gram開始計數共同n-gram，最多`_FUZZY_CANDIDATES`
+      個候選再以difflib計算相似度
+
+    刪除只把帳號標記為已刪除（posting不變，查詢時略過），已刪除的帳號
+    夠多時才整個重建，攤銷後仍是O(1)。"""
+
+    def __init__(self) -> None:
+        self._reset()
+
+    def _reset(self) -> None:
+        self._apps: list[str | None] = []
+        """帳號編號 -> 應用程式（None：已刪除）"""
+        self._records: list[dict[str, str] | None] = []
+        self._texts: list[str | None] = []
+        self._grams: dict[str, array] = {}
+        self._app_docs: dict[str, array] = {}
+        self._app_counts: dict[str, int] = {}
+        """應用程式 -> 現有的帳號數"""
+        self._app_keys: list[str] = []
+        """排序好的(正規化的應用程式名稱)，與`_app_names`對應"""
+        self._app_names: list[str] = []
+        self._acc_keys: list[str] = []
+        """排序好的(正規化的帳號名稱)，與`_acc_ids`對應"""
+        self._acc_ids: array = array("i")
+        self._dead: int = 0
+
+    @classmethod
+    def build(cls, items: Iterable[tuple[str, list]]) -> "SearchIndex":
+        index = cls()
+        index._build(items)
+        return index
+
+    def _build(self, items: Iterable[tuple[str, list]]) -> None:
+        """一次加入全部帳號，前綴清單最後再一起排序"""
+        accs: list[str] = []
+        for app, app_datas in items:
+            if app == "trash_can":
+                continue
+            for app_data in app_datas:
+                self._append(app, app_data)
+                accs.append(normalize(app_data["acc"]))
+        order = sorted(range(len(accs)), key=accs.__getitem__)
+        self._acc_keys = [accs[i] for i in order]
+        self._acc_ids = array("i", order)
+        apps = sorted((normalize(i), i) for i in self._app_counts)
+        self._app_keys = [key for key, _ in apps]
+        self._app_names = [app for _, app in apps]
+
+    def __len__(self) -> int:
+        return len(self._records) - self._dead
+
+    def _append(self, app: str, app_data: dict[str, str]) -> int:
+        """加入帳號與n-gram（不含前綴清單），回傳帳號編號"""
+        doc_id = len(self._records)
+        # 載入時已正規化（`schema.normalize_record`），欄位一定存在
+        text = _SEPARATOR.join(
+            [normalize(app)] + [normalize(app_data[i]) for i in _TEXT_FIELDS]
+        )
+        self._apps.append(app)
+        self._records.append(app_data)
+        self._texts.append(text)
+        for gram in _grams(text):
+            postings = self._grams.get(gram)
+            if postings is None:
+                self._grams[gram] = array("i", (doc_id,))
+            else:
+                postings.append(doc_id)
+        app_docs = self._app_docs.get(app)
+        if app_docs is None:
+            self._app_docs[app] = array("i", (doc_id,))
+            self._app_counts[app] = 1
+        else:
+            app_docs.append(doc_id)
+            self._app_counts[app] += 1
+        return doc_id
+
+    def add(self, app: str, app_data: dict[str, str]) -> None:
+        is_new_app = app not in self._app_counts
+        doc_id = self._append(app, app_data)
+        acc_key = normalize(app_data["acc"])
+        position = bisect.bisect_right(self._acc_keys, acc_key)
+        self._acc_keys.insert(position, acc_key)
+        self._acc_ids.insert(position, doc_id)
+        if is_new_app is True:
+            app_key = normalize(app)
+            position = bisect.bisect_right(self._app_keys, app_key)
+            self._app_keys.insert(position, app_key)
+            self._app_names.insert(position, app)
+
+    def remove(self, app: str, app_data: dict[str, str]) -> None:
+        """移除一筆帳號（同帳號有多筆時，移除內容相同的那一筆）"""
+        acc_key = normalize(app_data["acc"])
+        low = bisect.bisect_left(self._acc_keys, acc_key)
+        high = bisect.bisect_right(self._acc_keys, acc_key, low)
+        positions = [
+            i
+            for i in range(low, high)
+            if self._apps[self._acc_ids[i]] == app
+        ]
+        if len(positions) <= 0:
+            return
+        records = self._records
+        for found in positions:
+            if records[self._acc_ids[found]] is app_data:
+                break
+        else:
+            found = next(
+                (
+                    i
+                    for i in positions
+                    if records[self._acc_ids[i]] == app_data
+                ),
+                positions[0],
+            )
+        doc_id = self._acc_ids[found]
+        del self._acc_keys[found]
+        del self._acc_ids[found]
+        self._apps[doc_id] = None
+        self._records[doc_id] = None
+        self._texts[doc_id] = None
+        self._dead += 1
+        self._app_counts[app] -= 1
+        if self._app_counts[app] <= 0:
+            del self._app_counts[app]
+            del self._app_docs[app]
+            app_key = normalize(app)
+            position = bisect.bisect_left(self._app_keys, app_key)
+            while self._app_names[position] != app:
+                position += 1
+            del self._app_keys[position]
+            del self._app_names[position]
+        if self._dead > _COMPACT_MIN and self._dead * 2 > len(self._records):
+            self._compact()
+
+    def _compact(self) -> None:
+        """捨棄已刪除的帳號，重建索引"""
+        items = [
+            (app, [app_data])
+            for app, app_data in zip(self._apps, self._records)
+            if app is not None
+        ]
+        self._reset()
+        self._build(items)
+
+    def prefix(self, query: str, limit: int = 50) -> search_result_type:
+        """應用程式名稱或帳號名稱以`query`開頭"""
+        query = normalize(query)
+        doc_ids: list[int] = []
+        position = bisect.bisect_left(self._app_keys, query)
+        while (
+            position < len(self._app_keys)
+            and len(doc_ids) < limit
+            and self._app_keys[position].startswith(query)
+        ):
+            for doc_id in self._app_docs[self._app_names[position]]:
+                if self._records[doc_id] is not None:
+                    doc_ids.append(doc_id)
+                    if len(doc_ids) >= limit:
+                        break
+            position += 1
+        position = bisect.bisect_left(self._acc_keys, query)
+        end = min(position + limit, len(self._acc_keys))
+        while position < end and self._acc_keys[position].startswith(query):
+            doc_ids.append(self._acc_ids[position])
+            position += 1
+        return self._results(dict.fromkeys(doc_ids), limit)
+
+    def substring(self, query: str, limit: int = 50) -> search_result_type:
+        """應用程式、帳號、紀錄或筆記包含`query`"""
+        query = normalize(query)
+        if len(query) <= 0:
+            return []
+        candidates: Iterable[int]
+        if len(query) == 1 and query.isascii() is True:
+            # 英數單字沒有索引，依序掃描（很快就會找到`limit`筆）
+            candidates = range(len(self._texts))
+        else:
+            shortest = None
+            for gram in _query_grams(query):
+                postings = self._grams.get(gram)
+                if postings is None:
+                    return []
+                if shortest is None or len(postings) < len(shortest):
+                    shortest = postings
+            assert shortest is not None
+            candidates = shortest
+        texts = self._texts
+        results: list[int] = []
+        for doc_id in candidates:
+            text = texts[doc_id]
+            if text is not None and query in text:
+                results.append(doc_id)
+                if len(results) >= limit:
+                    break
+        return self._results(results, limit)
+
+    def fuzzy(
+        self, query: str, limit: int = 50, min_score: float = 0.4
+    ) -> list[tuple[float, str, dict[str, str]]]:
+        """模糊搜尋，依相似度（0~1）由高到低排序"""
+        query = normalize(query)
+        if len(query) <= 0:
+            return []
+        # 中文單字也當作候選依據（英數單字沒有索引，只用雙字）
+        grams = _query_grams(query)
+        grams.update(_NON_ASCII.findall(query))
+        postings_list = sorted(
+            (self._grams[i] for i in grams if i in self._grams), key=len
+        )
+        overlap: Counter[int] = Counter()
+        budget = _FUZZY_SCAN
+        for postings in postings_list:
+            if budget <= 0:
+                break
+            overlap.update(postings[:budget])
+            budget -= len(postings)
+        scored: list[tuple[float, int]] = []
+        matcher = difflib.SequenceMatcher(autojunk=False)
+        matcher.set_seq2(query)
+        field_scores: dict[str, float] = {}
+        """同一個應用程式名稱只計算一次"""
+        for doc_id, _ in overlap.most_common(
+            max(_FUZZY_CANDIDATES, limit)
+        ):
+            text = self._texts[doc_id]
+            if text is None:
+                continue
+            best = 0.0
+            for field in text.split(_SEPARATOR, 2)[:2]:
+                score = field_scores.get(field)
+                if score is None:
+                    score = 0.0
+                    matcher.set_seq1(field)
+                    if matcher.real_quick_ratio() >= min_score:
+                        score = matcher.ratio()
+                    if query in field:
+                        score = max(score, 0.9)
+                    field_scores[field] = score
+                best = max(best, score)
+            if best >= min_score:
+                scored.append((best, doc_id))
+        scored.sort(key=lambda i: (-i[0], i[1]))
+        return [
+            (score, *self._doc(doc_id)) for score, doc_id in scored[:limit]
+        ]
+
+    def _doc(self, doc_id: int) -> tuple[str, dict[str, str]]:
+        return self._apps[doc_id], self._records[doc_id]  # type: ignore
+
+    def _results(self, doc_ids: Iterable[int], limit: int) -> search_result_type:
+        results: search_result_type = []
+        for doc_id in doc_ids:
+            results.append(self._doc(doc_id))
+            if len(results) >= limit:
+                break
+        return results
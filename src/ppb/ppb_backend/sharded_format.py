@@ -0,0 +1,310 @@
+import json
+import os
+import threading
+import zlib
+from collections.abc import Callable, Iterable
+from typing import IO, Any
+
+from .account_record import record_to_json
+from .binary_format import (
+    binary_schema_version,
+    is_binary_file,
+    load_binary,
+)
+from .compression import read_file_bytes
+from .lazy_data import LazyAppDict, LazyAppSpan
+from .schema import SCHEMA_KEY, pop_schema_version
+
+SHARD_KEY: str = "ppb_shards"
+"""manifest的第一個key：{"count": 分片數, "generation": 寫入次數}"""
+DEFAULT_SHARD_COUNT: int = 64
+
+_MAGIC: bytes = b'{\n    "ppb_shards": {'
+
+
+def is_sharded_file(file_path: str) -> bool:
+    with open(file_path, "rb") as f:
+        return f.read(len(_MAGIC)) == _MAGIC
+
+
+def shard_of(app: str, shard_count: int) -> int:
+    """應用程式所在的分片（名稱的CRC32，與執行環境無關）"""
+    return zlib.crc32(app.encode("utf-8")) % shard_count
+
+
+def shard_dir_path(file_path: str) -> str:
+    """分片檔案放在manifest旁的`.shards`資料夾"""
+    return os.path.abspath(file_path) + ".shards"
+
+
+class ShardSpan(LazyAppSpan):
+    """尚未載入的應用程式：所在的分片"""
+
+    __slots__ = ("app",)
+
+    def __init__(self, app: str, shard: int, count: int) -> None:
+        super().__init__(shard, shard, count)
+        self.app: str = app
+
+    def __repr__(self) -> str:
+        return f"ShardSpan(shard={self.start}, count={self.count})"
+
+
+class ShardedPasswordBook:
+    """分片格式：一個小的manifest加上多個分片檔案
+
+    manifest（`file_path`）記錄每個應用程式的帳號數、每個分片目前的
+    檔案與垃圾桶；帳號在`.shards`資料夾內，依應用程式名稱分到
+    `shard_count`個分片，每個分片是一個與單一檔案相同格式的JSON。
+
+    分片檔案名稱包含`generation`，寫入時只建立變更過的分片的新檔案，
+    最後以原子操作取代manifest，舊的分片檔案之後才刪除：中途當機時
+    manifest仍指向完整的舊檔案。"""
+
+    def __init__(
+        self, file_path: str, manifest: dict[str, Any] | None = None
+    ) -> None:
+        self.file_path: str = os.path.abspath(file_path)
+        self.shard_dir_path: str = shard_dir_path(file_path)
+        if manifest is None:
+            with open(self.file_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if type(manifest) is not dict or SHARD_KEY not in manifest:
+                raise TypeError("不是分片格式的密碼本")
+        self._lock = threading.Lock()
+        self._cache: tuple[int, dict[str, list]] | None = None
+        """最近讀取的分片中尚未取用的應用程式（依序讀取時不必重複解析）"""
+        self._set_manifest(manifest)
+
+    def _set_manifest(self, manifest: dict[str, Any]) -> None:
+        self.shard_count: int = manifest[SHARD_KEY]["count"]
+        self.generation: int = manifest[SHARD_KEY]["generation"]
+        self.schema_version: int = manifest.get(SCHEMA_KEY, 0)
+        self.app_counts: dict[str, int] = manifest["apps"]
+        self.shard_files: dict[int, str] = {
+            int(shard, 16): file_name
+            for shard, file_name in manifest["shards"].items()
+        }
+        self.trash_can: list = manifest.get("trash_can", [])
+        self._cache = None
+
+    def read_shard(self, shard: int) -> dict[str, list]:
+        """其他程序儲存後舊的分片檔案會被刪除：重新讀取manifest，
+        改讀目前的檔案（之後儲存時會依版本號合併）"""
+        for _ in range(2):
+            file_name = self.shard_files.get(shard)
+            if file_name is None:
+                return {}
+            try:
+                with open(
+                    os.path.join(self.shard_dir_path, file_name),
+                    "r",
+                    encoding="utf-8",
+                ) as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                with open(self.file_path, "r", encoding="utf-8") as f:
+                    self._set_manifest(json.load(f))
+        raise FileNotFoundError(file_name)
+
+    def read_app(self, app: str) -> list:
+        with self._lock:
+            shard = shard_of(app, self.shard_count)
+            if self._cache is None or self._cache[0] != shard:
+                self._cache = (shard, self.read_shard(shard))
+            app_datas = self._cache[1].pop(app, None)
+        if app_datas is None:
+            # 已取用過（例如串流匯出後又解析），重新讀取
+            app_datas = self.read_shard(shard).get(app, [])
+        return app_datas
+
+    def to_dict(self) -> dict[str, list]:
+        """依manifest的順序讀出全部應用程式（每個分片只讀一次）"""
+        shards: dict[int, dict[str, list]] = {}
+        data: dict[str, list] = {"trash_can": self.trash_can}
+        for app in self.app_counts:
+            shard = shard_of(app, self.shard_count)
+            if shard not in shards:
+                shards[shard] = self.read_shard(shard)
+            data[app] = shards[shard].get(app, [])
+        return data
+
+
+def lazy_load_sharded(
+    book: ShardedPasswordBook,
+    on_materialize: Callable[[str, list], None] | None = None,
+) -> LazyAppDict:
+    """只讀取manifest，第一次讀取某個應用程式時才讀取它的分片"""
+    data = LazyAppDict(lambda span: book.read_app(span.app), on_materialize)
+    dict.__setitem__(data, "trash_can", book.trash_can)
+    for app, count in book.app_counts.items():
+        dict.__setitem__(
+            data, app, ShardSpan(app, shard_of(app, book.shard_count), count)
+        )
+    return data
+
+
+def dump_sharded(
+    data: dict,
+    f: IO[str],
+    file_path: str,
+    schema_version: int = 0,
+    *,
+    base: ShardedPasswordBook | None = None,
+    dirty_apps: Iterable[str] | None = None,
+    shard_count: int = DEFAULT_SHARD_COUNT,
+) -> tuple[ShardedPasswordBook, list[str]]:
+    """寫出分片檔案，manifest寫到`f`（由呼叫者取代`file_path`）
+
+    `base`是`file_path`目前的內容且`dirty_apps`不是None時，只重寫
+    `dirty_apps`所在的分片，其餘沿用`base`的檔案。
+
+    回傳(寫入後的`ShardedPasswordBook`, manifest取代後可以刪除的
+    舊分片檔案)。`base`會就地更新，延遲載入的資料仍然可以讀取。"""
+    file_path = os.path.abspath(file_path)
+    if base is not None and base.file_path != file_path:
+        base = None
+    if base is None and os.path.isfile(file_path) is True:
+        if is_sharded_file(file_path) is True:
+            # 覆寫其他分片密碼本：沿用它的generation，檔案名稱才不會重複
+            previous = ShardedPasswordBook(file_path)
+            old_files = set(previous.shard_files.values())
+            generation = previous.generation + 1
+        else:
+            old_files = set()
+            generation = 1
+        shard_files: dict[int, str] = {}
+        dirty_shards: set[int] | None = None
+    elif base is None:
+        old_files = set()
+        generation = 1
+        shard_files = {}
+        dirty_shards = None
+    else:
+        shard_count = base.shard_count
+        old_files = set(base.shard_files.values())
+        generation = base.generation + 1
+        shard_files = dict(base.shard_files)
+        dirty_shards = (
+            None
+            if dirty_apps is None
+            else {
+                shard_of(app, shard_count)
+                for app in dirty_apps
+                if app != "trash_can"
+            }
+        )
+    shard_apps: dict[int, list[str]] = {}
+    app_counts: dict[str, int] = {}
+    for app in dict.keys(data):
+        if app == "trash_can" or app == SCHEMA_KEY:
+            continue
+        shard_apps.setdefault(shard_of(app, shard_count), []).append(app)
+        if isinstance(data, LazyAppDict):
+            app_counts[app] = data.app_len(app)
+        else:
+            app_counts[app] = len(data[app])
+    dir_path = shard_dir_path(file_path)
+    os.makedirs(dir_path, exist_ok=True)
+    for shard in range(shard_count):
+        if dirty_shards is not None and shard not in dirty_shards:
+            continue
+        apps = shard_apps.get(shard)
+        if apps is None:
+            shard_files.pop(shard, None)
+            continue
+        file_name = f"{shard:03x}-{generation}.json"
+        with open(
+            os.path.join(dir_path, file_name), "w", encoding="utf-8"
+        ) as shard_f:
+            json.dump(
+                {
+                    app: (
+                        data.peek(app)
+                        if isinstance(data, LazyAppDict)
+                        else data[app]
+                    )
+                    for app in apps
+                },
+                shard_f,
+                ensure_ascii=False,
+                indent=4,
+                default=record_to_json,
+            )
+            shard_f.flush()
+            os.fsync(shard_f.fileno())
+        shard_files[shard] = file_name
+    if os.name == "posix":
+        dir_fd = os.open(dir_path, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    manifest: dict[str, Any] = {
+        SHARD_KEY: {"count": shard_count, "generation": generation},
+        SCHEMA_KEY: schema_version,
+        "apps": app_counts,
+        "shards": {
+            f"{shard:03x}": shard_files[shard] for shard in sorted(shard_files)
+        },
+        "trash_can": data.get("trash_can", []),
+    }
+    json.dump(manifest, f, ensure_ascii=False, indent=4)
+    if base is None:
+        book = ShardedPasswordBook(file_path, manifest)
+    else:
+        base._set_manifest(manifest)
+        book = base
+    superseded = [
+        os.path.join(dir_path, file_name)
+        for file_name in old_files - set(shard_files.values())
+    ]
+    return book, superseded
+
+
+def remove_files(file_paths: Iterable[str]) -> None:
+    """刪除被取代的分片檔案（已不存在時略過）"""
+    for file_path in file_paths:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            pass
+
+
+def remove_shards(file_path: str) -> None:
+    """分片密碼本被單一檔案取代後，刪除它的`.shards`資料夾"""
+    dir_path = shard_dir_path(file_path)
+    if os.path.isdir(dir_path) is False:
+        return
+    for file_name in os.listdir(dir_path):
+        os.remove(os.path.join(dir_path, file_name))
+    os.rmdir(dir_path)
+
+
+def json_to_sharded(
+    json_file_path: str,
+    sharded_file_path: str,
+    shard_count: int = DEFAULT_SHARD_COUNT,
+) -> None:
+    """把單一檔案（JSON或二進位格式）的密碼本轉換成分片格式"""
+    if is_binary_file(json_file_path) is True:
+        data: Any = load_binary(json_file_path)
+        schema_version = binary_schema_version(json_file_path)
+    else:
+        data = json.loads(read_file_bytes(json_file_path)[0])
+        if type(data) is not dict:
+            raise TypeError()
+        schema_version = pop_schema_version(data)
+    tmp_path = os.path.abspath(sharded_file_path) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        _, superseded = dump_sharded(
+            data,
+            f,
+            sharded_file_path,
+            schema_version,
+            shard_count=shard_count,
+        )
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, sharded_file_path)
+    remove_files(superseded)
@@ -0,0 +1,97 @@
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from types import MappingProxyType
+from typing import Any
+
+from .account_record import AccountRecord
+from .lazy_data import LazyAppDict, LazyAppSpan
+
+
+class AppDataView(Sequence):
+    """應用程式帳號清單的唯讀檢視（不複製清單）
+
+    帳號以`MappingProxyType`包裝：引擎與快照共用同一個帳號物件，
+    直接修改會同時改到引擎的資料（索引不會跟著更新）。"""
+
+    __slots__ = ("_items",)
+
+    def __init__(self, items: list) -> None:
+        self._items = items
+
+    def __getitem__(self, index: Any) -> Any:
+        """`index`為slice時回傳`list`"""
+        if isinstance(index, slice):
+            return [MappingProxyType(i) for i in self._items[index]]
+        return MappingProxyType(self._items[index])
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Mapping[str, Any]]:
+        return map(MappingProxyType, self._items)
+
+    def __repr__(self) -> str:
+        return repr(self._items)
+
+
+def _copy_record(app_data: Mapping[str, Any]) -> dict[str, Any]:
+    if isinstance(app_data, AccountRecord):
+        return app_data.to_dict()
+    return dict(app_data)
+
+
+class PasswordBookSnapshot(Mapping):
+    """密碼本的唯讀快照，介面同`data_type`（`snapshot[app]`、`keys()`…）
+
+    由引擎以copy-on-write提供：建立快照是O(1)，之後的變更會先複製
+    被修改的部分，不影響快照。延遲載入的應用程式在快照內讀取時才解析，
+    且不保留解析結果。帳號資料是唯讀的（`MappingProxyType`），需要修改
+    時請用`to_dict`複製。"""
+
+    __slots__ = ("_data",)
+
+    def __init__(self, data: dict) -> None:
+        self._data = data
+
+    def __getitem__(self, app: str) -> AppDataView:
+        value = dict.__getitem__(self._data, app)
+        if isinstance(value, LazyAppSpan) and isinstance(
+            self._data, LazyAppDict
+        ):
+            value = self._data.peek(app)
+            if app != "trash_can":
+                value = [AccountRecord.from_dict(i) for i in value]
+        return AppDataView(value)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(dict.keys(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, app: Any) -> bool:
+        return dict.__contains__(self._data, app)
+
+    def app_len(self, app: str) -> int:
+        """帳號數量（延遲載入時不必解析）"""
+        if isinstance(self._data, LazyAppDict):
+            return self._data.app_len(app)
+        else:
+            return len(self._data[app])
+
+    def iter_apps(
+        self, apps: Iterable[str] | None = None
+    ) -> Iterator[tuple[str, AppDataView]]:
+        """同`StorageEngine.iter_apps`，不含`trash_can`"""
+        for app in list(self) if apps is None else apps:
+            if app != "trash_can" and app in self:
+                yield app, self[app]
+
+    def to_dict(self) -> dict[str, list]:
+        """複製成`data_type`形式的`dict`（帳號也複製成`dict`，可以修改）"""
+        return {
+            app: [_copy_record(i) for i in self[app]._items]
+            for app in self
+        }
+
+    def __repr__(self) -> str:
+        return f"PasswordBookSnapshot({dict(self.items())!r})"
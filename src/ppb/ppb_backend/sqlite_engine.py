@@ -0,0 +1,434 @@
+import json
+import os
+import sqlite3
+import time
+
+from .account_record import AccountRecord
+from .lazy_data import LazyAppDict, LazyAppSpan
+from .schema import (
+    SCHEMA_KEY,
+    check_app_name,
+    normalize_record,
+    normalize_trash_entry,
+)
+from .schema import (
+    SCHEMA_VERSION as DATA_SCHEMA_VERSION,
+)
+from .snapshot import PasswordBookSnapshot
+from .storage_engine import StorageEngine
+from .trash_can import (
+    entry_deleted_at,
+    entry_to_record,
+    make_entry,
+    trash_entry_type,
+)
+
+SQLITE_MAGIC: bytes = b"SQLite format 3\x00"
+SCHEMA_VERSION: int = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS apps (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY,
+    app_id INTEGER NOT NULL REFERENCES apps(id),
+    acc TEXT NOT NULL,
+    pwd TEXT,
+    note TEXT,
+    user_note TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS accounts_app_acc ON accounts(app_id, acc);
+CREATE INDEX IF NOT EXISTS accounts_acc ON accounts(acc);
+CREATE TABLE IF NOT EXISTS trash_can (
+    id INTEGER PRIMARY KEY,
+    data TEXT NOT NULL,
+    deleted_at REAL NOT NULL DEFAULT 0
+);
+"""
+_SCHEMA_INDEXES = """
+CREATE INDEX IF NOT EXISTS trash_can_deleted_at ON trash_can(deleted_at);
+"""
+_COLUMNS: tuple[str, ...] = ("acc", "pwd", "note", "user_note")
+"""有獨立欄位的key；其他key以JSON存在`extra`"""
+
+
+def is_sqlite_file(file_path: str) -> bool:
+    with open(file_path, "rb") as f:
+        return f.read(len(SQLITE_MAGIC)) == SQLITE_MAGIC
+
+
+def _row_to_app_data(row: tuple) -> AccountRecord:
+    return AccountRecord(
+        *row[:4], json.loads(row[4]) if row[4] is not None else None
+    )
+
+
+def _app_data_to_row(app_data: dict[str, str]) -> tuple:
+    extra = {
+        key: value for key, value in app_data.items() if key not in _COLUMNS
+    }
+    return (
+        app_data["acc"],
+        app_data.get("pwd"),
+        app_data.get("note"),
+        app_data.get("user_note"),
+        json.dumps(extra, ensure_ascii=False) if len(extra) > 0 else None,
+    )
+
+
+class SqliteStorageEngine(StorageEngine):
+    """以`sqlite3`儲存；每個變更是一個交易，直接寫入已綁定的檔案"""
+
+    name: str = "sqlite"
+
+    def __init__(self) -> None:
+        self._conn: sqlite3.Connection | None = None
+        self._file_path: str | None = None
+        self._generation: int = 0
+        self._saved_generation: int = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            raise TypeError()
+        return self._conn
+
+    def _connect(self, file_path: str | None) -> None:
+        self.close()
+        self._conn = sqlite3.connect(
+            ":memory:" if file_path is None else file_path,
+            check_same_thread=False,
+        )
+        self._file_path = (
+            None if file_path is None else os.path.abspath(file_path)
+        )
+        with self._conn:
+            self._conn.executescript(_SCHEMA)
+            self._migrate()
+            self._conn.executescript(_SCHEMA_INDEXES)
+            self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._saved_generation = self._generation
+
+    def _migrate(self) -> None:
+        """v1 -> v2：垃圾桶加上`deleted_at`
+        v2 -> v3：帳號欄位正規化（`schema.normalize_record`）"""
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        columns = [
+            row[1]
+            for row in self.conn.execute("PRAGMA table_info(trash_can)")
+        ]
+        if "deleted_at" not in columns:
+            self.conn.execute(
+                "ALTER TABLE trash_can"
+                " ADD COLUMN deleted_at REAL NOT NULL DEFAULT 0"
+            )
+            self.conn.execute(
+                "UPDATE trash_can SET deleted_at = ?", (time.time(),)
+            )
+        if version < 3:
+            self._migrate_records()
+
+    def _migrate_records(self) -> None:
+        """舊欄位改名、NULL改成空字串；只更新有變動的列"""
+        rows = self.conn.execute(
+            "SELECT id, acc, pwd, note, user_note, extra FROM accounts"
+            " WHERE pwd IS NULL OR note IS NULL OR user_note IS NULL"
+            " OR extra IS NOT NULL"
+        ).fetchall()
+        updates: list[tuple] = []
+        for row in rows:
+            app_data = normalize_record(_row_to_app_data(row[1:]))
+            new_row = _app_data_to_row(app_data)
+            if new_row != row[1:]:
+                updates.append((*new_row[1:], row[0]))
+        self.conn.executemany(
+            "UPDATE accounts SET pwd = ?, note = ?, user_note = ?, extra = ?"
+            " WHERE id = ?",
+            updates,
+        )
+        trash_updates: list[tuple[str, int]] = []
+        for trash_id, data in self.conn.execute(
+            "SELECT id, data FROM trash_can"
+        ).fetchall():
+            entry = json.loads(data)
+            normalize_trash_entry(entry)
+            new_data = json.dumps(entry, ensure_ascii=False)
+            if new_data != data:
+                trash_updates.append((new_data, trash_id))
+        self.conn.executemany(
+            "UPDATE trash_can SET data = ? WHERE id = ?", trash_updates
+        )
+
+    def new(self) -> None:
+        self._connect(None)
+
+    def load(self, file_path: str) -> None:
+        self._connect(file_path)
+
+    def save(self, file_path: str, force: bool = False) -> None:
+        """已綁定的檔案在每次變更時就已寫入；其他路徑則備份過去並改綁定"""
+        file_path = os.path.abspath(file_path)
+        if file_path != self._file_path:
+            tmp_path = file_path + ".tmp"
+            if os.path.exists(tmp_path) is True:
+                os.remove(tmp_path)
+            dest = sqlite3.connect(tmp_path)
+            try:
+                self.conn.backup(dest)
+            finally:
+                dest.close()
+            os.replace(tmp_path, file_path)
+            self._connect(file_path)
+        self._saved_generation = self._generation
+
+    def flush(self) -> None:
+        pass
+
+    def is_dirty(self, file_path: str | None = None) -> bool:
+        if file_path is not None and (
+            self._file_path != os.path.abspath(file_path)
+        ):
+            return True
+        return self._generation != self._saved_generation
+
+    def compact(self) -> None:
+        self.conn.execute("VACUUM")
+
+    def _app_id(self, app: str) -> int | None:
+        row = self.conn.execute(
+            "SELECT id FROM apps WHERE name = ?", (app,)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def insert(self, app: str, app_data: dict[str, str]) -> None:
+        with self.conn:
+            self.insert_many(app, [app_data])
+
+    def insert_many(self, app: str, app_datas: list[dict[str, str]]) -> None:
+        """在目前的交易內新增（由呼叫者負責`with conn:`）"""
+        check_app_name(app)
+        app_id = self._app_id(app)
+        if app_id is None:
+            cursor = self.conn.execute(
+                "INSERT INTO apps (name) VALUES (?)", (app,)
+            )
+            app_id = cursor.lastrowid
+        self.conn.executemany(
+            "INSERT INTO accounts (app_id, acc, pwd, note, user_note, extra)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [(app_id, *_app_data_to_row(i)) for i in app_datas],
+        )
+        self._generation += 1
+
+    def insert_bulk(self, items: list[tuple[str, dict[str, str]]]) -> None:
+        """依應用程式分組，一個交易新增"""
+        groups: dict[str, list[dict[str, str]]] = {}
+        for app, app_data in items:
+            groups.setdefault(app, []).append(app_data)
+        with self.conn:
+            for app, app_datas in groups.items():
+                self.insert_many(app, app_datas)
+
+    def import_data(self, data: dict) -> None:
+        """一個交易匯入`data_type`格式的資料（舊版本的資料先正規化）"""
+        version = data.get(SCHEMA_KEY)
+        old_schema = (
+            type(version) is not int or version < DATA_SCHEMA_VERSION
+        )
+        with self.conn:
+            for app, app_datas in data.items():
+                if app == SCHEMA_KEY:
+                    continue
+                elif app == "trash_can":
+                    for entry in app_datas:
+                        if old_schema is True:
+                            entry = dict(entry)
+                            normalize_trash_entry(entry)
+                        self._trash_insert(entry)
+                elif old_schema is True:
+                    self.insert_many(
+                        app, [normalize_record(i) for i in app_datas]
+                    )
+                else:
+                    self.insert_many(app, list(app_datas))
+
+    def update(
+        self, app: str, acc: str, changes: dict[str, str]
+    ) -> tuple[AccountRecord, AccountRecord]:
+        with self.conn:
+            row = self.conn.execute(
+                "SELECT accounts.id, acc, pwd, note, user_note, extra"
+                " FROM accounts JOIN apps ON apps.id = accounts.app_id"
+                " WHERE apps.name = ? AND accounts.acc = ?"
+                " ORDER BY accounts.id LIMIT 1",
+                (app, acc),
+            ).fetchone()
+            if row is None:
+                raise IndexError()
+            old_data = _row_to_app_data(row[1:])
+            new_data = AccountRecord.from_dict(
+                {**old_data.to_dict(), **changes}
+            )
+            self.conn.execute(
+                "UPDATE accounts SET acc = ?, pwd = ?, note = ?,"
+                " user_note = ?, extra = ? WHERE id = ?",
+                (*_app_data_to_row(new_data), row[0]),
+            )
+        self._generation += 1
+        return old_data, new_data
+
+    def delete(self, app: str, acc: str) -> AccountRecord:
+        with self.conn:
+            app_id = self._app_id(app)
+            if app_id is None:
+                raise IndexError()
+            app_data = self._delete_row(app, app_id, acc)
+        self._generation += 1
+        return app_data
+
+    def _delete_row(self, app: str, app_id: int, acc: str) -> AccountRecord:
+        """在目前的交易內刪除`app`的第一筆`acc`"""
+        row = self.conn.execute(
+            "SELECT id, acc, pwd, note, user_note, extra FROM accounts"
+            " WHERE app_id = ? AND acc = ? ORDER BY id LIMIT 1",
+            (app_id, acc),
+        ).fetchone()
+        if row is None:
+            raise IndexError()
+        self.conn.execute("DELETE FROM accounts WHERE id = ?", (row[0],))
+        if self.count(app) <= 0:
+            self.conn.execute("DELETE FROM apps WHERE id = ?", (app_id,))
+        return _row_to_app_data(row[1:])
+
+    def _trash_insert(self, entry: trash_entry_type) -> int:
+        data = {
+            key: value for key, value in entry.items() if key != "trash_id"
+        }
+        cursor = self.conn.execute(
+            "INSERT INTO trash_can (data, deleted_at) VALUES (?, ?)",
+            (json.dumps(data, ensure_ascii=False), entry_deleted_at(entry)),
+        )
+        return cursor.lastrowid  # type: ignore[return-value]
+
+    def move_to_trash_can(
+        self, app: str, acc: str
+    ) -> tuple[int, AccountRecord]:
+        with self.conn:
+            app_id = self._app_id(app)
+            if app_id is None:
+                raise KeyError()
+            app_data = self._delete_row(app, app_id, acc)
+            trash_id = self._trash_insert(
+                make_entry(app, app_data, 0, time.time())
+            )
+        self._generation += 1
+        return trash_id, app_data
+
+    def restore_from_trash_can(
+        self, trash_id: int
+    ) -> tuple[str, AccountRecord]:
+        with self.conn:
+            row = self.conn.execute(
+                "SELECT data FROM trash_can WHERE id = ?", (trash_id,)
+            ).fetchone()
+            if row is None:
+                raise KeyError()
+            self.conn.execute("DELETE FROM trash_can WHERE id = ?", (trash_id,))
+            app, app_data = entry_to_record(json.loads(row[0]))
+            self.insert_many(app, [app_data])
+        return app, app_data
+
+    def purge_trash_can(self, before: float) -> list[int]:
+        """以`deleted_at`索引一次刪除過期項目"""
+        with self.conn:
+            trash_ids = [
+                row[0]
+                for row in self.conn.execute(
+                    "SELECT id FROM trash_can WHERE deleted_at < ?", (before,)
+                )
+            ]
+            if len(trash_ids) > 0:
+                self.conn.execute(
+                    "DELETE FROM trash_can WHERE deleted_at < ?", (before,)
+                )
+        if len(trash_ids) > 0:
+            self._generation += 1
+        return trash_ids
+
+    def trash_can_items(self) -> list[trash_entry_type]:
+        items: list[trash_entry_type] = []
+        for trash_id, data in self.conn.execute(
+            "SELECT id, data FROM trash_can ORDER BY id"
+        ):
+            entry = json.loads(data)
+            entry["trash_id"] = str(trash_id)
+            items.append(entry)
+        return items
+
+    def exists(self, app: str, acc: str | None = None) -> bool:
+        if acc is None:
+            return self._app_id(app) is not None
+        row = self.conn.execute(
+            "SELECT 1 FROM accounts JOIN apps ON apps.id = accounts.app_id"
+            " WHERE apps.name = ? AND accounts.acc = ? LIMIT 1",
+            (app, acc),
+        ).fetchone()
+        return row is not None
+
+    def count(self, app: str) -> int:
+        row = self.conn.execute(
+            "SELECT COUNT(*) FROM accounts JOIN apps"
+            " ON apps.id = accounts.app_id WHERE apps.name = ?",
+            (app,),
+        ).fetchone()
+        return row[0]
+
+    def _app_records(self, app_id: int) -> list[dict[str, str]]:
+        return [
+            _row_to_app_data(row)
+            for row in self.conn.execute(
+                "SELECT acc, pwd, note, user_note, extra FROM accounts"
+                " WHERE app_id = ? ORDER BY id",
+                (app_id,),
+            )
+        ]
+
+    def search(self, app: str) -> list | None:
+        if app == "trash_can":
+            return None
+        app_id = self._app_id(app)
+        if app_id is None:
+            return None
+        return self._app_records(app_id)
+
+    def get_data(self) -> dict:
+        """`data_type`形式的檢視，應用程式的帳號在讀取時才查詢"""
+        data = LazyAppDict(lambda span: self._app_records(span.start))
+        dict.__setitem__(data, "trash_can", self.trash_can_items())
+        for app_id, app, count in self.conn.execute(
+            "SELECT apps.id, apps.name, COUNT(accounts.id) FROM apps"
+            " LEFT JOIN accounts ON accounts.app_id = apps.id"
+            " GROUP BY apps.id ORDER BY apps.id"
+        ):
+            dict.__setitem__(data, app, LazyAppSpan(app_id, app_id, count))
+        return data
+
+    def snapshot(self) -> PasswordBookSnapshot:
+        """讀出全部資料（O(n)，SQLite沒有可以長期保留的唯讀檢視）"""
+        data: dict = {"trash_can": self.trash_can_items()}
+        for app_id, app in self.conn.execute(
+            "SELECT id, name FROM apps ORDER BY id"
+        ):
+            data[app] = self._app_records(app_id)
+        return PasswordBookSnapshot(data)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __str__(self) -> str:
+        return f"""SqliteStorageEngine(file_path={self._file_path})"""
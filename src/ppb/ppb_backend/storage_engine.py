@@ -0,0 +1,140 @@
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator
+from typing import Literal
+
+from .account_record import AccountRecord
+from .lazy_data import LazyAppDict
+from .snapshot import PasswordBookSnapshot
+from .trash_can import trash_entry_type
+
+data_type = dict[
+    str,
+    list[
+        dict[
+            Literal["acc", "pwd", "note", "usernote", "email"] | str,
+            str,
+        ]
+    ],
+]
+
+
+class StorageEngine(ABC):
+    """`PasswordBookSystem`底下的儲存引擎
+
+    參數檢查由`PasswordBookSystem`負責，引擎只處理資料。除了`iter_apps`，
+    每個方法都必須實作。"""
+
+    name: str = ""
+    on_merge: Callable[[], None] | None = None
+    """合併了其他程序寫入的檔案後呼叫（資料已整個換掉）"""
+
+    @abstractmethod
+    def new(self) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def load(self, file_path: str) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def save(self, file_path: str, force: bool = False) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def flush(self) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def is_dirty(self, file_path: str | None = None) -> bool:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def compact(self) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def insert(self, app: str, app_data: dict[str, str]) -> None:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def insert_bulk(self, items: list[tuple[str, dict[str, str]]]) -> None:
+        """一次新增多筆（已驗證的）帳號，視為一個變更"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def update(
+        self, app: str, acc: str, changes: dict[str, str]
+    ) -> tuple[AccountRecord, AccountRecord]:
+        """修改一筆帳號（`changes`可包含新的`acc`），回傳(修改前, 修改後)"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def delete(self, app: str, acc: str) -> dict[str, str]:
+        """刪除一筆帳號，回傳被刪除的帳號資料"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def move_to_trash_can(
+        self, app: str, acc: str
+    ) -> tuple[int, AccountRecord]:
+        """把一筆帳號移到垃圾桶，回傳(`trash_id`, 帳號資料)"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def restore_from_trash_can(
+        self, trash_id: int
+    ) -> tuple[str, AccountRecord]:
+        """從垃圾桶還原，回傳(應用程式, 帳號資料)"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def purge_trash_can(self, before: float) -> list[int]:
+        """永久刪除在`before`（Unix時間）之前移到垃圾桶的項目，
+        回傳被刪除的`trash_id`"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def trash_can_items(self) -> list[trash_entry_type]:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def exists(self, app: str, acc: str | None = None) -> bool:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def count(self, app: str) -> int:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def search(self, app: str) -> list | None:
+        """複製的帳號清單，修改它不影響引擎"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def get_data(self) -> dict:
+        """引擎內部的資料（`PasswordBookSystem`以外請用`snapshot`）"""
+        raise NotImplementedError()
+
+    @abstractmethod
+    def snapshot(self) -> PasswordBookSnapshot:
+        """唯讀快照，之後的變更不影響它"""
+        raise NotImplementedError()
+
+    def iter_apps(
+        self, apps: Iterable[str] | None = None
+    ) -> Iterator[tuple[str, list]]:
+        """逐一產生(應用程式, 帳號清單)，不含`trash_can`
+
+        延遲載入的應用程式解析後不保留，整本匯出只需要一個應用程式的記憶體。"""
+        data = self.get_data()
+        for app in list(data.keys()) if apps is None else apps:
+            if app == "trash_can" or app not in data:
+                continue
+            if isinstance(data, LazyAppDict):
+                yield app, data.peek(app)
+            else:
+                yield app, data[app]
+
+    @abstractmethod
+    def close(self) -> None:
+        raise NotImplementedError()
@@ -0,0 +1,128 @@
+import bisect
+import datetime
+import heapq
+import time
+from array import array
+from collections.abc import Iterable, Mapping
+
+from .account_record import AccountRecord
+
+trash_entry_type = dict[str, str]
+"""垃圾桶內的一筆：帳號資料的欄位，加上`app`、`trash_id`、`deleted_at`"""
+
+TRASH_META_KEYS: tuple[str, ...] = ("app", "trash_id", "deleted_at")
+"""垃圾桶另外記錄的key（值皆為字串，二進位格式也能儲存）"""
+
+
+def make_entry(
+    app: str, app_data: Mapping[str, str], trash_id: int, deleted_at: float
+) -> trash_entry_type:
+    entry: trash_entry_type = dict(app_data)
+    entry["app"] = app
+    entry["trash_id"] = str(trash_id)
+    entry["deleted_at"] = datetime.datetime.fromtimestamp(
+        deleted_at, datetime.UTC
+    ).isoformat()
+    return entry
+
+
+def entry_deleted_at(entry: trash_entry_type) -> float:
+    """刪除時間（Unix時間）；沒有記錄時視為現在"""
+    deleted_at = entry.get("deleted_at")
+    if deleted_at is None:
+        return time.time()
+    return datetime.datetime.fromisoformat(deleted_at).timestamp()
+
+
+def entry_to_record(entry: trash_entry_type) -> tuple[str, AccountRecord]:
+    """還原成(應用程式, 帳號資料)"""
+    app_data = {
+        key: value
+        for key, value in entry.items()
+        if key not in TRASH_META_KEYS
+    }
+    return entry["app"], AccountRecord.from_dict(app_data)
+
+
+class TrashCan:
+    """`data_type["trash_can"]`清單的索引
+
+    - `trash_id` -> 遞增的編號，`_order`依清單順序存放編號：位置是編號
+      在`_order`中的位置（二分搜尋），移除時兩邊各刪一格，保持順序
+    - 依刪除時間排序的heap：清除過期項目時只取出過期的部分，不必掃描整個清單"""
+
+    def __init__(self, entries: list[trash_entry_type]) -> None:
+        self.entries: list[trash_entry_type] = entries
+        self._slots: dict[int, int] = {}
+        """trash_id -> 編號"""
+        self._order: array = array("q", range(len(entries)))
+        self._heap: list[tuple[float, int]] = []
+        self._next_id: int = 0
+        for entry in entries:
+            if "trash_id" in entry:
+                self._next_id = max(self._next_id, int(entry["trash_id"]) + 1)
+        for position, entry in enumerate(entries):
+            if "trash_id" not in entry:
+                entry["trash_id"] = str(self._next_id)
+                self._next_id += 1
+            trash_id = int(entry["trash_id"])
+            self._slots[trash_id] = position
+            self._heap.append((entry_deleted_at(entry), trash_id))
+        heapq.heapify(self._heap)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, trash_id: int) -> bool:
+        return trash_id in self._slots
+
+    def add(
+        self,
+        app: str,
+        app_data: Mapping[str, str],
+        *,
+        trash_id: int | None = None,
+        deleted_at: float | None = None,
+    ) -> trash_entry_type:
+        """放入垃圾桶（`trash_id`、`deleted_at`由日誌重播時指定）"""
+        if trash_id is None:
+            trash_id = self._next_id
+        if deleted_at is None:
+            deleted_at = time.time()
+        self._next_id = max(self._next_id, trash_id + 1)
+        entry = make_entry(app, app_data, trash_id, deleted_at)
+        slot = self._order[-1] + 1 if len(self._order) > 0 else 0
+        self._slots[trash_id] = slot
+        self._order.append(slot)
+        self.entries.append(entry)
+        heapq.heappush(self._heap, (deleted_at, trash_id))
+        return entry
+
+    def pop(self, trash_id: int) -> trash_entry_type:
+        """從垃圾桶移除並回傳，其他項目的順序不變（heap內的舊項目在
+        清除時略過）"""
+        slot = self._slots.pop(trash_id)
+        position = bisect.bisect_left(self._order, slot)
+        del self._order[position]
+        return self.entries.pop(position)
+
+    def remove_many(self, trash_ids: Iterable[int]) -> None:
+        """一次移除多個項目（清除過期項目），O(n)"""
+        slots = {self._slots.pop(i) for i in trash_ids if i in self._slots}
+        if len(slots) <= 0:
+            return
+        kept = [
+            i for i, slot in enumerate(self._order) if slot not in slots
+        ]
+        # 就地修改：`entries`就是`data_type["trash_can"]`
+        self.entries[:] = [self.entries[i] for i in kept]
+        self._order = array("q", (self._order[i] for i in kept))
+
+    def expired(self, before: float) -> list[int]:
+        """在`before`（Unix時間）之前刪除的`trash_id`"""
+        trash_ids: list[int] = []
+        while len(self._heap) > 0 and self._heap[0][0] < before:
+            _, trash_id = heapq.heappop(self._heap)
+            if trash_id in self._slots:
+                trash_ids.append(trash_id)
+        return trash_ids
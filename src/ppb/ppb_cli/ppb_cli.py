@@ -1,16 +1,30 @@
-import os
+import datetime
 import json
 import logging
-import datetime
-
-from typing import Literal, Optional
+import os
+import sys
+import time
+from typing import Literal
 
 import typer
-
 from positive_tool import pt
 
+from ..ppb_backend import (
+    benchmark as backend_benchmark,
+)
+from ..ppb_backend import (
+    binary_format,
+    breach,
+    password_generator,
+    ppb_backend,
+    sharded_format,
+)
+from ..ppb_backend.audit import SCORE_LABELS
+from ..ppb_backend.compression import CompressedWriter
+from ..ppb_backend.lazy_data import dump_json
+from ..ppb_backend.schema import SCHEMA_KEY, SCHEMA_VERSION
+from ..ppb_backend.sqlite_engine import SqliteStorageEngine
 from ..project_infos import project_infos
-from ..ppb_backend import ppb_backend
 
 app_cli = typer.Typer()
 
@@ -19,25 +33,29 @@ server_text_arg_type = dict[str, list]
 例：
 {
     "actions": [
-        "get_data"
+        "get_data",
+        "search:應用程式名稱"
     ]
 }"""
 
 
 def server_text(server_text_arg: server_text_arg_type):
     backend = ppb_backend.PasswordBookSystem(
-        os.path.join(project_infos["project_path"], "password_data.json")
+        os.path.join(project_infos["project_path"], "password_data.json"),
+        lazy_load=True,
     )
     print(server_text_arg)
     for action in server_text_arg["actions"]:
         if "get_data" in action:
-            print(str(backend.password_book_get_data()))
+            print(str(backend.password_book_snapshot().to_dict()))
+        elif action.startswith("search:"):
+            print(str(backend.password_book_search(action[7:])))
 
 
 @app_cli.command()
 def server(
     server_type: Literal["text"] = "text",
-    server_text_arg: Optional[str] = None,
+    server_text_arg: str | None = None,
 ):  # TODO:待支持檔案方式
     if server_type == "text":
         if type(server_text_arg) is str:
@@ -48,6 +66,311 @@ def server(
         print(f"錯誤！server_type=「{server_type}」")
 
 
+@app_cli.command()
+def convert(
+    src_file_path: str,
+    dst_file_path: str,
+    file_format: Literal["json", "binary", "sqlite", "sharded"] = "binary",
+    shard_count: int = sharded_format.DEFAULT_SHARD_COUNT,
+    compact: bool = False,
+    compression: Literal["none", "gzip", "lzma", "zlib"] = "none",
+):
+    """轉換密碼本格式（來源格式自動偵測）
+
+    sharded：manifest（`dst_file_path`）加上`.shards`資料夾內的分片檔案
+    json：`--compact`不縮排，`--compression`壓縮（載入時自動判斷）"""
+    backend = ppb_backend.PasswordBookSystem(src_file_path)
+    data = {
+        SCHEMA_KEY: SCHEMA_VERSION,
+        **backend.password_book_snapshot().to_dict(),
+    }
+    backend.password_book_close()
+    if file_format == "json":
+        with CompressedWriter(dst_file_path, compression) as f:
+            dump_json(
+                data,
+                f,
+                SCHEMA_VERSION,
+                indent=None if compact is True else 4,
+            )
+    elif file_format == "binary":
+        with open(dst_file_path, "wb") as f:
+            binary_format.dump_binary(data, f, SCHEMA_VERSION)
+    elif file_format == "sharded":
+        with open(dst_file_path + ".tmp", "w", encoding="utf-8") as f:
+            _, superseded = sharded_format.dump_sharded(
+                data,
+                f,
+                dst_file_path,
+                SCHEMA_VERSION,
+                shard_count=shard_count,
+            )
+        os.replace(dst_file_path + ".tmp", dst_file_path)
+        sharded_format.remove_files(superseded)
+    else:
+        engine = SqliteStorageEngine()
+        engine.new()
+        engine.import_data(data)
+        engine.save(dst_file_path)
+        engine.close()
+    print(f"已轉換：「{src_file_path}」->「{dst_file_path}」")
+
+
+@app_cli.command(name="import")
+def import_file(
+    src_file_path: str,
+    file_format: Literal["auto", "csv", "json"] = "auto",
+):
+    """匯入其他密碼管理器匯出的CSV/JSON（全部檢查通過才寫入）"""
+    data_file_path = os.path.join(
+        project_infos["project_path"], "password_data.json"
+    )
+    backend = ppb_backend.PasswordBookSystem(
+        data_file_path if os.path.exists(data_file_path) else None
+    )
+    try:
+        count = backend.password_book_import(
+            src_file_path, file_format=file_format, file_path=data_file_path
+        )
+    except ppb_backend.BulkImportError as e:
+        print(f"錯誤！共{len(e.errors)}列資料有誤，未匯入任何資料：")
+        print(e)
+        raise typer.Exit(1)
+    finally:
+        backend.password_book_close()
+    print(f"已匯入{count}筆：「{src_file_path}」")
+
+
+@app_cli.command()
+def export(
+    dst_file_path: str,
+    file_format: Literal["csv", "jsonl", "json"] = "jsonl",
+    app: list[str] | None = None,
+    field: list[str] | None = None,
+):
+    """串流匯出密碼本（`dst_file_path`為「-」時輸出到stdout）"""
+    backend = ppb_backend.PasswordBookSystem(
+        os.path.join(project_infos["project_path"], "password_data.json"),
+        lazy_load=True,
+    )
+    try:
+        count = backend.password_book_export(
+            sys.stdout if dst_file_path == "-" else dst_file_path,
+            file_format=file_format,
+            apps=app,
+            fields=ppb_backend.EXPORT_FIELDS if field is None else field,
+        )
+    finally:
+        backend.password_book_close()
+    if dst_file_path != "-":
+        print(f"已匯出{count}筆：「{dst_file_path}」")
+
+
+@app_cli.command()
+def dedupe(dry_run: bool = False):
+    """合併重複的應用程式與帳號（比較NFKC正規化、不分大小寫的名稱）"""
+    data_file_path = os.path.join(
+        project_infos["project_path"], "password_data.json"
+    )
+    backend = ppb_backend.PasswordBookSystem(data_file_path, lazy_load=True)
+    try:
+        plan = backend.password_book_dedupe(dry_run=dry_run)
+        if dry_run is False and plan:
+            backend.password_book_save(data_file_path)
+    finally:
+        backend.password_book_close()
+    for app, others in plan.merged_apps.items():
+        print(f"應用程式「{'」、「'.join(others)}」->「{app}」")
+    for app, app_data, count in plan.merged:
+        print(f"合併{count}筆：「{app}」的「{app_data['acc']}」")
+    for members in plan.conflicts:
+        print(
+            "密碼不同，未合併："
+            + "、".join(f"「{app}」的「{i['acc']}」" for app, i in members)
+        )
+    if not plan:
+        print("沒有重複的帳號")
+    elif dry_run is True:
+        print("（--dry-run：未修改）")
+
+
+@app_cli.command()
+def audit(
+    weak_score: int = 1,
+    processes: int = 1,
+    output_json: bool = typer.Option(False, "--json"),
+):
+    """檢查重複使用的密碼與弱密碼（`--json`：輸出完整的報告）"""
+    backend = ppb_backend.PasswordBookSystem(
+        os.path.join(project_infos["project_path"], "password_data.json"),
+        lazy_load=True,
+    )
+    try:
+        report = backend.password_book_audit(
+            weak_score=weak_score, processes=processes
+        )
+    finally:
+        backend.password_book_close()
+    if output_json is True:
+        print(json.dumps(report.to_dict(), ensure_ascii=False, indent=4))
+        return
+    print(f"共{report.total}個帳號")
+    for label, count in zip(SCORE_LABELS, report.score_counts):
+        print(f"  {label}：{count}")
+    for group in report.reused:
+        print(
+            f"{len(group)}個帳號使用相同的密碼："
+            + "、".join(f"「{app}」的「{acc}」" for app, acc in group)
+        )
+    for app, acc, (entropy, score, patterns) in report.weak:
+        print(
+            f"弱密碼（{SCORE_LABELS[score]}，{entropy}位元"
+            + (f"，{', '.join(patterns)}" if len(patterns) > 0 else "")
+            + f"）：「{app}」的「{acc}」"
+        )
+
+
+@app_cli.command(name="breach-index")
+def breach_index(corpus_path: str, index_path: str):
+    """由下載的外洩密碼SHA-1清單（檔案或range資料夾）建立離線查詢用的索引"""
+    count = breach.build_breach_index(corpus_path, index_path)
+    print(f"已建立索引（{count}個SHA-1）：「{index_path}」")
+
+
+@app_cli.command(name="breach-check")
+def breach_check(index_path: str, processes: int = 1):
+    """檢查哪些帳號的密碼出現在外洩密碼索引中（不需要網路）"""
+    backend = ppb_backend.PasswordBookSystem(
+        os.path.join(project_infos["project_path"], "password_data.json"),
+        lazy_load=True,
+    )
+    try:
+        accounts = backend.password_book_breach_check(
+            index_path, processes=processes
+        )
+    finally:
+        backend.password_book_close()
+    for app, acc in accounts:
+        print(f"已外洩的密碼：「{app}」的「{acc}」")
+    print(f"共{len(accounts)}個帳號的密碼已外洩")
+
+
+@app_cli.command()
+def generate(
+    count: int = 1,
+    kind: Literal["random", "pronounceable", "passphrase"] = "random",
+    length: int = 16,
+    words: int = 6,
+    no_symbols: bool = False,
+    exclude_ambiguous: bool = False,
+    wordlist: str | None = None,
+    benchmark: bool = False,
+):
+    """產生密碼（`--benchmark`：只計時，輸出每秒產生的數量）"""
+    policy = ppb_backend.PasswordPolicy(
+        kind,
+        length=length,
+        words=words,
+        symbols=not no_symbols,
+        exclude_ambiguous=exclude_ambiguous,
+        wordlist=(
+            None
+            if wordlist is None
+            else password_generator.load_wordlist(wordlist)
+        ),
+    )
+    if benchmark is True:
+        start = time.perf_counter()
+        for _ in password_generator.generate_passwords(count, policy):
+            pass
+        seconds = time.perf_counter() - start
+        print(
+            f"{policy!r}：{count}個，{seconds:.3f}秒，"
+            f"每秒{count / max(seconds, 1e-9):.0f}個"
+        )
+        return
+    for pwd in password_generator.generate_passwords(count, policy):
+        print(pwd)
+
+
+@app_cli.command()
+def benchmark(
+    size: list[int] | None = None,
+    storage: list[str] | None = None,
+    operation: list[str] | None = None,
+    op_count: int = 1000,
+    repeat: int = 3,
+    seed: int = 0,
+    skew: float = 1.1,
+    no_memory: bool = False,
+    large: bool = False,
+    index_limit: int = 100_000,
+    output: str | None = None,
+    compare: str | None = None,
+):
+    """以合成的密碼本量測後端的載入、儲存、新增、刪除、搜尋（時間與記憶體峰值）
+
+    預設量測1千、1萬、10萬個帳號；`--large`另外量測100萬個帳號
+    （或以`--size`指定）
+    `--index-limit`：帳號數超過時略過搜尋索引的量測（0：不限制）
+    `--output`：結果寫成JSON；`--compare`：與之前的結果比較（比例>1為變慢）"""
+    for name, values, choices in (
+        ("storage", storage, backend_benchmark.STORAGES),
+        ("operation", operation, backend_benchmark.OPERATIONS),
+    ):
+        for i in values or []:
+            if i not in choices:
+                print(f"錯誤！{name}=「{i}」")
+                raise typer.Exit(1)
+    previous = (
+        None if compare is None else backend_benchmark.read_results(compare)
+    )
+
+    def show(result: dict) -> None:
+        peak = result["peak_bytes"]
+        print(
+            f"{result['accounts']:>8} {result['storage']:<8}"
+            f" {result['operation']:<11} {result['best']:>10.4f}秒"
+            f" {result['ops_per_second']:>12.1f}次/秒"
+            + ("" if peak is None else f" {peak / 1024 / 1024:>9.2f}MiB")
+        )
+
+    sizes = list(backend_benchmark.SIZES if size is None else size)
+    if large is True and backend_benchmark.LARGE_SIZE not in sizes:
+        sizes.append(backend_benchmark.LARGE_SIZE)
+    results = backend_benchmark.run_benchmarks(
+        sizes,
+        storages=["json"] if storage is None else storage,  # type: ignore
+        operations=(
+            backend_benchmark.OPERATIONS if operation is None else operation
+        ),
+        op_count=op_count,
+        repeat=repeat,
+        seed=seed,
+        skew=skew,
+        measure_memory=not no_memory,
+        index_limit=index_limit if index_limit > 0 else None,
+        progress=show,
+    )
+    results["version"] = project_infos["version"]
+    if output is not None:
+        backend_benchmark.write_results(results, output)
+        print(f"已寫入結果：「{output}」")
+    if previous is not None:
+        for accounts, storage_name, name, ratio, best, memory_ratio in (
+            backend_benchmark.compare_results(previous, results)
+        ):
+            print(
+                f"{accounts:>8} {storage_name:<8} {name:<11}"
+                f" 時間 x{ratio:.3f}（{best:.4f}秒）"
+                + (
+                    ""
+                    if memory_ratio is None
+                    else f" 記憶體 x{memory_ratio:.3f}"
+                )
+            )
+
+
 @app_cli.command()
 def version():
     typer.echo(f"PPB version v{project_infos['version']}")
@@ -1,35 +1,35 @@
-import os
 import datetime
 import logging
+import os
+from typing import Self
 
-from typing_extensions import Self
-
-from PySide6.QtWidgets import (
-    QLabel,
-    QVBoxLayout,
-    QHBoxLayout,
-    QPushButton,
-    QWidget,
-    QApplication,
-    QMainWindow,
-    QScrollArea,
-    QGroupBox,
-)
-from PySide6.QtCore import Qt, QPoint, QEvent
+from positive_tool import pt
+from PySide6.QtCore import QEvent, QPoint, Qt, Signal
 from PySide6.QtGui import (
-    QIcon,
-    QMouseEvent,
+    QCloseEvent,
+    QColor,
     QFont,
     QFontDatabase,
-    QColor,
+    QIcon,
+    QMouseEvent,
     QPalette,
 )
+from PySide6.QtWidgets import (
+    QApplication,
+    QGroupBox,
+    QHBoxLayout,
+    QLabel,
+    QMainWindow,
+    QMessageBox,
+    QPushButton,
+    QScrollArea,
+    QVBoxLayout,
+    QWidget,
+)
 
-from positive_tool import pt
-
-from . import styles
-from ..project_infos import project_infos
 from ..ppb_backend import ppb_backend
+from ..project_infos import project_infos
+from . import styles
 
 project_name = project_infos["project_name"]
 project_path = project_infos["project_path"]
@@ -142,10 +142,14 @@ class CustomTitleBar(QWidget):
             self.maximize_button.setText("❐")
 
     def close_window(self):
-        self.parent_obj.close()  # TODO: 在未儲存時詢問
+        self.parent_obj.close()  # 未儲存時的詢問在`closeEvent`
 
 
 class PasswordBookGui(QMainWindow):
+    backend_changed = Signal(object)
+    """後端的變更事件（可能由自動儲存等其他執行緒送出），
+    以QueuedConnection交給GUI執行緒處理"""
+
     def __new__(cls, app: QApplication, logger: logging.Logger) -> Self:
         return super().__new__(cls)
 
@@ -156,10 +160,15 @@ class PasswordBookGui(QMainWindow):
         self.config_path = os.path.join(
             project_infos["project_path"], "password_data.json"
         )
-        self.backend = ppb_backend.PasswordBookSystem(self.config_path)
+        self.backend = ppb_backend.PasswordBookSystem(
+            self.config_path, thread_safe=True
+        )
         self.backend.password_book_load(self.config_path)
         self.data: ppb_backend.data_type = {}
         self.data_widgets: list[QWidget] = []  # widgets清單
+        self.app_rows: dict[str, list[tuple[str, QWidget]]] = {}
+        """應用程式 -> [(帳號, 資料列), ...]，變更事件只更新受影響的資料列"""
+        self.no_data_label: QLabel | None = None
         self.showMaximized()
         # 設定無框視窗
         self.setWindowFlags(
@@ -178,6 +187,13 @@ class PasswordBookGui(QMainWindow):
         # 建立UI
         self._setup_ui()
         self._refresh_data()
+        self.backend_changed.connect(
+            self._on_backend_change, Qt.ConnectionType.QueuedConnection
+        )
+        self.backend.password_book_subscribe(self.backend_changed.emit)
+        self.autosaver = self.backend.password_book_autosave(
+            self.config_path
+        )
 
     def _setup_ui(self):
         """建立使用者介面"""
@@ -266,6 +282,8 @@ class PasswordBookGui(QMainWindow):
             widget.setParent(None)  # 移除父元件
             widget.deleteLater()  # 延遲刪除
         self.data_widgets.clear()
+        self.app_rows.clear()
+        self.no_data_label = None
 
     def _refresh_data(self):
         """重新整理資料"""
@@ -278,7 +296,7 @@ class PasswordBookGui(QMainWindow):
         try:
             self.data = self.backend.password_book_get_data()
             self.logger.info(f"從後端取得 {len(self.data)} 筆資料")
-        except Exception as e:
+        except Exception as e:  # noqa: BLE001
             self.logger.error(f"取得後端資料失敗: {e}")
             return
 
@@ -297,18 +315,96 @@ class PasswordBookGui(QMainWindow):
                 row_widget = self._create_app_row(app_name, acc, pwd)
                 self.content_layout.addWidget(row_widget)
                 self.data_widgets.append(row_widget)
+                self.app_rows.setdefault(app_name, []).append(
+                    (acc, row_widget)
+                )
 
         # 如果沒有資料，顯示提示
-        if len([k for k in self.data.keys() if k != "trash_can"]) == 0:
-            no_data_label = QLabel("目前沒有任何資料")
-            no_data_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            no_data_label.setStyleSheet(
-                "color: gray; font-size: 16px; font-style: italic;"
-            )
-            self.content_layout.addWidget(no_data_label)
+        self._update_no_data_label()
 
         self.logger.info("資料重新整理完成")
 
+    def _update_no_data_label(self):
+        if len(self.app_rows) == 0 and self.no_data_label is None:
+            self.no_data_label = QLabel("目前沒有任何資料")
+            self.no_data_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+            self.no_data_label.setStyleSheet(
+                "color: gray; font-size: 16px; font-style: italic;"
+            )
+            self.content_layout.addWidget(self.no_data_label)
+            self.data_widgets.append(self.no_data_label)
+        elif len(self.app_rows) > 0 and self.no_data_label is not None:
+            self.data_widgets.remove(self.no_data_label)
+            self.no_data_label.setParent(None)
+            self.no_data_label.deleteLater()
+            self.no_data_label = None
+
+    def _on_backend_change(self, event: ppb_backend.ChangeEvent):
+        """依變更事件只新增/移除/取代受影響的資料列（在GUI執行緒執行，
+        見`backend_changed`）"""
+        if event.kind == "reloaded":
+            self._refresh_data()
+            return
+        self.data = self.backend.password_book_snapshot()
+        if event.kind in ("deleted", "trashed"):
+            for app_name, app_data in event.items:
+                self._remove_app_row(app_name, app_data.get("acc", ""))
+        elif event.kind in ("inserted", "restored"):
+            for app_name, app_data in event.items:
+                self._add_app_row(app_name, app_data)
+        elif event.kind == "updated":
+            for (app_name, old_data), (_, app_data) in zip(
+                event.old_items, event.items
+            ):
+                self._replace_app_row(
+                    app_name, old_data.get("acc", ""), app_data
+                )
+        self._update_no_data_label()
+
+    def _add_app_row(self, app_name: str, app_data):
+        """加在同一個應用程式的最後一列之後（新的應用程式加在最後）"""
+        acc: str = app_data.get("acc", "")
+        pwd: str = app_data.get("pwd", "")
+        row_widget = self._create_app_row(app_name, acc, pwd)
+        rows = self.app_rows.setdefault(app_name, [])
+        if len(rows) > 0:
+            index = self.content_layout.indexOf(rows[-1][1]) + 1
+            self.content_layout.insertWidget(index, row_widget)
+        else:
+            self.content_layout.addWidget(row_widget)
+        rows.append((acc, row_widget))
+        self.data_widgets.append(row_widget)
+
+    def _replace_app_row(self, app_name: str, old_acc: str, app_data):
+        """在原本的位置換成修改後的資料列"""
+        rows = self.app_rows.get(app_name, [])
+        for i, (row_acc, old_widget) in enumerate(rows):
+            if row_acc == old_acc:
+                acc: str = app_data.get("acc", "")
+                pwd: str = app_data.get("pwd", "")
+                row_widget = self._create_app_row(app_name, acc, pwd)
+                self.content_layout.insertWidget(
+                    self.content_layout.indexOf(old_widget), row_widget
+                )
+                rows[i] = (acc, row_widget)
+                self.data_widgets.append(row_widget)
+                self.data_widgets.remove(old_widget)
+                old_widget.setParent(None)
+                old_widget.deleteLater()
+                return
+
+    def _remove_app_row(self, app_name: str, acc: str):
+        rows = self.app_rows.get(app_name, [])
+        for i, (row_acc, row_widget) in enumerate(rows):
+            if row_acc == acc:
+                del rows[i]
+                if len(rows) <= 0:
+                    del self.app_rows[app_name]
+                self.data_widgets.remove(row_widget)
+                row_widget.setParent(None)
+                row_widget.deleteLater()
+                return
+
     def _create_app_row(self, app_name: str, acc: str, pwd: str) -> QWidget:
         """建立單一應用程式資料列"""
         row_widget = QWidget()
@@ -351,6 +447,29 @@ class PasswordBookGui(QMainWindow):
 
         return group
 
+    def closeEvent(self, event: QCloseEvent):
+        """有尚未儲存的變更時詢問是否儲存"""
+        if self.autosaver.has_pending is True:
+            reply = QMessageBox.question(
+                self,
+                "尚未儲存",
+                "有尚未儲存的變更，是否儲存後關閉？",
+                QMessageBox.StandardButton.Save
+                | QMessageBox.StandardButton.Discard
+                | QMessageBox.StandardButton.Cancel,
+                QMessageBox.StandardButton.Save,
+            )
+            if reply == QMessageBox.StandardButton.Cancel:
+                event.ignore()
+                return
+            self.autosaver.close(
+                flush=reply == QMessageBox.StandardButton.Save
+            )
+        else:
+            self.autosaver.close()
+        self.backend.password_book_close()
+        super().closeEvent(event)
+
     def changeEvent(self, event: QEvent):
         if (
             event.type() == QEvent.Type.WindowStateChange
@@ -1,28 +1,28 @@
 import json
-import time
+import logging
 import os
+import queue
 import sys
-import logging
-
-from typing import Literal, Any
+import time
+from collections.abc import Iterator, Mapping
+from typing import Any, ClassVar, Literal
 
+from positive_tool import pt
+from positive_tool.arg import ArgType
 from rich.console import Console
+from rich.containers import Renderables
+from rich.layout import Layout
+from rich.markup import escape
 from rich.panel import Panel
-from rich.table import Table
+from rich.prompt import Confirm, Prompt, PromptBase
+from rich.rule import Rule
 from rich.style import Style
+from rich.table import Table
 from rich.text import Text
-from rich.prompt import Prompt, PromptBase, Confirm
-from rich.rule import Rule
-from rich.layout import Layout
 from rich.tree import Tree
-from rich.containers import Renderables
-
 
-from positive_tool import pt
-from positive_tool.arg import ArgType
-
-from ..ppb_backend import ppb_backend
 from ...ppb.project_infos import project_infos
+from ..ppb_backend import audit, ppb_backend
 
 project_name: str = project_infos["project_name"]
 license_file_path = project_infos["project_license_file_path"]
@@ -84,7 +84,7 @@ class PPBLogHandler(logging.Handler):
             # 限制日誌數量
             if len(self.logs) > self.max_logs:
                 self.logs.pop(0)
-        except Exception:
+        except Exception:  # noqa: BLE001
             self.handleError(record)
 
     def get_log_content(self):
@@ -117,7 +117,7 @@ class PPBLogHandler(logging.Handler):
 
 
 class PPBSetting:  # TODO: 待轉成GUI、TUI通用，移到ppb_backend
-    init_setting: dict = {"acc_tree__tree_type": "same_line"}
+    init_setting: ClassVar[dict] = {"acc_tree__tree_type": "same_line"}
 
     def __init__(
         self,
@@ -125,14 +125,11 @@ class PPBSetting:  # TODO: 待轉成GUI、TUI通用，移到ppb_backend
         logger: logging.Logger,
         mode: Literal["load", "new", "auto"] = "auto",
     ) -> None:
-        #
         ArgType("setting_file_path", setting_file_path, [str, os.PathLike])
         ArgType("mode", mode, ["load", "new", "auto"])
-        #
         self.setting_file_path: str = str(setting_file_path)
         self.logger: logging.Logger = logger
         self.data: dict[str, Any] = self.init_setting.copy()
-        #
         if mode == "auto":
             self.setting_auto()
 
@@ -153,7 +150,7 @@ class PPBSetting:  # TODO: 待轉成GUI、TUI通用，移到ppb_backend
                     self.data.update(
                         setting_file
                     )  # TODO: 待增加key、value判定（數據類型、合法key）
-            return None
+            return
 
     def setting_auto(self):
         if os.path.exists(self.setting_file_path) is True and os.path.isfile(
@@ -178,7 +175,6 @@ class PPBSetting:  # TODO: 待轉成GUI、TUI通用，移到ppb_backend
 
     def __getitem__(self, key: str):
         ArgType("key", key, [str])
-        #
         if key in list(self.data.keys()):
             return self.data[key]
         else:
@@ -186,6 +182,79 @@ class PPBSetting:  # TODO: 待轉成GUI、TUI通用，移到ppb_backend
             sys.exit(1)
 
 
+class PPBDataView(Mapping):
+    """後端快照，加上之後逐筆套用的變更（`ChangeEvent`）
+
+    只有受影響的應用程式會複製成清單，其他應用程式仍從快照讀取
+    （延遲載入時不必解析）；重新載入時才需要新的快照。"""
+
+    def __init__(self, snapshot: Mapping[str, Any]) -> None:
+        self._snapshot: Mapping[str, Any] = snapshot
+        self._keys: dict[str, None] = dict.fromkeys(snapshot.keys())
+        """應用程式的順序（同後端：新的應用程式加在最後）"""
+        self._apps: dict[str, list] = {}
+        """變更過的應用程式 -> 帳號清單"""
+
+    def __getitem__(self, app: str) -> Any:
+        if app not in self._keys:
+            raise KeyError(app)
+        if app in self._apps:
+            return self._apps[app]
+        return self._snapshot[app]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keys)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def app_len(self, app: str) -> int:
+        if app in self._apps:
+            return len(self._apps[app])
+        return self._snapshot.app_len(app)  # type: ignore[attr-defined]
+
+    def apply(self, event: ppb_backend.ChangeEvent) -> None:
+        """套用一次變更（不含垃圾桶，`reloaded`需要新的快照）"""
+        if event.kind in ("inserted", "restored"):
+            for app, app_data in event.items:
+                self._writable(app).append(app_data)
+        elif event.kind in ("deleted", "trashed"):
+            for app, app_data in event.items:
+                app_datas = self._writable(app)
+                del app_datas[self._find(app_datas, app_data)]
+                if len(app_datas) <= 0:
+                    del self._keys[app]
+                    del self._apps[app]
+        elif event.kind == "updated":
+            for (app, old_data), (_, new_data) in zip(
+                event.old_items, event.items
+            ):
+                app_datas = self._writable(app)
+                app_datas[self._find(app_datas, old_data)] = new_data
+
+    def _writable(self, app: str) -> list:
+        if app not in self._keys:
+            self._keys[app] = None
+            self._apps[app] = []
+        elif app not in self._apps:
+            self._apps[app] = list(self._snapshot[app])
+        return self._apps[app]
+
+    @staticmethod
+    def _find(app_datas: list, app_data: Mapping[str, str]) -> int:
+        """內容相同的第一筆，沒有時取帳號相同的第一筆（同後端）"""
+        for position, i in enumerate(app_datas):
+            if i == app_data:
+                return position
+        for position, i in enumerate(app_datas):
+            if i["acc"] == app_data["acc"]:
+                return position
+        raise KeyError(app_data["acc"])
+
+    def __repr__(self) -> str:
+        return f"PPBDataView(apps={list(self._keys)})"
+
+
 class PasswordBook:
     def __init__(self, logger: logging.Logger, version) -> None:
         self.console = Console()
@@ -193,9 +262,13 @@ class PasswordBook:
         self.ppb_tui_log_handler = PPBLogHandler(console=self.console)
         self.logger.addHandler(self.ppb_tui_log_handler)
         self.version = version
-        self.backend = ppb_backend.PasswordBookSystem()
-        self.data: ppb_backend.data_type = {}
+        self.backend = ppb_backend.PasswordBookSystem(
+            journal_mode=True, lazy_load=True, thread_safe=True
+        )
+        self.data: PPBDataView = PPBDataView({})
         self.pages: list = []
+        self.app_counts: list[tuple[str, int]] = []
+        self.content_per_page_num: int = 1
         self.data_file_path: str = os.path.abspath(
             os.path.join(project_path, "password_data.json")
         )
@@ -219,11 +292,18 @@ class PasswordBook:
         self.content_per_page: int = self.console.size.height - 13
         self.page_num = 0
         self.page_max_num = 0
-        #
         self.init_color()
         self.get_backend_data()
         self.refresh_page()
-        #
+        # 事件可能由其他執行緒（自動儲存）送出，先排隊，由主迴圈套用
+        self.backend_events: queue.SimpleQueue[ppb_backend.ChangeEvent] = (
+            queue.SimpleQueue()
+        )
+        self.backend.password_book_subscribe(self.backend_events.put)
+        # 變更後由背景自動儲存（合併一連串的變更），離開時寫入剩下的變更
+        self.autosaver = self.backend.password_book_autosave(
+            self.data_file_path
+        )
         self.main()
 
     def init_color(self):
@@ -238,11 +318,66 @@ class PasswordBook:
     def get_backend_data(self):
         # if self.data is None:
         # self.backend.password_book_new()
-        self.data = self.backend.password_book_get_data()
+        self.data = PPBDataView(self.backend.password_book_get_data())
         self.refresh_page()
 
+    def apply_backend_changes(self):
+        """在主執行緒套用排隊中的變更事件"""
+        while True:
+            try:
+                event = self.backend_events.get_nowait()
+            except queue.Empty:
+                break
+            self.on_backend_change(event)
+
+    def on_backend_change(self, event: ppb_backend.ChangeEvent):
+        """依`event`更新受影響的帳號（不重新取得快照），並清除從第一個
+        受影響分頁開始的快取；`reloaded`時才重新取得整個快照"""
+        if event.kind == "reloaded":
+            self.get_backend_data()
+            return
+        apps = event.apps - {"trash_can"}
+        if len(apps) <= 0:
+            return
+        self.data.apply(event)
+        old_counts = dict(self.app_counts)
+        app_counts: list[tuple[str, int]] = [
+            (
+                app,
+                (
+                    old_counts[app]
+                    if app in old_counts and app not in apps
+                    else self.data.app_len(app)
+                ),
+            )
+            for app in list(self.data.keys())
+            if app != "trash_can"
+        ]
+        # 未受影響的應用程式順序不變，第一個不同的位置之前的分頁仍然有效
+        first_offset = None
+        for counts in (self.app_counts, app_counts):
+            offset = 0
+            for app, app_count in counts:
+                if app in apps:
+                    break
+                offset += app_count
+            if first_offset is None or offset < first_offset:
+                first_offset = offset
+        self.app_counts = app_counts
+        total_num = sum(app_count for _, app_count in self.app_counts)
+        first_page = first_offset // self.content_per_page_num
+        self.page_max_num = -(-total_num // self.content_per_page_num)
+        self.pages = self.pages[:first_page] + [None] * (
+            self.page_max_num - first_page
+        )
+        self.page_num = min(self.page_num, max(self.page_max_num, 1))
+        self.logger.debug(
+            f"變更：{event!r}，從第{first_page + 1}頁開始重新建立"
+        )
+
     def backend_save_data(self):
-        self.backend.password_book_save(self.data_file_path)
+        """立即儲存（不等自動儲存）"""
+        self.autosaver.flush()
 
     def print_data_old(self):
         #
@@ -255,7 +390,6 @@ class PasswordBook:
         self.logger.debug(f"所有分頁： {self.pages}")
         self.logger.debug(f"資料： {self.data}")
         self.logger.debug(f"總頁數： {self.page_max_num}")
-        #
         table = Table()
         header_style = Style(color="blue")
         table.add_column("應用程式", min_width=10, header_style=header_style)
@@ -264,7 +398,7 @@ class PasswordBook:
         table.add_column("user_note", header_style=header_style, min_width=10)
         table.add_column("note", header_style=header_style, min_width=10)
         if len(self.pages) > 0 and self.page_max_num > 0:
-            for app, app_data in self.pages[self.page_num - 1]:
+            for app, app_data in self.get_page(self.page_num):
                 self.logger.debug(f"app:{app}, app_data:{app_data}")
                 if app == "trash_can":
                     continue
@@ -327,7 +461,6 @@ class PasswordBook:
         self.logger.debug(f"所有分頁： {self.pages}")
         self.logger.debug(f"資料： {self.data}")
         self.logger.debug(f"總頁數： {self.page_max_num}")
-        #
         if clear_scrren is True:
             self.console.clear()
         page_info = Text(
@@ -338,10 +471,9 @@ class PasswordBook:
         version_info = Text(version_text, justify="center")
         info_rule = Rule(style=Style(color="green", dim=True))
         infos = Renderables([page_info])
-        #
         if len(self.pages) > 0 and self.page_max_num > 0:
             tree = Tree("資料", style=Style(color="bright_blue", bold=True))
-            for app, app_data in self.pages[self.page_num - 1]:
+            for app, app_data in self.get_page(self.page_num):
                 self.logger.debug(f"app:{app}, app_data:{app_data}")
                 if app == "trash_can":
                     continue
@@ -393,42 +525,54 @@ class PasswordBook:
         )
 
     def refresh_page(self):
-        if (self.data is None) or (isinstance(self.data, dict) is False):
+        if (self.data is None) or (isinstance(self.data, Mapping) is False):
             self.get_backend_data()
-        #
         self.logger.debug(f"每頁內容數： {self.content_per_page}")
         self.logger.debug(f"資料： {self.data}")
         self.logger.debug(f"資料keys： {list(self.data.keys())}")
         #
+        # 分頁只記錄每個應用程式的帳號數，
+        # 分頁內容在顯示時才取得（延遲載入時不必解析整個密碼本）
         self.pages.clear()
+        self.app_counts: list[tuple[str, int]] = [
+            (app, self.data.app_len(app))
+            for app in list(self.data.keys())
+            if app != "trash_can"
+        ]
         count = pt.UInt(1)
-        page: list = []
-        for app in list(self.data.keys()):
-            if app == "trash_can":
-                continue
-            self.logger.debug(f"key -> app： {app}")
-            app_datas = self.data[app]
-            self.logger.debug(f"value -> app_datas： {app_datas}")
-            for app_data in app_datas:
-                page.append((app, app_data))
-                self.logger.debug(f"page： {page}")
-                if (count + 5 + 5) >= self.content_per_page:
-                    self.pages.append(page.copy())
-                    self.logger.debug(f"pages -> self.pages： {self.pages}")
-                    page.clear()
-                    count = pt.UInt(1)
-                else:
-                    count += 5  # 五個value
-        self.logger.debug(f"page： {page}")
-        if len(page) > 0:
-            self.pages.append(page.copy())
-            page.clear()
+        self.content_per_page_num = 1
+        while (count + 5 + 5) < self.content_per_page:
+            self.content_per_page_num += 1
+            count += 5  # 五個value
+        total_num = sum(app_count for _, app_count in self.app_counts)
+        self.page_max_num = -(-total_num // self.content_per_page_num)
+        self.pages = [None] * self.page_max_num
         self.page_num = 1
-        self.page_max_num = len(self.pages)
-        self.logger.debug(f"pages -> self.pages： {self.pages}")
+        self.logger.debug(f"總帳號數： {total_num}")
+
+    def get_page(self, page_num: int) -> list:
+        """取得分頁內容（第一次取得時才建立）"""
+        if self.pages[page_num - 1] is None:
+            skip = (page_num - 1) * self.content_per_page_num
+            page: list = []
+            for app, app_count in self.app_counts:
+                if skip >= app_count:
+                    skip -= app_count
+                    continue
+                app_datas = self.data[app]
+                for app_data in app_datas[skip:]:
+                    page.append((app, app_data))
+                    if len(page) >= self.content_per_page_num:
+                        break
+                skip = 0
+                if len(page) >= self.content_per_page_num:
+                    break
+            self.pages[page_num - 1] = page
+            self.logger.debug(f"page： {page}")
+        return self.pages[page_num - 1]
 
     def close(self):
-        self.backend_save_data()
+        self.autosaver.close()
         sys.exit(0)
 
     def insert_appdata(self):
@@ -446,9 +590,11 @@ class PasswordBook:
         )
         app_name = Prompt.ask("應用程式")
         acc = Prompt.ask("帳號")
-        pwd = Prompt.ask("密碼")
+        pwd = Prompt.ask("密碼（留空：自動產生）", default="", show_default=False)
+        if pwd == "":
+            pwd = self.backend.password_book_generate_passwords()[0]
+            self.console.print(f"已產生密碼：[yellow]{escape(pwd)}[/yellow]")
         usernote = Prompt.ask("筆記(usernote)：")
-        #
         key_style = Style(color="blue")
         value_style = Style(color="yellow")
         tree = Tree(app_name, style=key_style)
@@ -456,20 +602,41 @@ class PasswordBook:
         tree.add("密碼：", style=key_style).add(pwd, style=value_style)
         tree.add("筆記：", style=key_style).add(usernote, style=value_style)
         self.console.print(tree)
+        variants = [
+            i
+            for i in self.backend.password_book_app_variants(app_name)
+            if i != app_name
+        ]
+        if len(variants) > 0:
+            self.console.print(
+                f"[yellow]注意：已有名稱相近的應用程式「{'」、「'.join(variants)}」[/yellow]"
+            )
+        duplicates = self.backend.password_book_find_duplicates(app_name, acc)
+        if len(duplicates) > 0:
+            self.console.print(
+                "[bold red]警告：帳號已存在："
+                + "、".join(f"「{app}」的「{i}」" for app, i in duplicates)
+                + "[/bold red]"
+            )
+            if (
+                Confirm.ask(
+                    "仍要新增重複的帳號？ ", console=self.console, default=False
+                )
+                is False
+            ):
+                self.logger.info("重複的帳號，已取消新增")
+                return
         if Confirm.ask("是否正確： ", console=self.console) is True:
             self.backend.password_book_insert(app_name, acc, pwd, user_note=usernote)
             self.logger.info(
                 f"新增：應用程式「{app_name}」、帳號「{acc}」、密碼「{pwd}」、筆記「{usernote}」。"
             )
-            self.backend_save_data()
-            self.get_backend_data()
-            self.backend_save_data()
         else:
             self.logger.info("已取消新增")
             # self.console.print("已取消新增！")
             # time.sleep(1.5)
 
-    def delete_appdata(self):  # TODO 新增`trash_can`垃圾桶功能
+    def delete_appdata(self):
         self.console.clear()
         self.console.print(
             Rule(
@@ -503,7 +670,6 @@ class PasswordBook:
                 )
             else:
                 break
-        #
         accs = [i["acc"] for i in self.data[app]]
         self.logger.debug(f"找到的帳號： {apps}")
         accs_choices = Text(
@@ -525,11 +691,12 @@ class PasswordBook:
             else:
                 break
         self.console.print(self.acc_tree(app, acc))
-        if Confirm.ask("是否要刪除？") is True:
-            self.backend.password_book_delete(app, acc)
-            self.get_backend_data()
-            self.logger.info(f"已刪除應用程式「{app}」的帳號「{acc}」。")
-            self.console.print("已完成刪除。")
+        if Confirm.ask("是否要刪除（移到垃圾桶）？") is True:
+            trash_id = self.backend.password_book_move_to_trash_can(app, acc)
+            self.logger.info(
+                f"已把應用程式「{app}」的帳號「{acc}」移到垃圾桶（{trash_id}）。"
+            )
+            self.console.print("已移到垃圾桶。")
             time.sleep(1)
         else:
             self.console.print("已取消刪除！")
@@ -540,12 +707,11 @@ class PasswordBook:
     ) -> Tree:  # TODO: 支援顯示`trash_can`內的內容
         ArgType("app", app, [str])
         ArgType("acc", acc, [str, None])
-        #
         var_app_data: list[tuple[str, str, str, str]] = []
         if acc is None:
             if app != "trash_can" and app in list(self.data.keys()):
                 for i in self.data[app]:
-                    var_app_data.append((i["acc"], i["pwd"], i["note"], i["usernote"]))
+                    var_app_data.append((i["acc"], i["pwd"], i["note"], i["user_note"]))
                     break
             else:
                 msg = "找不到應用程式/帳號"
@@ -554,32 +720,19 @@ class PasswordBook:
         else:
             for i in self.data[app]:
                 if i["acc"] == acc:
-                    var_acc = i["acc"]
-                    if "pwd" in i:
-                        pwd = i["pwd"]
-                    else:
-                        pwd = ""
-                        i["pwd"] = ""
-                    if hasattr(i, "note") is True:
-                        note = i["note"]
-                    else:
-                        note = ""
-                    if hasattr(i, "usernote") is True:
-                        usernote = i["usernote"]
-                    else:
-                        usernote = ""
-                    var_app_data.append((var_acc, pwd, note, usernote))
+                    # 載入時已正規化（`schema`），欄位都存在
+                    var_app_data.append((i["acc"], i["pwd"], i["note"], i["user_note"]))
                     break
             else:
                 raise KeyError("找不到應用程式/帳號")
-        #
         key_style = Style(color="blue")
         value_style = Style(color="yellow")
         tree = Tree(Text("應用程式：", style=key_style) + Text(app, style=value_style))
-        for acc, pwd, note, usernote in var_app_data:
+        for acc_name, pwd, note, usernote in var_app_data:
             if self.setting["acc_tree__tree_type"] == "same_line":
                 tree_acc = tree.add(
-                    Text("帳號：", style=key_style) + Text(acc, style=value_style)
+                    Text("帳號：", style=key_style)
+                    + Text(acc_name, style=value_style)
                 )
                 tree_acc.add(
                     Text("密碼：", style=key_style) + Text(pwd, style=value_style)
@@ -595,7 +748,7 @@ class PasswordBook:
                 or self.setting["acc_tree__tree_type"] == "old_style"
             ):
                 tree_acc_key = tree.add("帳號", style=key_style)
-                tree_acc_value = tree_acc_key.add(acc, style=value_style)
+                tree_acc_value = tree_acc_key.add(acc_name, style=value_style)
                 tree_acc_value.add("密碼", style=key_style).add(pwd, style=value_style)
         return tree
 
@@ -638,6 +791,50 @@ class PasswordBook:
         # Prompt.ask("按enter返回...", console=self.console)
         self.console.input("按enter返回...")
 
+    def audit_page(self) -> None:
+        self.console.clear()
+        report = self.backend.password_book_audit()
+        summary = Table(title="密碼強度", show_header=True)
+        summary.add_column("強度")
+        summary.add_column("帳號數", justify="right")
+        for label, count in zip(audit.SCORE_LABELS, report.score_counts):
+            summary.add_row(label, str(count))
+        reused = Table(title="重複使用的密碼", show_header=True)
+        reused.add_column("帳號數", justify="right")
+        reused.add_column("帳號")
+        for group in report.reused:
+            reused.add_row(
+                str(len(group)),
+                "、".join(f"{app}：{acc}" for app, acc in group),
+            )
+        weak = Table(title="弱密碼", show_header=True)
+        weak.add_column("應用程式")
+        weak.add_column("帳號")
+        weak.add_column("強度")
+        weak.add_column("熵（位元）", justify="right")
+        weak.add_column("模式")
+        for app, acc, (entropy, score, patterns) in report.weak:
+            weak.add_row(
+                app, acc, audit.SCORE_LABELS[score], str(entropy), ", ".join(patterns)
+            )
+        panel = Panel(
+            Renderables(
+                [
+                    Text(f"共{report.total}個帳號"),
+                    summary,
+                    reused,
+                    weak,
+                ]
+            ),
+            title=Text(
+                project_name,
+                style=Style(color="rgb(175, 0, 255)", bold=True),
+            ),
+            subtitle=Text("檢查", style=Style(color="green")),
+        )
+        self.console.print(panel)
+        self.console.input("按enter返回...")
+
     def next_page(self):
         if (self.page_num + 1) <= self.page_max_num:
             self.page_num += 1
@@ -676,10 +873,13 @@ class PasswordBook:
             "l",
             "儲存",
             "save",
+            "檢查",
+            "audit",
         ]
         self.console.clear()
         while True:
             while True:
+                self.apply_backend_changes()
                 self.console.clear()
                 self.print_data()
                 if is_user_input_error is True:
@@ -689,7 +889,7 @@ class PasswordBook:
                     )
                     is_user_input_error = False
                 prompt = Text("輸入動作") + Text(
-                    "〔新增, 刪除, 離開, 重新整理, 關於, 下一頁, 上一頁, 儲存〕",
+                    "〔新增, 刪除, 離開, 重新整理, 關於, 下一頁, 上一頁, 儲存, 檢查〕",
                     style=Style(color="bright_magenta"),
                 )
                 try:
@@ -725,6 +925,8 @@ class PasswordBook:
                 elif user_action in ["儲存", "save"]:
                     self.backend_save_data()
                     self.logger.info(f"已儲存到檔案：「{self.data_file_path}」")
+                elif user_action in ["檢查", "audit"]:
+                    self.audit_page()
                 else:
                     is_user_input_error = True
                     self.logger.warning("輸入錯誤：請選擇一個有效的動作！")
@@ -759,8 +961,8 @@ def main(logger, version):
 
 def launcher():
     # TODO:待改成ppb_launcher或launch_tui統一啟動
-    import os
     import datetime
+    import os
 
     log_dir = os.path.join(project_path, ".logs")
     if os.path.exists(log_dir) is False or os.path.isdir(log_dir) is False:
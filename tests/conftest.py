@@ -0,0 +1,13 @@
+import pytest
+
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def backend(request):
+    """兩種引擎各執行一次（垃圾桶永久保留，測試不受時間影響）"""
+    backend = PasswordBookSystem(
+        storage=request.param, trash_retention=None
+    )
+    yield backend
+    backend.password_book_close()
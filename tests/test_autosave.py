@@ -0,0 +1,30 @@
+import time
+
+from ppb.ppb_backend.autosave import AutoSaver
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+
+def test_failed_save_backs_off(tmp_path, monkeypatch):
+    backend = PasswordBookSystem(thread_safe=True)
+    calls = []
+
+    def failing_save(*args, **kwargs):
+        calls.append(time.monotonic())
+        raise OSError("disk full")
+
+    monkeypatch.setattr(backend, "password_book_save", failing_save)
+    saver = AutoSaver(
+        backend,
+        str(tmp_path / "password_data.json"),
+        idle_delay=0.01,
+        max_pending=1,
+    )
+    for acc in "abcde":
+        backend.password_book_insert("site", acc, "pwd")
+    time.sleep(0.5)
+    # 第一次失敗後至少等待1秒才重試，不會立刻重試
+    assert len(calls) == 1
+    assert isinstance(saver.last_error, OSError)
+    assert saver.has_pending is True
+    saver.close(flush=False)
+    backend.password_book_close()
@@ -0,0 +1,52 @@
+import hashlib
+
+import pytest
+
+from ppb.ppb_backend.breach import BreachIndex, build_breach_index
+
+
+def sha1_hex(pwd):
+    return hashlib.sha1(pwd.encode("utf-8")).hexdigest().upper()
+
+
+def test_build_and_query(tmp_path):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_bytes(
+        f"{sha1_hex('123456')}:100\r\n{sha1_hex('password')}\n\n".encode()
+    )
+    index_path = str(tmp_path / "breach.idx")
+    assert build_breach_index(str(corpus), index_path) == 2
+    with BreachIndex(index_path) as index:
+        assert index.is_breached("123456") is True
+        assert index.is_breached("password") is True
+        assert index.is_breached("correct horse") is False
+
+
+@pytest.mark.parametrize(
+    "bad_line",
+    [
+        "A" + sha1_hex("123456"),
+        sha1_hex("123456")[:39],
+        sha1_hex("123456") + sha1_hex("password"),
+        sha1_hex("123456") + " 12",
+    ],
+)
+def test_rejects_malformed_lines(tmp_path, bad_line):
+    corpus = tmp_path / "corpus.txt"
+    corpus.write_bytes(f"{sha1_hex('password')}\n{bad_line}\n".encode())
+    with pytest.raises(ValueError, match="第2列"):
+        build_breach_index(str(corpus), str(tmp_path / "breach.idx"))
+
+
+def test_range_files_reject_long_suffix(tmp_path):
+    digest = sha1_hex("123456")
+    corpus = tmp_path / "range"
+    corpus.mkdir()
+    (corpus / f"{digest[:5]}.txt").write_text(f"{digest[5:]}:3\n")
+    index_path = str(tmp_path / "breach.idx")
+    assert build_breach_index(str(corpus), index_path) == 1
+    with BreachIndex(index_path) as index:
+        assert index.is_breached("123456") is True
+    (corpus / f"{digest[:5]}.txt").write_text(f"0{digest[5:]}:3\n")
+    with pytest.raises(ValueError, match="第1列"):
+        build_breach_index(str(corpus), index_path)
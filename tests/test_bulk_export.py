@@ -0,0 +1,33 @@
+import io
+
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+
+def test_json_export_with_some_fields_reloads(tmp_path):
+    backend = PasswordBookSystem()
+    backend.password_book_insert("site", "alice", "pwd", note="note")
+    file_path = tmp_path / "export.json"
+    assert (
+        backend.password_book_export(
+            str(file_path), file_format="json", fields=("app", "acc")
+        )
+        == 1
+    )
+    backend.password_book_close()
+    loaded = PasswordBookSystem(str(file_path))
+    expected = {"acc": "alice", "pwd": "", "note": "", "user_note": ""}
+    assert loaded.password_book_search("site") == [expected]
+    assert [
+        (app, dict(app_data))
+        for app, app_data in loaded.password_book_find("alice")
+    ] == [("site", expected)]
+    loaded.password_book_close()
+
+
+def test_jsonl_export_keeps_only_selected_fields():
+    backend = PasswordBookSystem()
+    backend.password_book_insert("site", "alice", "pwd", note="note")
+    dest = io.StringIO()
+    backend.password_book_export(dest, fields=("app", "acc"))
+    assert dest.getvalue() == '{"app": "site", "acc": "alice"}\n'
+    backend.password_book_close()
@@ -0,0 +1,74 @@
+import io
+import json
+
+import pytest
+
+from ppb.ppb_backend.bulk_import import (
+    BulkImportError,
+    read_import_file,
+    validate_records,
+)
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+
+def test_accepts_records_without_username():
+    items = validate_records(
+        [
+            {"app": "GitHub", "acc": "alice", "pwd": "1"},
+            {"app": "Wi-Fi", "acc": "", "pwd": "2"},
+            {"app": "筆記", "acc": None, "user_note": "保險箱密碼"},
+        ]
+    )
+    assert [(app, i["acc"], i["pwd"]) for app, i in items] == [
+        ("GitHub", "alice", "1"),
+        ("Wi-Fi", "", "2"),
+        ("筆記", "", ""),
+    ]
+
+
+def test_still_rejects_invalid_records():
+    with pytest.raises(BulkImportError) as error:
+        validate_records([{"app": "", "acc": "a"}, {"app": "x", "acc": 1}])
+    assert [row for row, _ in error.value.errors] == [1, 2]
+
+
+def test_import_bitwarden_export_with_secure_notes():
+    export = {
+        "items": [
+            {
+                "name": "GitHub",
+                "login": {"username": "alice", "password": "1"},
+            },
+            {"name": "Router", "login": {"password": "2"}},
+            {"name": "恢復碼", "type": 2, "notes": "1234-5678"},
+        ]
+    }
+    backend = PasswordBookSystem()
+    count = backend.password_book_import(
+        io.StringIO(json.dumps(export)), file_format="json"
+    )
+    assert count == 3
+    assert backend.password_book_search("Router")[0]["acc"] == ""
+    assert backend.password_book_search("恢復碼")[0]["user_note"] == (
+        "1234-5678"
+    )
+    backend.password_book_close()
+
+
+def test_chrome_csv_without_username():
+    text = "name,url,username,password\nRouter,http://192.168.0.1,,pw\n"
+    records = list(read_import_file(io.StringIO(text), "csv"))
+    items = validate_records(records)
+    assert [(app, i["acc"], i["pwd"]) for app, i in items] == [
+        ("Router", "", "pw")
+    ]
+
+
+def test_records_without_username_are_not_duplicates():
+    backend = PasswordBookSystem()
+    backend.password_book_insert("筆記", "", "", user_note="一")
+    backend.password_book_insert("筆記", "", "", user_note="二")
+    assert backend.password_book_find_duplicates("筆記", "") == []
+    plan = backend.password_book_dedupe(dry_run=True)
+    assert not plan
+    backend.password_book_close()
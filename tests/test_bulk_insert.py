@@ -0,0 +1,23 @@
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+
+def test_bulk_insert_save_purges_expired_trash(tmp_path):
+    file_path = str(tmp_path / "password_data.json")
+    backend = PasswordBookSystem(trash_retention=0)
+    backend.password_book_insert("app", "old", "pwd")
+    backend.password_book_move_to_trash_can("app", "old")
+    kinds = []
+    backend.password_book_subscribe(lambda event: kinds.append(event.kind))
+    count = backend.password_book_bulk_insert(
+        [{"app": "app", "acc": "new", "pwd": "pwd"}], file_path=file_path
+    )
+    assert count == 1
+    assert kinds == ["inserted", "purged"]
+    assert backend.password_book_trash_can_items() == []
+    assert backend.password_book_is_dirty(file_path) is False
+    backend.password_book_close()
+
+    loaded = PasswordBookSystem(file_path)
+    assert [i["acc"] for i in loaded.password_book_search("app")] == ["new"]
+    assert loaded.password_book_trash_can_items() == []
+    loaded.password_book_close()
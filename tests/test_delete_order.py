@@ -0,0 +1,69 @@
+import random
+
+
+def accounts(backend, app):
+    return [i["acc"] for i in backend.password_book_search(app) or []]
+
+
+def test_delete_keeps_order(backend):
+    for acc in "abcd":
+        backend.password_book_insert("app", acc, "pwd")
+    backend.password_book_delete("app", "a")
+    assert accounts(backend, "app") == ["b", "c", "d"]
+    backend.password_book_delete("app", "b")
+    assert accounts(backend, "app") == ["c", "d"]
+
+
+def test_delete_removes_first_duplicate(backend):
+    for acc, pwd in (("a", "1"), ("b", "2"), ("a", "3"), ("c", "4")):
+        backend.password_book_insert("app", acc, pwd)
+    backend.password_book_delete("app", "a")
+    assert [
+        (i["acc"], i["pwd"]) for i in backend.password_book_search("app")
+    ] == [("b", "2"), ("a", "3"), ("c", "4")]
+    backend.password_book_delete("app", "a")
+    backend.password_book_delete("app", "b")
+    assert accounts(backend, "app") == ["c"]
+    backend.password_book_delete("app", "c")
+    assert backend.password_book_search("app") is None
+
+
+def test_update_then_delete_keeps_order(backend):
+    for acc in "abcd":
+        backend.password_book_insert("app", acc, "pwd")
+    backend.password_book_update("app", "d", new_acc="a")
+    backend.password_book_delete("app", "a")
+    assert accounts(backend, "app") == ["b", "c", "a"]
+    backend.password_book_delete("app", "a")
+    assert accounts(backend, "app") == ["b", "c"]
+
+
+def test_random_changes_match_list_model(backend):
+    rng = random.Random(0)
+    model: dict[str, list[tuple[str, str]]] = {}
+    for step in range(3000):
+        app = f"app{rng.randrange(5)}"
+        accs = [acc for acc, _ in model.get(app, [])]
+        action = rng.random()
+        if action < 0.5 or len(accs) <= 0:
+            acc = f"acc{rng.randrange(40)}"
+            backend.password_book_insert(app, acc, str(step))
+            model.setdefault(app, []).append((acc, str(step)))
+        elif action < 0.8:
+            acc = rng.choice(accs)
+            backend.password_book_delete(app, acc)
+            del model[app][accs.index(acc)]
+            if len(model[app]) <= 0:
+                del model[app]
+        else:
+            acc = rng.choice(accs)
+            new_acc = f"acc{rng.randrange(40)}"
+            backend.password_book_update(app, acc, new_acc=new_acc)
+            position = accs.index(acc)
+            model[app][position] = (new_acc, model[app][position][1])
+    for app in [f"app{i}" for i in range(5)]:
+        app_datas = backend.password_book_search(app)
+        if app not in model:
+            assert app_datas is None
+        else:
+            assert [(i["acc"], i["pwd"]) for i in app_datas] == model[app]
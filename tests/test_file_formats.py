@@ -0,0 +1,131 @@
+import os
+
+import pytest
+
+from ppb.ppb_backend.binary_format import MAGIC, is_binary_file
+from ppb.ppb_backend.compression import file_compression
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+from ppb.ppb_backend.sharded_format import (
+    is_sharded_file,
+    shard_dir_path,
+    shard_of,
+)
+
+APPS = [f"app{i}" for i in range(12)]
+
+
+def new_book(**kwargs):
+    backend = PasswordBookSystem(trash_retention=None, **kwargs)
+    for app in APPS:
+        for acc in "ab":
+            backend.password_book_insert(
+                app, acc, f"{app}-{acc}", note="筆記", user_note="備註"
+            )
+    backend.password_book_move_to_trash_can("app0", "b")
+    return backend
+
+
+def book_data(backend):
+    data = backend.password_book_snapshot().to_dict()
+    for entry in data["trash_can"]:
+        entry.pop("deleted_at", None)
+    return data
+
+
+def shard_files(file_path):
+    return sorted(os.listdir(shard_dir_path(file_path)))
+
+
+@pytest.mark.parametrize("lazy_load", [False, True])
+def test_binary_round_trip(tmp_path, lazy_load):
+    file_path = str(tmp_path / "password_data.ppb")
+    backend = new_book(file_format="binary")
+    backend.password_book_save(file_path, force=True)
+    with open(file_path, "rb") as f:
+        assert f.read(len(MAGIC)) == MAGIC
+    assert is_binary_file(file_path) is True
+    loaded = PasswordBookSystem(
+        file_path, trash_retention=None, lazy_load=lazy_load
+    )
+    assert book_data(loaded) == book_data(backend)
+    # 沿用載入的格式
+    loaded.password_book_insert("app1", "c", "pwd")
+    loaded.password_book_save(file_path, force=True)
+    loaded.password_book_close()
+    assert is_binary_file(file_path) is True
+    reloaded = PasswordBookSystem(file_path, trash_retention=None)
+    assert reloaded.password_book_exists("app1", "c") is True
+    reloaded.password_book_close()
+    backend.password_book_close()
+
+
+@pytest.mark.parametrize("lazy_load", [False, True])
+def test_sharded_round_trip(tmp_path, lazy_load):
+    file_path = str(tmp_path / "password_data.json")
+    backend = new_book(file_format="sharded", shard_count=4)
+    backend.password_book_save(file_path, force=True)
+    assert is_sharded_file(file_path) is True
+    assert len(shard_files(file_path)) == len(
+        {shard_of(app, 4) for app in APPS}
+    )
+    loaded = PasswordBookSystem(
+        file_path, trash_retention=None, lazy_load=lazy_load
+    )
+    assert book_data(loaded) == book_data(backend)
+    loaded.password_book_close()
+    backend.password_book_close()
+
+
+def test_sharded_save_rewrites_only_dirty_shards(tmp_path):
+    file_path = str(tmp_path / "password_data.json")
+    backend = new_book(file_format="sharded", shard_count=4)
+    backend.password_book_save(file_path, force=True)
+    backend.password_book_close()
+    before = shard_files(file_path)
+    loaded = PasswordBookSystem(
+        file_path, trash_retention=None, lazy_load=True
+    )
+    loaded.password_book_update("app3", "a", pwd="new")
+    loaded.password_book_save(file_path, force=True)
+    after = shard_files(file_path)
+    dirty = f"{shard_of('app3', 4):03x}-"
+    assert [i for i in after if not i.startswith(dirty)] == [
+        i for i in before if not i.startswith(dirty)
+    ]
+    [old_file] = [i for i in before if i.startswith(dirty)]
+    [new_file] = [i for i in after if i.startswith(dirty)]
+    assert new_file != old_file
+    loaded.password_book_close()
+    reloaded = PasswordBookSystem(file_path, trash_retention=None)
+    assert reloaded.password_book_search("app3")[0]["pwd"] == "new"
+    assert reloaded.password_book_count("app7") == 2
+    reloaded.password_book_close()
+
+
+@pytest.mark.parametrize(
+    "compression, json_indent, head",
+    [
+        ("gzip", 4, b"\x1f\x8b"),
+        ("lzma", 4, b"\xfd7zXZ\x00"),
+        ("zlib", 4, b"\x78\x9c"),
+        ("none", None, b'{"schema_version":'),
+    ],
+)
+def test_compressed_round_trip(tmp_path, compression, json_indent, head):
+    file_path = str(tmp_path / "password_data.json")
+    backend = new_book(compression=compression, json_indent=json_indent)
+    backend.password_book_save(file_path, force=True)
+    with open(file_path, "rb") as f:
+        assert f.read(len(head)) == head
+    assert file_compression(file_path) == compression
+    # 載入時以magic bytes判斷格式，儲存時沿用
+    loaded = PasswordBookSystem(file_path, trash_retention=None)
+    assert book_data(loaded) == book_data(backend)
+    loaded.password_book_insert("app1", "c", "pwd")
+    loaded.password_book_save(file_path, force=True)
+    loaded.password_book_close()
+    assert file_compression(file_path) == compression
+    reloaded = PasswordBookSystem(file_path, trash_retention=None)
+    assert reloaded.password_book_exists("app1", "c") is True
+    reloaded.password_book_close()
+    backend.password_book_close()
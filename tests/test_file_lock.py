@@ -0,0 +1,67 @@
+import os
+
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+
+def make_book(file_path):
+    backend = PasswordBookSystem()
+    backend.password_book_insert("app", "a", "pwd")
+    backend.password_book_save(file_path)
+    backend.password_book_close()
+    os.remove(file_path + ".lock")
+
+
+def test_read_only_load_leaves_no_lock_file(tmp_path):
+    file_path = str(tmp_path / "password_data.json")
+    make_book(file_path)
+    backend = PasswordBookSystem(file_path)
+    assert backend.password_book_exists("app", "a") is True
+    backend.password_book_close()
+    assert os.path.exists(file_path + ".lock") is False
+
+
+def test_write_creates_lock_file(tmp_path):
+    file_path = str(tmp_path / "password_data.json")
+    make_book(file_path)
+    backend = PasswordBookSystem(file_path)
+    backend.password_book_insert("app", "b", "pwd")
+    backend.password_book_save(file_path)
+    backend.password_book_close()
+    assert os.path.exists(file_path + ".lock") is True
+    # 其他程序寫入過：版本號不同，載入的程序儲存時要合併
+    first = PasswordBookSystem(file_path)
+    second = PasswordBookSystem(file_path)
+    first.password_book_insert("app", "c", "pwd")
+    first.password_book_save(file_path)
+    second.password_book_insert("app", "d", "pwd")
+    second.password_book_save(file_path)
+    first.password_book_close()
+    second.password_book_close()
+    loaded = PasswordBookSystem(file_path)
+    assert [i["acc"] for i in loaded.password_book_search("app")] == [
+        "a",
+        "b",
+        "c",
+        "d",
+    ]
+    loaded.password_book_close()
+
+
+def test_first_writer_after_read_only_load_is_detected(tmp_path):
+    file_path = str(tmp_path / "password_data.json")
+    make_book(file_path)
+    reader = PasswordBookSystem(file_path)
+    writer = PasswordBookSystem(file_path)
+    writer.password_book_insert("app", "b", "pwd")
+    writer.password_book_save(file_path)
+    writer.password_book_close()
+    reader.password_book_insert("app", "c", "pwd")
+    reader.password_book_save(file_path)
+    reader.password_book_close()
+    loaded = PasswordBookSystem(file_path)
+    assert [i["acc"] for i in loaded.password_book_search("app")] == [
+        "a",
+        "b",
+        "c",
+    ]
+    loaded.password_book_close()
@@ -0,0 +1,103 @@
+import os
+
+from ppb.ppb_backend.journal import PasswordBookJournal
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+
+def open_book(file_path=None, **kwargs):
+    return PasswordBookSystem(
+        file_path, trash_retention=None, journal_mode=True, **kwargs
+    )
+
+
+def accounts(backend, app="site"):
+    return [
+        (i["acc"], i["pwd"])
+        for i in backend.password_book_search(app) or []
+    ]
+
+
+def journal_lines(file_path):
+    with open(file_path + PasswordBookJournal.suffix, "rb") as f:
+        return f.readlines()
+
+
+def new_book(tmp_path):
+    file_path = str(tmp_path / "password_data.json")
+    backend = open_book()
+    backend.password_book_insert("site", "base", "pwd")
+    backend.password_book_save(file_path, force=True)
+    return file_path, backend
+
+
+def test_replay_after_crash(tmp_path):
+    file_path, backend = new_book(tmp_path)
+    for acc in "abc":
+        backend.password_book_insert("site", acc, "pwd")
+    backend.password_book_update("site", "a", pwd="new")
+    backend.password_book_delete("site", "b")
+    # 沒有儲存就結束：變更只在日誌裡
+    backend.password_book_close()
+    assert len(journal_lines(file_path)) == 1 + 5
+    loaded = open_book(file_path)
+    assert accounts(loaded) == [
+        ("base", "pwd"),
+        ("a", "new"),
+        ("c", "pwd"),
+    ]
+    loaded.password_book_close()
+
+
+def test_torn_tail_record_is_dropped(tmp_path):
+    file_path, backend = new_book(tmp_path)
+    for acc in "abc":
+        backend.password_book_insert("site", acc, "pwd")
+    backend.password_book_close()
+    journal_path = file_path + PasswordBookJournal.suffix
+    lines = journal_lines(file_path)
+    # 最後一筆只寫了一半
+    torn_size = sum(map(len, lines)) - len(lines[-1]) // 2
+    with open(journal_path, "r+b") as f:
+        f.truncate(torn_size)
+    loaded = open_book(file_path)
+    assert accounts(loaded) == [
+        ("base", "pwd"),
+        ("a", "pwd"),
+        ("b", "pwd"),
+    ]
+    assert journal_lines(file_path) == lines[:-1]
+    # 截掉後可以繼續追加
+    loaded.password_book_insert("site", "d", "pwd")
+    loaded.password_book_close()
+    loaded = open_book(file_path)
+    assert accounts(loaded) == [
+        ("base", "pwd"),
+        ("a", "pwd"),
+        ("b", "pwd"),
+        ("d", "pwd"),
+    ]
+    loaded.password_book_close()
+
+
+def test_checkpoint_truncates_journal(tmp_path):
+    file_path, backend = new_book(tmp_path)
+    backend.password_book_close()
+    backend = open_book(file_path, journal_compact_threshold=3)
+    backend.password_book_insert("site", "a", "pwd")
+    backend.password_book_save(file_path)
+    # 未達門檻：只寫日誌
+    assert len(journal_lines(file_path)) == 1 + 1
+    for acc in "bc":
+        backend.password_book_insert("site", acc, "pwd")
+    backend.password_book_save(file_path)
+    assert len(journal_lines(file_path)) == 1
+    backend.password_book_close()
+    os.remove(file_path + PasswordBookJournal.suffix)
+    loaded = open_book(file_path)
+    assert accounts(loaded) == [
+        ("base", "pwd"),
+        ("a", "pwd"),
+        ("b", "pwd"),
+        ("c", "pwd"),
+    ]
+    loaded.password_book_close()
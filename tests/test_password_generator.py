@@ -0,0 +1,37 @@
+import math
+
+import pytest
+
+from ppb.ppb_backend.password_generator import AMBIGUOUS, PasswordPolicy
+
+
+def test_pronounceable_excludes_ambiguous_characters():
+    policy = PasswordPolicy(
+        "pronounceable", length=12, exclude_ambiguous=True
+    )
+    for pwd in policy.generate(2000):
+        assert len(pwd) == 12
+        assert set(pwd).isdisjoint(AMBIGUOUS), pwd
+    default = PasswordPolicy("pronounceable", length=12)
+    assert policy.entropy < default.entropy
+
+
+def test_pronounceable_without_lowercase_is_upper_case():
+    policy = PasswordPolicy(
+        "pronounceable", length=10, lowercase=False, exclude_ambiguous=True
+    )
+    for pwd in policy.generate(2000):
+        letters = pwd[:-3]
+        assert letters.isupper() is True, pwd
+        assert set(pwd).isdisjoint(AMBIGUOUS), pwd
+    # 子音16個、母音5個去掉O、I：16*3個音節
+    assert policy.entropy == pytest.approx(
+        7 / 2 * math.log2(16 * 3)
+        + 2 * math.log2(8)
+        + math.log2(len(policy.symbol_chars))
+    )
+
+
+def test_pronounceable_needs_letters():
+    with pytest.raises(ValueError):
+        PasswordPolicy("pronounceable", lowercase=False, uppercase=False)
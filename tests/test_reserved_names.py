@@ -0,0 +1,38 @@
+import pytest
+
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+from ppb.ppb_backend.schema import RESERVED_APP_NAMES
+
+
+@pytest.mark.parametrize("app", RESERVED_APP_NAMES)
+def test_insert_rejects_reserved_name(backend, app):
+    with pytest.raises(ValueError):
+        backend.password_book_insert(app, "a", "pwd")
+    with pytest.raises(ValueError):
+        backend.password_book_update(app, "a", pwd="new")
+    assert backend.password_book_trash_can_items() == []
+    assert backend.password_book_exists(app, "a") is False
+
+
+@pytest.mark.parametrize("app", RESERVED_APP_NAMES)
+def test_engine_rejects_reserved_name(backend, app):
+    with pytest.raises(ValueError):
+        backend._engine.insert(app, {"acc": "a", "pwd": "pwd"})
+
+
+@pytest.mark.parametrize("app", RESERVED_APP_NAMES)
+def test_reserved_name_never_reaches_the_file(tmp_path, app):
+    file_path = str(tmp_path / "password_data.json")
+    backend = PasswordBookSystem(trash_retention=None)
+    backend.password_book_insert("site", "a", "pwd")
+    with pytest.raises(ValueError):
+        backend.password_book_insert(app, "a", "pwd")
+    backend.password_book_save(file_path)
+    backend.password_book_close()
+    loaded = PasswordBookSystem(file_path, trash_retention=None)
+    assert list(loaded.password_book_snapshot().keys()) == [
+        "trash_can",
+        "site",
+    ]
+    assert loaded.password_book_trash_can_items() == []
+    loaded.password_book_close()
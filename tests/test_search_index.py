@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+from ppb.ppb_backend.account_record import AccountRecord
+from ppb.ppb_backend.search_index import SearchIndex, normalize
+
+
+def record(acc, note="", user_note=""):
+    return AccountRecord.from_dict(
+        {"acc": acc, "pwd": "pwd", "note": note, "user_note": user_note}
+    )
+
+
+def accounts(results):
+    return [(app, i["acc"]) for app, i in results]
+
+
+def test_prefix_and_substring():
+    index = SearchIndex.build(
+        [
+            ("GitHub", [record("alice"), record("bob", note="工作用")]),
+            ("國泰銀行", [record("王小明", user_note="備用")]),
+        ]
+    )
+    assert accounts(index.prefix("git")) == [
+        ("GitHub", "alice"),
+        ("GitHub", "bob"),
+    ]
+    assert accounts(index.prefix("王小")) == [("國泰銀行", "王小明")]
+    assert accounts(index.prefix("ＧＩＴ")) == accounts(index.prefix("git"))
+    assert accounts(index.substring("工作")) == [("GitHub", "bob")]
+    assert accounts(index.substring("泰")) == [("國泰銀行", "王小明")]
+    assert accounts(index.substring("o")) == [("GitHub", "bob")]
+    assert index.substring("zz") == []
+
+
+def test_fuzzy():
+    index = SearchIndex.build(
+        [
+            ("GitHub", [record("alice")]),
+            ("GitLab", [record("carol")]),
+            ("新光銀行", [record("dave")]),
+        ]
+    )
+    results = index.fuzzy("githb")
+    assert results[0][1] == "GitHub"
+    assert [app for _, app, _ in index.fuzzy("新光銀")] == ["新光銀行"]
+    assert index.fuzzy("qqqq") == []
+
+
+def test_remove_duplicate_accounts():
+    first, second = record("alice", note="1"), record("alice", note="2")
+    index = SearchIndex.build([("app", [first, second])])
+    index.remove("app", record("alice", note="2"))
+    assert [i for _, i in index.prefix("alice")] == [first]
+    index.remove("app", first)
+    assert len(index) == 0
+    assert index.prefix("a") == []
+    assert index.substring("al") == []
+    index.add("app", record("alice"))
+    assert accounts(index.prefix("app")) == [("app", "alice")]
+
+
+def test_matches_brute_force_after_many_changes():
+    rng = random.Random(0)
+    index = SearchIndex()
+    live: list[tuple[str, AccountRecord]] = []
+    for step in range(6000):
+        if len(live) > 0 and rng.random() < 0.45:
+            app, app_data = live.pop(rng.randrange(len(live)))
+            index.remove(app, app_data)
+        else:
+            app = f"應用{rng.randrange(30)}"
+            app_data = record(f"user{rng.randrange(500)}", note="備註")
+            index.add(app, app_data)
+            live.append((app, app_data))
+    assert len(index) == len(live)
+    for query in ("user1", "用1", "user42", "備"):
+        expected = sorted(
+            (app, id(i))
+            for app, i in live
+            if normalize(query)
+            in normalize("\x00".join((app, i["acc"], i["note"])))
+        )
+        found = index.substring(query, limit=len(live) + 1)
+        assert sorted((app, id(i)) for app, i in found) == expected
+        expected_prefix = sorted(
+            (app, id(i))
+            for app, i in live
+            if app.startswith(query) or i["acc"].startswith(query)
+        )
+        found = index.prefix(query, limit=len(live) + 1)
+        assert sorted((app, id(i)) for app, i in found) == expected_prefix
+
+
+def test_results_and_events_do_not_share_records(backend):
+    events = []
+    backend.password_book_subscribe(events.append)
+    backend.password_book_insert("site", "alice", "pwd", note="note")
+    for mode in ("prefix", "substring", "fuzzy"):
+        [(_, found)] = backend.password_book_find("alice", mode=mode)
+        found["acc"] = "mallory"
+        found["pwd"] = "changed"
+    [(_, inserted)] = events[0].items
+    with pytest.raises(TypeError):
+        inserted["pwd"] = "changed"  # type: ignore[index]
+    assert backend.password_book_search("site") == [
+        {"acc": "alice", "pwd": "pwd", "note": "note", "user_note": ""}
+    ]
+    assert backend.password_book_exists("site", "alice") is True
+    assert accounts(backend.password_book_find("alice")) == [
+        ("site", "alice")
+    ]
+    assert backend.password_book_find("mallory") == []
@@ -0,0 +1,58 @@
+import pytest
+
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+
+@pytest.fixture
+def backend(backend):
+    """conftest的`backend`加上三個帳號"""
+    for acc in "abc":
+        backend.password_book_insert("app", acc, "pwd")
+    return backend
+
+
+def test_snapshot_records_are_read_only(backend):
+    snapshot = backend.password_book_snapshot()
+    with pytest.raises(TypeError):
+        snapshot["app"][0]["pwd"] = "changed"
+    for app_data in snapshot["app"]:
+        with pytest.raises(TypeError):
+            app_data["pwd"] = "changed"
+    with pytest.raises(TypeError):
+        snapshot["app"][:1][0]["pwd"] = "changed"
+    assert [i["pwd"] for i in backend.password_book_search("app")] == [
+        "pwd"
+    ] * 3
+
+
+def test_snapshot_to_dict_is_a_copy(backend):
+    data = backend.password_book_snapshot().to_dict()
+    data["app"][0]["pwd"] = "changed"
+    data["app"].append({"acc": "d", "pwd": "pwd"})
+    assert [i["pwd"] for i in backend.password_book_search("app")] == [
+        "pwd"
+    ] * 3
+
+
+@pytest.mark.parametrize("thread_safe", [False, True])
+def test_search_returns_a_copy(thread_safe):
+    backend = PasswordBookSystem(thread_safe=thread_safe)
+    for acc in ("alice", "bob", "carol"):
+        backend.password_book_insert("site", acc, "pwd")
+    app_datas = backend.password_book_search("site")
+    app_datas.append({"acc": "mallory", "pwd": "pwd"})
+    app_datas[0]["acc"] = "changed"
+    del app_datas[1]
+    assert [i["acc"] for i in backend.password_book_search("site")] == [
+        "alice",
+        "bob",
+        "carol",
+    ]
+    assert backend.password_book_find("changed") == []
+    assert backend.password_book_find("mallory") == []
+    assert [i["acc"] for _, i in backend.password_book_find("alice")] == [
+        "alice"
+    ]
+    backend.password_book_delete("site", "alice")
+    assert backend.password_book_find("alice") == []
+    backend.password_book_close()
@@ -0,0 +1,106 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+WORKERS = 8
+STEPS = 300
+
+
+def worker(backend, file_path, number):
+    """只新增/刪除自己的應用程式與`shared`內自己的帳號，搜尋與儲存
+    則與其他執行緒交錯；回傳預期的結果"""
+    rng = random.Random(number)
+    app = f"app{number}"
+    own: list[str] = []
+    shared: list[str] = []
+    for step in range(STEPS):
+        op = rng.random()
+        if op < 0.35 or len(own) <= 0:
+            acc = f"w{number}-{step}"
+            backend.password_book_insert(app, acc, "pwd")
+            own.append(acc)
+        elif op < 0.45:
+            acc = f"w{number}-s{step}"
+            backend.password_book_insert("shared", acc, "pwd")
+            shared.append(acc)
+        elif op < 0.55:
+            acc = own.pop(rng.randrange(len(own)))
+            backend.password_book_delete(app, acc)
+        elif op < 0.6 and len(shared) > 0:
+            acc = shared.pop(rng.randrange(len(shared)))
+            backend.password_book_move_to_trash_can("shared", acc)
+        elif op < 0.75:
+            acc = rng.choice(own)
+            found = backend.password_book_find(
+                acc, mode="prefix", limit=STEPS
+            )
+            assert [(app, acc)] == [
+                (i, app_data["acc"])
+                for i, app_data in found
+                if app_data["acc"] == acc
+            ]
+            assert backend.password_book_find_duplicates(app, acc) == [
+                (app, acc)
+            ]
+        elif op < 0.85:
+            app_datas = backend.password_book_search(app)
+            assert app_datas is not None
+            app_datas.append({"acc": "x", "pwd": "x"})
+        elif op < 0.95:
+            snapshot = backend.password_book_snapshot()
+            assert snapshot.app_len(app) == len(snapshot[app])
+        else:
+            backend.password_book_save(file_path)
+    return app, own, shared
+
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_concurrent_workers_keep_indexes_consistent(tmp_path, storage):
+    file_name = "password_data.db" if storage == "sqlite" else "data.json"
+    file_path = str(tmp_path / file_name)
+    backend = PasswordBookSystem(
+        storage=storage, thread_safe=True, trash_retention=None
+    )
+    backend.password_book_save(file_path)
+    with ThreadPoolExecutor(max_workers=WORKERS) as executor:
+        futures = [
+            executor.submit(worker, backend, file_path, number)
+            for number in range(WORKERS)
+        ]
+        results = [future.result() for future in futures]
+    shared: set[str] = set()
+    for app, own, worker_shared in results:
+        # 只有自己修改的應用程式：順序也要相同
+        app_datas = backend.password_book_search(app) or []
+        assert [i["acc"] for i in app_datas] == own
+        assert backend.password_book_count(app) == len(own)
+        shared.update(worker_shared)
+    shared_accs = [
+        i["acc"] for i in backend.password_book_search("shared") or []
+    ]
+    assert sorted(shared_accs) == sorted(shared)
+    # 搜尋索引與重複索引和資料一致
+    for app, own, _ in results:
+        found = backend.password_book_find(f"w{app[3:]}-", limit=10**6)
+        assert sorted(i["acc"] for _, i in found) == sorted(
+            own + [i for i in shared if i.startswith(f"w{app[3:]}-")]
+        )
+        for acc in own:
+            assert backend.password_book_find_duplicates(app, acc) == [
+                (app, acc)
+            ]
+    trash_accs = [
+        i["acc"] for i in backend.password_book_trash_can_items()
+    ]
+    assert len(trash_accs) == len(set(trash_accs))
+    assert set(trash_accs).isdisjoint(shared)
+    # 儲存後重新載入，內容相同
+    backend.password_book_save(file_path)
+    expected = backend.password_book_snapshot().to_dict()
+    backend.password_book_close()
+    loaded = PasswordBookSystem(file_path, storage=storage)
+    assert loaded.password_book_snapshot().to_dict() == expected
+    loaded.password_book_close()
@@ -0,0 +1,45 @@
+import time
+
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+
+def trash_accounts(backend):
+    return [i["acc"] for i in backend.password_book_trash_can_items()]
+
+
+def test_restore_keeps_trash_order(backend):
+    trash_ids = {}
+    for acc in "abcde":
+        backend.password_book_insert("app", acc, "pwd")
+        trash_ids[acc] = backend.password_book_move_to_trash_can("app", acc)
+    backend.password_book_restore_from_trash_can(trash_ids["a"])
+    assert trash_accounts(backend) == ["b", "c", "d", "e"]
+    backend.password_book_restore_from_trash_can(trash_ids["c"])
+    assert trash_accounts(backend) == ["b", "d", "e"]
+    backend.password_book_move_to_trash_can("app", "a")
+    assert trash_accounts(backend) == ["b", "d", "e", "a"]
+
+
+def test_purge_expired_keeps_order(tmp_path):
+    file_path = str(tmp_path / "password_data.json")
+    backend = PasswordBookSystem(trash_retention=None)
+    for acc in "abcdef":
+        backend.password_book_insert("app", acc, "pwd")
+    for acc in "ab":
+        backend.password_book_move_to_trash_can("app", acc)
+    time.sleep(0.01)
+    before = time.time()
+    for acc in "cdef":
+        backend.password_book_move_to_trash_can("app", acc)
+    backend.password_book_save(file_path)
+    backend.password_book_close()
+    backend = PasswordBookSystem(file_path, trash_retention=None)
+    assert backend.password_book_purge_trash_can(before) == 2
+    assert trash_accounts(backend) == ["c", "d", "e", "f"]
+    trash_ids = {
+        i["acc"]: int(i["trash_id"])
+        for i in backend.password_book_trash_can_items()
+    }
+    backend.password_book_restore_from_trash_can(trash_ids["d"])
+    assert trash_accounts(backend) == ["c", "e", "f"]
+    backend.password_book_close()
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+from ppb.ppb_backend.ppb_backend import PasswordBookSystem
+
+try:
+    from ppb.ppb_tui.ppb_tui import PPBDataView
+except ImportError as e:
+    pytest.skip(f"無法載入TUI：{e}", allow_module_level=True)
+
+
+def view_contents(data):
+    return {
+        app: [dict(i) for i in data[app]]
+        for app in data
+        if app != "trash_can"
+    }
+
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_data_view_follows_events(storage):
+    backend = PasswordBookSystem(storage=storage, trash_retention=None)
+    data = PPBDataView(backend.password_book_snapshot())
+    events = []
+    backend.password_book_subscribe(events.append)
+    rng = random.Random(7)
+    trash_ids = []
+    for _ in range(400):
+        app = rng.choice(["a", "b", "c"])
+        accs = [i["acc"] for i in backend.password_book_search(app) or []]
+        op = rng.random()
+        if op < 0.45 or len(accs) <= 0:
+            backend.password_book_insert(app, rng.choice("xyz"), "pwd")
+        elif op < 0.6:
+            backend.password_book_delete(app, rng.choice(accs))
+        elif op < 0.75:
+            trash_ids.append(
+                backend.password_book_move_to_trash_can(
+                    app, rng.choice(accs)
+                )
+            )
+        elif op < 0.85 and len(trash_ids) > 0:
+            backend.password_book_restore_from_trash_can(
+                trash_ids.pop(rng.randrange(len(trash_ids)))
+            )
+        else:
+            backend.password_book_update(
+                app, rng.choice(accs), pwd=str(rng.random())
+            )
+        for event in events:
+            data.apply(event)
+        events.clear()
+        assert view_contents(data) == view_contents(
+            backend.password_book_snapshot()
+        )
+        for app in data:
+            if app != "trash_can":
+                assert data.app_len(app) == len(data[app])
+    backend.password_book_close()